@@ -1,18 +1,137 @@
 """
 Build searchable PDF index from extracted content.
 Parses filenames for metadata and extracts meal structures.
+
+Builds are incremental: a manifest next to the index records each source
+file's size, mtime and sha256. On the next run only added or changed files
+are processed; unchanged entries are carried over from the previous index
+and the metadata counts are adjusted for what changed. Use --full to
+reprocess everything.
+
+Files are processed across a pool of worker processes (--workers, default
+one per CPU); results come back in path order, so the index is identical to
+a serial build.
+
+The index is saved as JSON and as a memory-mapped binary file next to it
+(pdf_index.bin, see service/binary_index.py) that the service can load
+instead, and a full-text search index over the plans and their parsed
+meal options (pdf_search.json, see service/search_index.py). With --shards the index is also written split by category (see save_shards),
+for services that should only load the categories they are asked about.
 """
 
+import argparse
+import copy
+import hashlib
 import json
+import os
 import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from typing import Dict, List, Optional, Any
 import logging
 
+PROJECT_ROOT = Path(__file__).parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from pipeline.keyword_automaton import KeywordAutomaton
+from service.binary_index import write_binary_index
+from service.nutrition_index import RANGE_FIELDS, plan_band
+from service.pdf_parser import parse_pdf_complete
+from service.plan_catalog import MATCH_FIELDS
+from service.search_index import SearchIndex, plan_documents
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+# Bump when extraction changes, so the next build reprocesses every file
+EXTRACTOR_VERSION = 2
+
+# Plan fields counted in the index metadata, and the metadata key for each
+COUNTED_FIELDS = [
+    ('gender', 'by_gender'),
+    ('region', 'by_region'),
+    ('activity', 'by_activity'),
+    ('bmi_category', 'by_bmi'),
+    ('diet_type', 'by_diet'),
+    ('category', 'category'),
+    ('category', 'by_category'),
+]
+
+
+# Fields read from the document text: (name, lowercase pattern), matched case-insensitively.
+# Each field takes its first match. Patterns sharing a prefix start at the same
+# positions (age_range and age, 'evening snack' and 'evening'). The alternation
+# tries branches in list order, so the longer pattern is listed first and decides
+# the overlap. With that order, one scan that tries them all at every position
+# finds the same matches as a separate re.search per pattern (the shorter
+# pattern needs a digit where the longer continues). Every capture group is
+# mandatory, so a match's lastindex identifies the field.
+NUTRITION_FIELDS = ['calories', 'protein', 'carbs', 'fat', 'fiber']
+MEAL_TIMES = [
+    'early morning', 'pre-breakfast', 'breakfast',
+    'mid-morning', 'mid morning', 'lunch',
+    'evening snack', 'evening', 'dinner', 'bedtime', 'post-dinner'
+]
+CONTENT_PATTERNS = [
+    ('age_range', r'age[:\s]*(\d+)\s*[-–]\s*(\d+)\s*years?'),
+    ('age', r'age[:\s]*(\d+)\s*years?'),
+    ('calories', r'(?:calories?|kcal)[:\s]*(\d+)\s*[-–]\s*(\d+)'),
+    ('protein', r'protein[:\s]*(\d+)\s*[-–]\s*(\d+)\s*g'),
+    ('carbs', r'carbohydrate[s]?[:\s]*(\d+)\s*[-–]\s*(\d+)\s*g'),
+    ('fat', r'fat[:\s]*(\d+)\s*[-–]\s*(\d+)\s*g'),
+    ('fiber', r'fiber[:\s]*(\d+)\s*[-–]\s*(\d+)\s*g'),
+] + [
+    (f'meal_{i}', rf'{meal_time}[:\s]*\(?(\d{{1,2}}[:\.]?\d{{0,2}}\s*(?:am|pm)?)\)?')
+    for i, meal_time in enumerate(MEAL_TIMES)
+]
+
+
+def _compile_scanner(patterns):
+    """One alternation of all patterns, plus last group number -> (name, first group number).
+    
+    The alternation is matched against lowercased text without IGNORECASE:
+    that keeps the regex engine's first-character skip, which case-folding
+    (and named groups around the branches) would disable.
+    """
+    fields = {}
+    next_group = 1
+    for name, pattern in patterns:
+        count = re.compile(pattern).groups
+        fields[next_group + count - 1] = (name, next_group)
+        next_group += count
+    combined = '|'.join(pattern for _, pattern in patterns)
+    return re.compile(combined), re.compile(combined, re.IGNORECASE), fields
+
+
+CONTENT_SCANNER, CONTENT_SCANNER_ANYCASE, CONTENT_FIELDS = _compile_scanner(CONTENT_PATTERNS)
+
+# Common Indian ingredients, in the order they are listed in an entry
+INGREDIENT_KEYWORDS = [
+    'rice', 'wheat', 'roti', 'chapati', 'dal', 'lentil', 'moong', 'chana',
+    'paneer', 'tofu', 'milk', 'curd', 'yogurt', 'buttermilk',
+    'oats', 'quinoa', 'ragi', 'jowar', 'bajra', 'dalia',
+    'ghee', 'oil', 'butter',
+    'vegetables', 'spinach', 'broccoli', 'carrot', 'tomato', 'onion',
+    'fruits', 'apple', 'banana', 'papaya', 'orange', 'pomegranate',
+    'almonds', 'walnuts', 'cashews', 'dates', 'raisins',
+    'ginger', 'turmeric', 'cumin', 'coriander', 'ajwain',
+    'chicken', 'fish', 'egg', 'meat'
+]
+INGREDIENT_MATCHER = KeywordAutomaton(INGREDIENT_KEYWORDS)
+
+# Sharded layout: <output stem>_shards/manifest.json plus one file per category
+SHARD_MANIFEST_NAME = 'manifest.json'
+SHARD_FORMAT_VERSION = 1
+UNCATEGORIZED_SHARD = '_uncategorized'
+
+# Below this many files per worker a pool costs more than it saves
+MIN_FILES_PER_WORKER = 8
+
+
 class PDFIndexBuilder:
     """Builds searchable index from extracted PDF content."""
     
@@ -55,10 +174,20 @@ class PDFIndexBuilder:
         'high_protein_balanced': ['protein rich balanced diet', 'protein balanced'],
     }
     
-    def __init__(self, raw_dir: str = "outputs/raw", output_file: str = "outputs/pdf_index.json"):
+    def __init__(self, raw_dir: str = "outputs/raw", output_file: str = "outputs/pdf_index.json",
+                 workers: Optional[int] = None, shards: bool = False):
         self.raw_dir = Path(raw_dir)
         self.output_file = Path(output_file)
+        self.shards = shards
+        self.shard_dir = self.output_file.with_name(self.output_file.stem + '_shards')
+        self.workers = workers or os.cpu_count() or 1
         self.output_file.parent.mkdir(parents=True, exist_ok=True)
+        self.manifest_file = self.output_file.with_name(self.output_file.stem + '.manifest.json')
+        self.search_file = self.output_file.with_name(self.output_file.stem.replace('_index', '') + '_search.json')
+        self.carried_paths: set = set()
+        self.manifest: Dict[str, Any] = {}
+        self.index_sha256: Optional[str] = None  # of the last JSON index written
+        self.stats = {'added': 0, 'changed': 0, 'removed': 0, 'unchanged': 0}
         
     def extract_metadata_from_filename(self, filename: str, folder_path: str) -> Dict[str, Any]:
         """Extract metadata from filename and folder structure."""
@@ -133,118 +262,83 @@ class PDFIndexBuilder:
         
         return metadata
     
-    def extract_age_info(self, content: str) -> Dict[str, Any]:
-        """Extract age information from content."""
-        age_info = {}
+    def scan_content(self, content: str) -> Dict[str, tuple]:
+        """First match of every CONTENT_PATTERNS field in one pass over content.
         
-        # Pattern 1: Age range like "Age: 30-40 years" or "Age: 30–40 years"
-        age_range_pattern = r'Age[:\s]*(\d+)\s*[-–]\s*(\d+)\s*years?'
-        age_range_match = re.search(age_range_pattern, content, re.IGNORECASE)
+        Returns field name -> the match's groups, for the fields that occur.
+        """
+        content_lower = content.lower()
+        if len(content_lower) == len(content):
+            scanner, text = CONTENT_SCANNER, content_lower
+        else:
+            # Some character lowercases to several, so offsets wouldn't line up
+            scanner, text = CONTENT_SCANNER_ANYCASE, content
+        
+        found = {}
+        pos = 0
+        while len(found) < len(CONTENT_FIELDS):
+            match = scanner.search(text, pos)
+            if match is None:
+                break
+            name, first = CONTENT_FIELDS[match.lastindex]
+            if name not in found:
+                # Groups are sliced from the original text to keep its case ("7 AM")
+                found[name] = tuple(content[match.start(g):match.end(g)] for g in range(first, match.lastindex + 1))
+            # Resume one character on, not at the match end: a match may contain
+            # another field's first match ('breakfast' inside 'pre-breakfast')
+            pos = match.start() + 1
+        return found
+    
+    def extract_age_info(self, content: str, fields: Optional[Dict[str, tuple]] = None) -> Dict[str, Any]:
+        """Extract age information from content (or from its scan_content fields)."""
+        if fields is None:
+            fields = self.scan_content(content)
+        age_info = {}
         
-        if age_range_match:
-            age_info['age_min'] = int(age_range_match.group(1))
-            age_info['age_max'] = int(age_range_match.group(2))
+        # A range like "Age: 30-40 years" wins over a single "Age: 30 years"
+        if 'age_range' in fields:
+            age_info['age_min'] = int(fields['age_range'][0])
+            age_info['age_max'] = int(fields['age_range'][1])
             age_info['age_avg'] = (age_info['age_min'] + age_info['age_max']) // 2
-        else:
-            # Pattern 2: Single age like "Age: 30 years"
-            age_single_pattern = r'Age[:\s]*(\d+)\s*years?'
-            age_single_match = re.search(age_single_pattern, content, re.IGNORECASE)
-            
-            if age_single_match:
-                age = int(age_single_match.group(1))
-                age_info['age_min'] = age
-                age_info['age_max'] = age
-                age_info['age_avg'] = age
+        elif 'age' in fields:
+            age = int(fields['age'][0])
+            age_info['age_min'] = age
+            age_info['age_max'] = age
+            age_info['age_avg'] = age
         
         return age_info
     
-    def extract_nutrition_info(self, content: str) -> Dict[str, Any]:
-        """Extract nutrition information from content."""
+    def extract_nutrition_info(self, content: str, fields: Optional[Dict[str, tuple]] = None) -> Dict[str, Any]:
+        """Extract daily nutrition ranges from content (or from its scan_content fields)."""
+        if fields is None:
+            fields = self.scan_content(content)
         nutrition = {}
         
-        # Extract daily calorie range
-        calorie_pattern = r'(?:calories?|kcal)[:\s]*(\d+)\s*[-–]\s*(\d+)'
-        cal_match = re.search(calorie_pattern, content, re.IGNORECASE)
-        if cal_match:
-            nutrition['calories_min'] = int(cal_match.group(1))
-            nutrition['calories_max'] = int(cal_match.group(2))
-        
-        # Extract protein range
-        protein_pattern = r'protein[:\s]*(\d+)\s*[-–]\s*(\d+)\s*g'
-        prot_match = re.search(protein_pattern, content, re.IGNORECASE)
-        if prot_match:
-            nutrition['protein_min'] = int(prot_match.group(1))
-            nutrition['protein_max'] = int(prot_match.group(2))
-        
-        # Extract carbs range
-        carb_pattern = r'carbohydrate[s]?[:\s]*(\d+)\s*[-–]\s*(\d+)\s*g'
-        carb_match = re.search(carb_pattern, content, re.IGNORECASE)
-        if carb_match:
-            nutrition['carbs_min'] = int(carb_match.group(1))
-            nutrition['carbs_max'] = int(carb_match.group(2))
-        
-        # Extract fat range
-        fat_pattern = r'fat[:\s]*(\d+)\s*[-–]\s*(\d+)\s*g'
-        fat_match = re.search(fat_pattern, content, re.IGNORECASE)
-        if fat_match:
-            nutrition['fat_min'] = int(fat_match.group(1))
-            nutrition['fat_max'] = int(fat_match.group(2))
-        
-        # Extract fiber range
-        fiber_pattern = r'fiber[:\s]*(\d+)\s*[-–]\s*(\d+)\s*g'
-        fiber_match = re.search(fiber_pattern, content, re.IGNORECASE)
-        if fiber_match:
-            nutrition['fiber_min'] = int(fiber_match.group(1))
-            nutrition['fiber_max'] = int(fiber_match.group(2))
+        for name in NUTRITION_FIELDS:
+            if name in fields:
+                nutrition[f'{name}_min'] = int(fields[name][0])
+                nutrition[f'{name}_max'] = int(fields[name][1])
         
         return nutrition
     
-    def extract_meals(self, content: str) -> List[Dict[str, Any]]:
-        """Extract meal structures from content."""
+    def extract_meals(self, content: str, fields: Optional[Dict[str, tuple]] = None) -> List[Dict[str, Any]]:
+        """Extract meal times from content (or from its scan_content fields)."""
+        if fields is None:
+            fields = self.scan_content(content)
         meals = []
         
-        # Meal time patterns
-        meal_times = [
-            'early morning', 'pre-breakfast', 'breakfast', 
-            'mid-morning', 'mid morning', 'lunch', 
-            'evening snack', 'evening', 'dinner', 'bedtime', 'post-dinner'
-        ]
-        
-        for meal_time in meal_times:
-            # Find meal time section
-            pattern = rf'{meal_time}[:\s]*\(?(\d{{1,2}}[:\.]?\d{{0,2}}\s*(?:am|pm)?)\)?'
-            match = re.search(pattern, content, re.IGNORECASE)
-            if match:
+        for i, meal_time in enumerate(MEAL_TIMES):
+            if f'meal_{i}' in fields:
                 meals.append({
                     'meal_time': meal_time.title().replace('-', ' '),
-                    'time': match.group(1) if match.lastindex >= 1 else None
+                    'time': fields[f'meal_{i}'][0],
                 })
         
         return meals
     
     def extract_ingredients(self, content: str) -> List[str]:
-        """Extract common ingredients mentioned in the plan."""
-        # Common Indian ingredients
-        ingredient_keywords = [
-            'rice', 'wheat', 'roti', 'chapati', 'dal', 'lentil', 'moong', 'chana',
-            'paneer', 'tofu', 'milk', 'curd', 'yogurt', 'buttermilk',
-            'oats', 'quinoa', 'ragi', 'jowar', 'bajra', 'dalia',
-            'ghee', 'oil', 'butter',
-            'vegetables', 'spinach', 'broccoli', 'carrot', 'tomato', 'onion',
-            'fruits', 'apple', 'banana', 'papaya', 'orange', 'pomegranate',
-            'almonds', 'walnuts', 'cashews', 'dates', 'raisins',
-            'ginger', 'turmeric', 'cumin', 'coriander', 'ajwain',
-            'chicken', 'fish', 'egg', 'meat'
-        ]
-        
-        found_ingredients = []
-        content_lower = content.lower()
-        
-        for ingredient in ingredient_keywords:
-            if ingredient in content_lower:
-                found_ingredients.append(ingredient)
-        
-        return found_ingredients
+        """Extract common ingredients mentioned in the plan, in INGREDIENT_KEYWORDS order."""
+        return INGREDIENT_MATCHER.find(content.lower())
     
     def process_file(self, file_path: Path) -> Optional[Dict[str, Any]]:
         """Process a single extracted text file."""
@@ -253,29 +347,26 @@ class PDFIndexBuilder:
             with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
                 content = f.read()
             
-            # Get relative path for folder structure
+            # Get relative path for folder structure (POSIX separators on every platform)
             rel_path = file_path.relative_to(self.raw_dir)
-            folder_path = str(rel_path.parent)
+            folder_path = rel_path.parent.as_posix()
             
             # Extract metadata
             metadata = self.extract_metadata_from_filename(file_path.stem, folder_path)
             
-            # Extract age info
-            age_info = self.extract_age_info(content)
-            
-            # Extract nutrition info
-            nutrition = self.extract_nutrition_info(content)
-            
-            # Extract meal structure
-            meals = self.extract_meals(content)
+            # One pass over the text for age, nutrition and meal times
+            fields = self.scan_content(content)
+            age_info = self.extract_age_info(content, fields)
+            nutrition = self.extract_nutrition_info(content, fields)
+            meals = self.extract_meals(content, fields)
             
             # Extract ingredients
             ingredients = self.extract_ingredients(content)
             
             # Build index entry
             entry = {
-                'file_path': str(file_path),
-                'relative_path': str(rel_path),
+                'file_path': file_path.as_posix(),
+                'relative_path': rel_path.as_posix(),
                 **metadata,
                 'age_info': age_info,
                 'nutrition': nutrition,
@@ -290,76 +381,346 @@ class PDFIndexBuilder:
             logger.error(f"Error processing {file_path}: {e}")
             return None
     
-    def build_index(self) -> Dict[str, Any]:
-        """Build complete index from all extracted files."""
-        logger.info(f"Building index from {self.raw_dir}")
-        
-        index = {
-            'metadata': {
-                'total_plans': 0,
-                'by_gender': {},
-                'by_region': {},
-                'by_activity': {},
-                'by_bmi': {},
-                'by_diet': {},
-                'by_category': {},
-                'category': {},  # Add this for consistency
-            },
-            'plans': []
+    def load_previous_index(self) -> Optional[Dict[str, Any]]:
+        """The existing index (old list-format files are wrapped), or None."""
+        if not self.output_file.exists():
+            return None
+        try:
+            with open(self.output_file, 'r', encoding='utf-8') as f:
+                previous = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Could not read previous index: {e}")
+            return None
+        if isinstance(previous, list):
+            previous = {'metadata': {}, 'plans': previous}
+        return previous
+    
+    def load_previous_ids(self, previous: Optional[Dict[str, Any]] = None) -> Dict[str, int]:
+        """Plan ids from the existing index, keyed by POSIX relative path."""
+        if previous is None:
+            previous = self.load_previous_index()
+        if previous is None:
+            return {}
+        return {
+            plan['relative_path'].replace('\\', '/'): plan['id']
+            for plan in previous.get('plans', [])
+            if isinstance(plan.get('id'), int) and plan.get('relative_path')
         }
+    
+    def load_manifest(self) -> Dict[str, Dict[str, Any]]:
+        """Source file records of the last build, if it was made by this extractor from this raw_dir."""
+        try:
+            with open(self.manifest_file, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return {}
+        if manifest.get('extractor_version') != EXTRACTOR_VERSION or manifest.get('raw_dir') != self.raw_dir.as_posix():
+            return {}
+        return manifest.get('files', {})
+    
+    def save_manifest(self):
+        tmp_file = Path(str(self.manifest_file) + '.tmp')
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump({
+                'extractor_version': EXTRACTOR_VERSION,
+                'raw_dir': self.raw_dir.as_posix(),
+                'files': self.manifest,
+            }, f, indent=1, ensure_ascii=False, sort_keys=True)
+        tmp_file.replace(self.manifest_file)
+    
+    @staticmethod
+    def empty_metadata() -> Dict[str, Any]:
+        return {
+            'total_plans': 0,
+            'by_gender': {},
+            'by_region': {},
+            'by_activity': {},
+            'by_bmi': {},
+            'by_diet': {},
+            'by_category': {},
+            'category': {},  # Add this for consistency
+        }
+    
+    @staticmethod
+    def count_entry(metadata: Dict[str, Any], entry: Dict[str, Any], delta: int = 1):
+        """Add (or with delta=-1, remove) one plan to the metadata counts."""
+        metadata['total_plans'] += delta
+        for key, meta_key in COUNTED_FIELDS:
+            if key in entry:
+                counts = metadata[meta_key]
+                value = entry[key]
+                counts[value] = counts.get(value, 0) + delta
+                if counts[value] <= 0:
+                    del counts[value]
+    
+    def process_files(self, file_paths: List[Path]) -> List[Optional[Dict[str, Any]]]:
+        """process_file for each path, in order (in a process pool for large batches)."""
+        return self.map_files(_process_file, file_paths)
+    
+    def map_files(self, function, items: List[Any]) -> List[Any]:
+        """function(item) for each item, in order: in a process pool for large batches.
+        
+        function must be a module-level function; it runs with this builder
+        available as _worker_builder.
+        """
+        total = len(items)
+        workers = min(self.workers, total // MIN_FILES_PER_WORKER)
+        started = time.monotonic()
+        
+        if workers > 1:
+            # A few chunks per worker: large enough to amortize the IPC, small enough to balance load
+            chunksize = max(1, total // (workers * 4))
+            logger.info(f"Processing {total} files with {workers} workers (chunks of {chunksize})")
+            pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(str(self.raw_dir), str(self.output_file)))
+            results = pool.map(function, items, chunksize=chunksize)
+        else:
+            global _worker_builder
+            _worker_builder = self
+            pool = None
+            results = map(function, items)
         
-        # Find all .txt files
-        txt_files = list(self.raw_dir.rglob("*.txt"))
-        logger.info(f"Found {len(txt_files)} files to process")
+        outputs = []
+        try:
+            # map() yields in input order, so the merge is the same as a serial run
+            for i, output in enumerate(results, 1):
+                outputs.append(output)
+                if i % 50 == 0 or i == total:
+                    elapsed = time.monotonic() - started
+                    logger.info(f"Processed {i}/{total} ({i / elapsed if elapsed else 0:.0f} files/s)")
+        finally:
+            if pool is not None:
+                pool.shutdown()
+        return outputs
+    
+    def build_index(self, incremental: bool = True) -> Dict[str, Any]:
+        """Build the index from all extracted files.
+        
+        Every plan gets a stable integer 'id': plans already in the previous
+        index keep theirs, new plans get the next free ids in path order.
+        With incremental=True, files whose size and mtime (or else sha256)
+        match the manifest keep their previous entry without being processed.
+        """
+        logger.info(f"Building index from {self.raw_dir}")
         
-        # Process each file
-        for i, file_path in enumerate(txt_files, 1):
-            if i % 50 == 0:
-                logger.info(f"Processing {i}/{len(txt_files)}")
-            
-            entry = self.process_file(file_path)
+        previous = self.load_previous_index()
+        previous_ids = self.load_previous_ids(previous)
+        next_id = max(previous_ids.values(), default=-1) + 1
+        
+        manifest = self.load_manifest() if incremental and previous else {}
+        previous_entries = {}
+        if manifest:
+            previous_entries = {plan['relative_path']: plan for plan in previous.get('plans', [])
+                                if plan.get('relative_path') in manifest}
+        
+        # Find all .txt files (sorted so ids and plan order are deterministic)
+        txt_files = sorted(self.raw_dir.rglob("*.txt"), key=lambda p: p.relative_to(self.raw_dir).as_posix())
+        logger.info(f"Found {len(txt_files)} files")
+        
+        self.manifest = {}
+        self.stats = {'added': 0, 'changed': 0, 'removed': 0, 'unchanged': 0}
+        carried = {}  # relative path -> previous entry
+        to_process = []  # (relative path, file path, manifest record)
+        for file_path in txt_files:
+            rel_path = file_path.relative_to(self.raw_dir).as_posix()
+            st = file_path.stat()
+            record = {'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+            known = manifest.get(rel_path)
+            old_entry = previous_entries.get(rel_path)
+            if known and old_entry and known['size'] == st.st_size and known['mtime_ns'] == st.st_mtime_ns:
+                record['sha256'] = known['sha256']
+            else:
+                record['sha256'] = hashlib.sha256(file_path.read_bytes()).hexdigest()
+                if not (known and old_entry and known['sha256'] == record['sha256']):
+                    to_process.append((rel_path, file_path, record))
+                    continue
+            carried[rel_path] = old_entry
+            self.manifest[rel_path] = record
+        
+        logger.info(f"Processing {len(to_process)} new or changed files")
+        processed = {}
+        for (rel_path, _, record), entry in zip(to_process, self.process_files([p for _, p, _ in to_process])):
             if entry:
-                index['plans'].append(entry)
-                
-                # Update metadata counts
-                index['metadata']['total_plans'] += 1
-                
-                # Count by attributes
-                for key in ['gender', 'region', 'activity', 'bmi_category', 'diet_type', 'category']:
-                    if key in entry:
-                        value = entry[key]
-                        meta_key = key if key == 'category' else f"by_{key.split('_')[0]}"
-                        if value not in index['metadata'][meta_key]:
-                            index['metadata'][meta_key][value] = 0
-                        index['metadata'][meta_key][value] += 1
-        
-        logger.info(f"Index built with {index['metadata']['total_plans']} plans")
+                processed[rel_path] = entry
+                self.manifest[rel_path] = record
+        
+        if manifest:
+            # Adjust the previous counts for the plans that went away or changed
+            metadata = copy.deepcopy(previous.get('metadata') or self.empty_metadata())
+            for rel_path, old_entry in previous_entries.items():
+                if rel_path not in carried:
+                    self.count_entry(metadata, old_entry, -1)
+                    self.stats['changed' if rel_path in processed else 'removed'] += 1
+        else:
+            metadata = self.empty_metadata()
+        
+        self.carried_paths = set(carried)
+        index = {'metadata': metadata, 'plans': []}
+        for rel_path in sorted(carried.keys() | processed.keys()):
+            if rel_path in carried:
+                index['plans'].append(carried[rel_path])
+                self.stats['unchanged'] += 1
+                continue
+            entry = processed[rel_path]
+            plan_id = previous_ids.get(rel_path)
+            if plan_id is None:
+                plan_id = next_id
+                next_id += 1
+            entry = {'id': plan_id, **entry}
+            index['plans'].append(entry)
+            self.count_entry(metadata, entry)
+            if rel_path not in previous_entries:
+                self.stats['added'] += 1
+        
+        logger.info(f"Index built with {index['metadata']['total_plans']} plans ({self.stats})")
         return index
     
     def save_index(self, index: Dict[str, Any]):
-        """Save index to JSON file."""
+        """Save index to the JSON file and to the binary index next to it."""
         logger.info(f"Saving index to {self.output_file}")
         
-        with open(self.output_file, 'w', encoding='utf-8') as f:
-            json.dump(index, f, indent=2, ensure_ascii=False)
+        # Write then rename, so a running service never reads a half-written index
+        tmp_file = Path(str(self.output_file) + '.tmp')
+        content = json.dumps(index, indent=2, ensure_ascii=False).encode('utf-8')
+        tmp_file.write_bytes(content)
+        tmp_file.replace(self.output_file)
+        self.index_sha256 = hashlib.sha256(content).hexdigest()
+        write_binary_index(index, self.output_file.with_suffix('.bin'), self.index_sha256)
         
         logger.info(f"Index saved successfully")
     
-    def run(self):
+    def search_documents(self, plan: Dict[str, Any]) -> List[tuple]:
+        """Search documents (see service/search_index.py) for one plan: its full text and parsed meal options."""
+        try:
+            with open(plan['file_path'], 'r', encoding='utf-8', errors='ignore') as f:
+                text = f.read()
+        except OSError as e:
+            logger.error(f"Error reading {plan['file_path']} for search: {e}")
+            return []
+        parsed = parse_pdf_complete(plan['file_path'])
+        return plan_documents(plan, text, parsed if 'error' not in parsed else None)
+    
+    def save_search_index(self, index: Dict[str, Any], incremental: bool = True):
+        """Write the full-text search index, re-reading only plans that were (re)processed."""
+        previous = SearchIndex.load(self.search_file) if incremental else None
+        if previous is not None:
+            search = previous.extract(lambda doc: doc.get('relative_path') in self.carried_paths)
+            indexed = {doc['relative_path'] for doc in search.docs}
+        else:
+            search = SearchIndex()
+            indexed = set()
+        
+        plans = [plan for plan in index['plans'] if plan['relative_path'] not in indexed]
+        logger.info(f"Indexing {len(plans)} plans for search")
+        for documents in self.map_files(_search_documents, plans):
+            for info, fields in documents:
+                search.add(info, fields)
+        
+        search.index_sha256 = self.index_sha256 or hashlib.sha256(self.output_file.read_bytes()).hexdigest()
+        search.save(self.search_file)
+        logger.info(f"Search index saved to {self.search_file} ({len(search.docs)} documents, {len(search.postings)} terms)")
+    
+    @staticmethod
+    def id_ranges(ids: List[int]) -> List[List[int]]:
+        """[3, 4, 5, 9] -> [[3, 5], [9, 9]]"""
+        ranges = []
+        for plan_id in sorted(ids):
+            if ranges and plan_id == ranges[-1][1] + 1:
+                ranges[-1][1] = plan_id
+            else:
+                ranges.append([plan_id, plan_id])
+        return ranges
+    
+    def save_shards(self, index: Dict[str, Any]):
+        """Write the index as one file per category plus a small manifest.
+        
+        Each shard is a regular index ({'metadata', 'plans'}) with the plans'
+        positions in the full index. The manifest also summarizes every shard:
+        plan counts per combination of the match fields ('cells') and each
+        plan's nutrition and age bands ('bands'), so facet counts and the range
+        index are built without loading a shard. Shard file names carry a
+        content hash and the manifest is replaced last, so a reader always sees
+        a consistent set; files of the previous manifest are kept for readers
+        still using it.
+        """
+        self.shard_dir.mkdir(parents=True, exist_ok=True)
+        manifest_path = self.shard_dir / SHARD_MANIFEST_NAME
+        try:
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                previous_files = {shard['file'] for shard in json.load(f).get('shards', {}).values()}
+        except (OSError, json.JSONDecodeError):
+            previous_files = set()
+        
+        groups: Dict[str, List[int]] = {}
+        for position, plan in enumerate(index['plans']):
+            groups.setdefault(plan.get('category') or UNCATEGORIZED_SHARD, []).append(position)
+        
+        shards = {}
+        for category, positions in sorted(groups.items()):
+            plans = [index['plans'][i] for i in positions]
+            content = json.dumps({
+                'metadata': {'total_plans': len(plans), 'category': category},
+                'positions': positions,
+                'plans': plans,
+            }, ensure_ascii=False).encode('utf-8')
+            file_name = f"{category}.{hashlib.sha256(content).hexdigest()[:12]}.json"
+            if not (self.shard_dir / file_name).exists():
+                tmp_file = self.shard_dir / (file_name + '.tmp')
+                tmp_file.write_bytes(content)
+                tmp_file.replace(self.shard_dir / file_name)
+            cells: Dict[tuple, int] = {}
+            for plan in plans:
+                cell = tuple(plan.get(field) for field in MATCH_FIELDS)
+                cells[cell] = cells.get(cell, 0) + 1
+            shards[category] = {
+                'file': file_name,
+                'plans': len(plans),
+                'bytes': len(content),
+                'id_ranges': self.id_ranges([plan['id'] for plan in plans]),
+                'cells': [[*cell, count] for cell, count in cells.items()],
+                'bands': [[position, plan['id'], *(plan_band(plan, band) for band in RANGE_FIELDS)]
+                          for position, plan in zip(positions, plans)],
+            }
+        
+        tmp_file = manifest_path.with_suffix('.json.tmp')
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump({
+                'format': SHARD_FORMAT_VERSION,
+                'total_plans': len(index['plans']),
+                'metadata': index['metadata'],
+                'index_sha256': self.index_sha256,
+                'cell_fields': list(MATCH_FIELDS),
+                'band_fields': list(RANGE_FIELDS),
+                'shards': shards,
+            }, f, indent=1, ensure_ascii=False)
+        tmp_file.replace(manifest_path)
+        
+        live = previous_files | {shard['file'] for shard in shards.values()} | {SHARD_MANIFEST_NAME}
+        for path in self.shard_dir.glob('*.json'):
+            if path.name not in live:
+                path.unlink()
+        logger.info(f"Wrote {len(shards)} category shards to {self.shard_dir}")
+    
+    def run(self, incremental: bool = True):
         """Main execution method."""
         logger.info("Starting PDF index builder")
         
         # Build index
-        index = self.build_index()
+        index = self.build_index(incremental=incremental)
         
-        # Save index
+        # Save index, then the manifest describing the files it was built from
         self.save_index(index)
+        self.save_search_index(index, incremental=incremental)
+        if self.shards:
+            self.save_shards(index)
+        self.save_manifest()
         
         # Print summary
         print("\n" + "="*60)
         print("PDF INDEX BUILD SUMMARY")
         print("="*60)
         print(f"Total Plans: {index['metadata']['total_plans']}")
+        print(f"Added: {self.stats['added']}  Changed: {self.stats['changed']}  "
+              f"Removed: {self.stats['removed']}  Unchanged: {self.stats['unchanged']}")
         print(f"\nBy Gender: {index['metadata']['by_gender']}")
         print(f"By Region: {index['metadata']['by_region']}")
         print(f"By Activity: {index['metadata']['by_activity']}")
@@ -371,6 +732,36 @@ class PDFIndexBuilder:
         logger.info("PDF index builder completed")
 
 
+_worker_builder: Optional[PDFIndexBuilder] = None
+
+
+def _init_worker(raw_dir: str, output_file: str):
+    global _worker_builder
+    _worker_builder = PDFIndexBuilder(raw_dir=raw_dir, output_file=output_file, workers=1)
+
+
+def _process_file(file_path: Path) -> Optional[Dict[str, Any]]:
+    return _worker_builder.process_file(file_path)
+
+
+def _search_documents(plan: Dict[str, Any]) -> List[tuple]:
+    return _worker_builder.search_documents(plan)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the PDF index from extracted text files")
+    parser.add_argument('--raw-dir', default="outputs/raw", help="Directory of extracted .txt files")
+    parser.add_argument('--output', default="outputs/pdf_index.json", help="Index file to write")
+    parser.add_argument('--full', action='store_true', help="Reprocess every file, ignoring the manifest")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: one per CPU, 1 = serial)")
+    parser.add_argument('--shards', action='store_true',
+                        help="Also write the index split by category, next to --output (<name>_shards/)")
+    args = parser.parse_args()
+    
+    builder = PDFIndexBuilder(raw_dir=args.raw_dir, output_file=args.output, workers=args.workers,
+                              shards=args.shards)
+    builder.run(incremental=not args.full)
+
+
 if __name__ == "__main__":
-    builder = PDFIndexBuilder()
-    builder.run()
+    main()
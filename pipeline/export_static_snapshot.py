@@ -0,0 +1,188 @@
+"""
+Export a static snapshot of the plan catalog.
+
+Plan browsing is read-only and only changes when the index is rebuilt, so it
+can be served as files (by the app's StaticFiles mount at /snapshot, or any
+CDN) instead of by the Python workers. For every index plan this writes its
+parsed JSON and its rendered /pdf-viewer page, plus a JSON and an HTML
+listing per (goal, region, diet). File names carry a hash of their content,
+so they can be cached forever; manifest.json (the only unhashed file) maps
+plan ids and listing keys to the current names.
+
+Usage:
+    python pipeline/export_static_snapshot.py [--index outputs/pdf_index.json]
+        [--out outputs/static_snapshot] [--prune]
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+PROJECT_ROOT = Path(__file__).parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+
+from service.plan_catalog import DEFAULT_INDEX_PATH, PlanCatalog
+from service.pdf_parser import parse_pdf_complete
+from service.recommender_exact.exact_recommender import ExactMatchRecommender
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_OUTPUT_DIR = PROJECT_ROOT / "outputs" / "static_snapshot"
+TEMPLATES_DIR = PROJECT_ROOT / "service" / "templates"
+MANIFEST_NAME = "manifest.json"
+HASH_LENGTH = 12
+
+# Index fields copied into listing entries
+LISTING_FIELDS = ('filename', 'category', 'region', 'diet_type', 'gender', 'bmi_category', 'activity', 'nutrition')
+
+
+def hashed_name(stem: str, suffix: str, content: bytes) -> str:
+    """'12', '.json', b'...' -> '12.3f2a9c0d41be.json'"""
+    return f"{stem}.{hashlib.sha256(content).hexdigest()[:HASH_LENGTH]}{suffix}"
+
+
+def encode_json(data: Any) -> bytes:
+    return json.dumps(data, ensure_ascii=False, sort_keys=True, separators=(',', ':')).encode('utf-8')
+
+
+class SnapshotExporter:
+    """Writes content-hashed plan and listing files plus a manifest into out_dir."""
+
+    def __init__(self, catalog: PlanCatalog, out_dir: Path = DEFAULT_OUTPUT_DIR, index_sha256: str = ''):
+        self.catalog = catalog
+        self.index_sha256 = index_sha256
+        self.out_dir = Path(out_dir)
+        self.env = Environment(loader=FileSystemLoader(str(TEMPLATES_DIR)),
+                               autoescape=select_autoescape(['html']))
+        self.written: List[str] = []
+        self.unchanged = 0
+
+    def write(self, directory: str, stem: str, suffix: str, content: bytes) -> str:
+        """Write content under its hashed name (skipped if already there); returns the relative URL."""
+        relative = f"{directory}/{hashed_name(stem, suffix, content)}"
+        path = self.out_dir / relative
+        if path.exists():
+            self.unchanged += 1
+        else:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(path.suffix + '.tmp')
+            tmp.write_bytes(content)
+            tmp.replace(path)
+            self.written.append(relative)
+        return relative
+
+    def render(self, template: str, **context) -> bytes:
+        return self.env.get_template(template).render(show_nav=False, **context).encode('utf-8')
+
+    def export_plan(self, plan: Dict[str, Any]) -> Dict[str, str]:
+        parsed = parse_pdf_complete(self.catalog.absolute_path(plan))
+        if 'error' in parsed:
+            logger.warning("Skipping plan %s: %s", plan['id'], parsed['error'])
+            return {}
+        stem = str(plan['id'])
+        return {
+            'json': self.write('plans', stem, '.json', encode_json({'plan': plan, 'parsed': parsed})),
+            'html': self.write('plans', stem, '.html', self.render('pdf-viewer.html', plan=parsed)),
+        }
+
+    def listing_keys(self) -> Dict[Tuple[str, str, str], List[Dict[str, Any]]]:
+        """(goal, region, diet) -> plans, for every goal the exact recommender maps to a category."""
+        recommender = ExactMatchRecommender(catalog=self.catalog)
+        by_category: Dict[Tuple[str, str, str], List[Dict[str, Any]]] = {}
+        for plan in self.catalog:
+            key = (plan.get('category') or '', (plan.get('region') or '').lower(),
+                   recommender.normalize_diet_type(plan.get('diet_type') or 'vegetarian'))
+            by_category.setdefault(key, []).append(plan)
+
+        listings = {}
+        for goal, category in recommender.GOAL_TO_CATEGORY.items():
+            for (plan_category, region, diet), plans in by_category.items():
+                if plan_category == category and region:
+                    listings[(goal, region, diet)] = plans
+        return listings
+
+    def export_listing(self, goal: str, region: str, diet: str, plans: List[Dict[str, Any]],
+                       plan_files: Dict[str, Dict[str, str]]) -> Dict[str, str]:
+        directory = f"listings/{goal}/{region}"
+        entries = []
+        for plan in plans:
+            files = plan_files.get(str(plan['id']))
+            if not files:
+                continue
+            entry = {field: plan.get(field) for field in LISTING_FIELDS}
+            entry.update(id=plan['id'], json=files['json'], html=files['html'])
+            entries.append(entry)
+        listing = {'goal': goal, 'region': region, 'diet': diet, 'plans': entries}
+        # Links are relative, so the snapshot works under any mount path or CDN prefix
+        html = self.render('snapshot-listing.html', listing=listing, root='../../../')
+        return {
+            'json': self.write(directory, diet, '.json', encode_json(listing)),
+            'html': self.write(directory, diet, '.html', html),
+            'count': len(entries),
+        }
+
+    def export(self) -> Dict[str, Any]:
+        plan_files = {}
+        for plan in self.catalog:
+            files = self.export_plan(plan)
+            if files:
+                plan_files[str(plan['id'])] = files
+
+        listings = {}
+        for (goal, region, diet), plans in sorted(self.listing_keys().items()):
+            listings[f"{goal}/{region}/{diet}"] = self.export_listing(goal, region, diet, plans, plan_files)
+
+        manifest = {
+            # The app only serves a snapshot built from the index it has loaded
+            'index_sha256': self.index_sha256,
+            'index_total_plans': len(self.catalog),
+            'plans': plan_files,
+            'listings': listings,
+        }
+        manifest_path = self.out_dir / MANIFEST_NAME
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        tmp = manifest_path.with_suffix('.json.tmp')
+        tmp.write_bytes(json.dumps(manifest, ensure_ascii=False, sort_keys=True, indent=1).encode('utf-8'))
+        tmp.replace(manifest_path)
+        return manifest
+
+    def prune(self, manifest: Dict[str, Any]) -> int:
+        """Delete files no longer referenced by the manifest."""
+        live = {MANIFEST_NAME}
+        for files in list(manifest['plans'].values()) + list(manifest['listings'].values()):
+            live.update(v for k, v in files.items() if k in ('json', 'html'))
+        removed = 0
+        for path in self.out_dir.rglob('*'):
+            if path.is_file() and path.relative_to(self.out_dir).as_posix() not in live:
+                path.unlink()
+                removed += 1
+        return removed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the plan catalog as static, content-hashed files")
+    parser.add_argument('--index', default=str(DEFAULT_INDEX_PATH), help="PDF index to export")
+    parser.add_argument('--out', default=str(DEFAULT_OUTPUT_DIR), help="Snapshot directory")
+    parser.add_argument('--prune', action='store_true', help="Delete files from earlier exports")
+    args = parser.parse_args()
+
+    catalog = PlanCatalog.from_file(args.index)
+    exporter = SnapshotExporter(catalog, Path(args.out), catalog.index_sha256)
+    manifest = exporter.export()
+    logger.info("Exported %d plans and %d listings to %s (%d files written, %d unchanged)",
+                len(manifest['plans']), len(manifest['listings']), args.out,
+                len(exporter.written), exporter.unchanged)
+    if args.prune:
+        logger.info("Pruned %d stale files", exporter.prune(manifest))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Aho-Corasick keyword matching.
+
+Finds which of a (possibly large) vocabulary of keywords occur as substrings
+of a text in one pass over the text, however many keywords there are. Uses
+the C implementation from pyahocorasick when it is installed and a pure
+Python automaton otherwise; both give the same results.
+
+The pure Python matcher only walks the distinct runs of keyword characters
+in the text (a keyword can't span any other character), and remembers the
+keywords found in each run, so a word is walked once however often it
+recurs across texts.
+"""
+
+import re
+from collections import deque
+from typing import Dict, FrozenSet, Iterable, List, Set
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+
+# Runs remembered per automaton before the memo is cleared
+RUN_CACHE_SIZE = 100_000
+
+
+class KeywordAutomaton:
+    """Substring matcher for a fixed keyword list; results keep the list's order."""
+
+    def __init__(self, keywords: Iterable[str]):
+        self.keywords: List[str] = list(dict.fromkeys(keywords))
+        if ahocorasick is not None:
+            self._automaton = ahocorasick.Automaton()
+            for i, keyword in enumerate(self.keywords):
+                self._automaton.add_word(keyword, i)
+            self._automaton.make_automaton()
+        else:
+            self._build()
+
+    def _build(self):
+        # Trie: goto[state][char] -> state; out[state] = keyword indices ending here
+        self._goto: List[Dict[str, int]] = [{}]
+        self._out: List[Set[int]] = [set()]
+        for i, keyword in enumerate(self.keywords):
+            state = 0
+            for char in keyword:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto.append({})
+                    self._out.append(set())
+                    self._goto[state][char] = next_state
+                state = next_state
+            self._out[state].add(i)
+
+        # Failure links by breadth-first search (depth-1 states fail to the
+        # root); each state also reports the keywords of its failure state
+        fail = [0] * len(self._goto)
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                f = fail[state]
+                while f and char not in self._goto[f]:
+                    f = fail[f]
+                fail[next_state] = self._goto[f].get(char, 0)
+                self._out[next_state] |= self._out[fail[next_state]]
+        self._fail = fail
+
+        alphabet = sorted({char for keyword in self.keywords for char in keyword})
+        self._runs = re.compile(f"[{''.join(re.escape(c) for c in alphabet)}]+") if alphabet else None
+        self._run_matches: Dict[str, FrozenSet[int]] = {}
+
+    def matches(self, text: str) -> Set[int]:
+        """Indices (into self.keywords) of the keywords that occur in text."""
+        if ahocorasick is not None:
+            if not self.keywords:
+                return set()
+            return {i for _, i in self._automaton.iter(text)}
+
+        found: Set[int] = set()
+        if self._runs is None:
+            return found
+        cache = self._run_matches
+        for run in set(self._runs.findall(text)):
+            hits = cache.get(run)
+            if hits is None:
+                if len(cache) >= RUN_CACHE_SIZE:
+                    cache.clear()
+                hits = cache[run] = self._walk(run)
+            found |= hits
+        return found
+
+    def _walk(self, run: str) -> FrozenSet[int]:
+        goto, fail, out = self._goto, self._fail, self._out
+        hits: Set[int] = set()
+        state = 0
+        for char in run:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if out[state]:
+                hits |= out[state]
+        return frozenset(hits)
+
+    def find(self, text: str) -> List[str]:
+        """Keywords occurring in text, in vocabulary order."""
+        return [self.keywords[i] for i in sorted(self.matches(text))]
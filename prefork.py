@@ -0,0 +1,213 @@
+"""
+Pre-fork production entry point.
+
+The master process loads every read-only structure (plan index and catalog
+columns, the recommenders, optionally the ML embeddings and every parsed
+plan), moves them out of the garbage collector's reach with gc.freeze(),
+then forks N uvicorn workers that accept on one shared socket. Workers only
+read the corpus, so its pages stay shared copy-on-write instead of being
+copied once per worker.
+
+The master restarts workers that exit and periodically logs each worker's
+unique set size (USS, from /proc/<pid>/smaps_rollup): the memory that is
+really that worker's own.
+
+Usage:
+    python prefork.py --host 0.0.0.0 --port 8000 --workers 4
+"""
+import argparse
+import gc
+import logging
+import os
+import signal
+import socket
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+project_home = str(Path(__file__).parent.absolute())
+if project_home not in sys.path:
+    sys.path.insert(0, project_home)
+
+from service.warmup import WORKER_ID_ENV
+
+logger = logging.getLogger("prefork")
+
+
+def preload(include_ml: bool = False, parse_plans: bool = False):
+    """Load the read-only corpus in this process and freeze it; returns the app"""
+    from service import api
+    from service.pdf_parser import parse_pdf_complete
+
+    api.get_recommender()
+    api.get_exact_recommender()
+    api.get_goal_recommender()
+    api.get_schedule_resolver()
+    catalog = api.get_catalog()
+    catalog.freeze()
+    if include_ml:
+        api.get_ml_recommender()
+    if parse_plans:
+        for plan in catalog:
+            path = catalog.absolute_path(plan)
+            if path:
+                parse_pdf_complete(path)
+
+    # Everything allocated so far lives for the life of the workers: keep the
+    # collector from writing to those objects (and dirtying their pages)
+    gc.collect()
+    gc.freeze()
+    logger.info("Preloaded %d plans, %d objects frozen", len(catalog), gc.get_freeze_count())
+    return api.app
+
+
+def memory_usage(pid: int) -> Optional[Dict[str, int]]:
+    """rss / pss / uss in kB for a process, or None where /proc is unavailable"""
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            fields = {}
+            for line in f:
+                name, _, rest = line.partition(":")
+                parts = rest.split()
+                if parts and parts[-1] == "kB":
+                    fields[name] = int(parts[0])
+    except OSError:
+        return None
+    return {
+        "rss": fields.get("Rss", 0),
+        "pss": fields.get("Pss", 0),
+        "uss": fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0),
+    }
+
+
+def bind_socket(host: str, port: int, backlog: int = 2048) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def run_worker(app, sock: socket.socket, args):
+    import uvicorn
+
+    # log_config=None: uvicorn's loggers propagate into the queue set up by service.logging_config
+    config = uvicorn.Config(app, log_config=None, access_log=args.access_log,
+                            timeout_keep_alive=args.keep_alive)
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+class Master:
+    def __init__(self, app, sock: socket.socket, args):
+        self.app = app
+        self.sock = sock
+        self.args = args
+        self.workers: Dict[int, int] = {}  # pid -> worker number
+        self.stopping = False
+
+    def spawn(self, number: int):
+        pid = os.fork()
+        if pid == 0:
+            # Per-worker files (e.g. the query log) are keyed by the worker number
+            os.environ[WORKER_ID_ENV] = str(number)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            code = 0
+            try:
+                run_worker(self.app, self.sock, self.args)
+            except Exception:
+                logger.exception("Worker %d crashed", number)
+                code = 1
+            finally:
+                logging.shutdown()
+                os._exit(code)
+        self.workers[pid] = number
+        logger.info("Started worker %d", number, extra={"pid": pid})
+
+    def stop(self, signum, frame):
+        self.stopping = True
+
+    def report_memory(self):
+        master = memory_usage(os.getpid())
+        if master is None:
+            return
+        logger.info("Master memory", extra={"pid": os.getpid(), **{f"{k}_kb": v for k, v in master.items()}})
+        for pid, number in sorted(self.workers.items(), key=lambda item: item[1]):
+            usage = memory_usage(pid)
+            if usage:
+                logger.info("Worker %d memory", number, extra={"pid": pid, **{f"{k}_kb": v for k, v in usage.items()}})
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        for number in range(self.args.workers):
+            self.spawn(number)
+
+        next_report = time.monotonic() + self.args.report_interval
+        while not self.stopping:
+            pid, status = self._reap()
+            if pid and pid in self.workers and not self.stopping:
+                number = self.workers.pop(pid)
+                logger.warning("Worker %d exited (status %d), restarting", number, status, extra={"pid": pid})
+                self.spawn(number)
+            if self.args.report_interval > 0 and time.monotonic() >= next_report:
+                self.report_memory()
+                next_report = time.monotonic() + self.args.report_interval
+            if not pid:
+                time.sleep(0.5)
+
+        self.shutdown()
+
+    def _reap(self):
+        try:
+            return os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            return 0, 0
+
+    def shutdown(self):
+        logger.info("Stopping %d workers", len(self.workers))
+        for pid in self.workers:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        deadline = time.monotonic() + self.args.graceful_timeout
+        while self.workers and time.monotonic() < deadline:
+            pid, _ = self._reap()
+            if pid:
+                self.workers.pop(pid, None)
+            else:
+                time.sleep(0.1)
+        for pid in self.workers:
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+        self.sock.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the API from pre-forked workers sharing one corpus copy")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=int(os.environ.get("PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("WEB_CONCURRENCY", "2")))
+    parser.add_argument("--include-ml", action="store_true", help="also load the ML recommender and embeddings")
+    parser.add_argument("--parse-plans", action="store_true", help="parse every plan into the shared parse cache")
+    parser.add_argument("--report-interval", type=float, default=300,
+                        help="seconds between per-worker memory reports (0 disables)")
+    parser.add_argument("--graceful-timeout", type=float, default=30)
+    parser.add_argument("--keep-alive", type=int, default=5)
+    parser.add_argument("--access-log", action="store_true")
+    args = parser.parse_args()
+
+    app = preload(include_ml=args.include_ml, parse_plans=args.parse_plans)
+    sock = bind_socket(args.host, args.port)
+    logger.info("Listening on %s:%d with %d workers", args.host, args.port, args.workers)
+    Master(app, sock, args).run()
+
+
+if __name__ == "__main__":
+    main()
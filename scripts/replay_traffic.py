@@ -0,0 +1,181 @@
+"""
+Replay captured traffic against a running instance and compare runs.
+
+Capture traffic by starting the API with TRAFFIC_CAPTURE_PATH set, e.g.
+    TRAFFIC_CAPTURE_PATH=traffic.jsonl uvicorn service.api:app
+
+Then replay it (from the project root) against a local instance:
+    python scripts/replay_traffic.py traffic.jsonl --output baseline.jsonl
+    ... change the recommenders / parser, restart the server ...
+    python scripts/replay_traffic.py traffic.jsonl --output candidate.jsonl --baseline baseline.jsonl
+
+--speed 1 keeps the original pacing, --speed 10 replays ten times faster and
+--speed 0 sends requests back to back. Each run records per-request status,
+latency and a hash of the response body (volatile fields such as
+result_token and took_ms are dropped before hashing, and so is today's date
+where a request left it to the server). With --baseline the run is
+compared request by request and the script exits with status 1 on any
+status/hash mismatch or when p95 latency regresses beyond --max-slowdown.
+"""
+
+import argparse
+import hashlib
+import json
+import sys
+import time
+from typing import Any, Dict, List
+
+import requests
+
+# Response fields that differ between identical runs
+VOLATILE_KEYS = {'result_token', 'start_date', 'ts', 'took_ms', 'timestamp', 'created_at'}
+
+# Fields that depend on the day of the run when the request leaves out its date:
+# the dashboard answers for today and its cycle position moves with it
+TODAY_KEYS = {'/api/dashboard': {'date', 'day', 'days_remaining'}}
+
+
+def volatile_keys(entry: Dict[str, Any], ignore: set) -> set:
+    """Keys to drop before hashing the response to one captured request"""
+    if 'date' in (entry.get('query') or {}):
+        return ignore
+    return ignore | TODAY_KEYS.get(entry['path'], set())
+
+
+def load_jsonl(path: str) -> List[Dict[str, Any]]:
+    with open(path, 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _strip_volatile(value: Any, ignore: set) -> Any:
+    if isinstance(value, dict):
+        return {k: _strip_volatile(v, ignore) for k, v in value.items() if k not in ignore}
+    if isinstance(value, list):
+        return [_strip_volatile(v, ignore) for v in value]
+    return value
+
+
+def response_hash(body: bytes, ignore: set) -> str:
+    """sha256 of the response, JSON (and NDJSON) bodies canonicalized first"""
+    try:
+        lines = body.decode('utf-8').splitlines() or ['']
+        parsed = [_strip_volatile(json.loads(line), ignore) for line in lines if line.strip()]
+        body = json.dumps(parsed, sort_keys=True).encode('utf-8')
+    except (UnicodeDecodeError, ValueError):
+        pass
+    return hashlib.sha256(body).hexdigest()
+
+
+def replay(entries: List[Dict[str, Any]], base_url: str, speed: float, ignore: set, timeout: float) -> List[Dict[str, Any]]:
+    session = requests.Session()
+    results = []
+    first_ts = entries[0]['ts'] if entries else 0
+    started = time.monotonic()
+
+    for i, entry in enumerate(entries):
+        if speed > 0:
+            # Keep the captured spacing between requests, scaled by speed
+            wait = (entry['ts'] - first_ts) / speed - (time.monotonic() - started)
+            if wait > 0:
+                time.sleep(wait)
+
+        headers = {'Accept': entry['accept']} if entry.get('accept') else {}
+        kwargs = {'params': entry.get('query') or None, 'headers': headers, 'timeout': timeout}
+        if 'body' in entry:
+            kwargs['json'] = entry['body']
+
+        request_start = time.perf_counter()
+        try:
+            response = session.request(entry['method'], base_url.rstrip('/') + entry['path'], **kwargs)
+            status, body = response.status_code, response.content
+        except requests.RequestException as e:
+            status, body = None, str(e).encode('utf-8')
+        latency_ms = (time.perf_counter() - request_start) * 1000
+
+        results.append({
+            'i': i,
+            'method': entry['method'],
+            'path': entry['path'],
+            'status': status,
+            'latency_ms': round(latency_ms, 3),
+            'captured_ms': entry.get('duration_ms'),
+            'hash': response_hash(body, volatile_keys(entry, ignore)),
+        })
+    return results
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def compare(baseline: List[Dict[str, Any]], current: List[Dict[str, Any]], max_slowdown: float) -> bool:
+    """Print the comparison; True when the run matches the baseline"""
+    ok = True
+    if len(baseline) != len(current):
+        print(f"Request count differs: baseline {len(baseline)}, current {len(current)}")
+        ok = False
+
+    mismatches = [
+        (b, c) for b, c in zip(baseline, current)
+        if b['status'] != c['status'] or b['hash'] != c['hash']
+    ]
+    for b, c in mismatches[:20]:
+        print(f"  #{c['i']} {c['method']} {c['path']}: status {b['status']} -> {c['status']}"
+              f"{'' if b['hash'] == c['hash'] else ', response changed'}")
+    if mismatches:
+        print(f"{len(mismatches)} responses differ from the baseline")
+        ok = False
+
+    print(f"{'endpoint':<45} {'n':>5} {'p50 base':>10} {'p50 now':>10} {'p95 base':>10} {'p95 now':>10}")
+    by_path = {}
+    for b, c in zip(baseline, current):
+        by_path.setdefault(f"{c['method']} {c['path']}", ([], []))
+        by_path[f"{c['method']} {c['path']}"][0].append(b['latency_ms'])
+        by_path[f"{c['method']} {c['path']}"][1].append(c['latency_ms'])
+    for path, (base, now) in sorted(by_path.items()):
+        print(f"{path:<45} {len(now):>5} {percentile(base, 50):>10.1f} {percentile(now, 50):>10.1f}"
+              f" {percentile(base, 95):>10.1f} {percentile(now, 95):>10.1f}")
+
+    base_p95 = percentile([b['latency_ms'] for b in baseline], 95)
+    now_p95 = percentile([c['latency_ms'] for c in current], 95)
+    print(f"Overall p95: {base_p95:.1f} ms -> {now_p95:.1f} ms")
+    if base_p95 and now_p95 > base_p95 * max_slowdown:
+        print(f"p95 latency regressed by more than {max_slowdown:.2f}x")
+        ok = False
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay captured API traffic and compare against a baseline run")
+    parser.add_argument('capture', help="JSONL capture written by TrafficRecorderMiddleware")
+    parser.add_argument('--base-url', default='http://127.0.0.1:8000')
+    parser.add_argument('--speed', type=float, default=1.0, help="Pace multiplier (0 = no waiting)")
+    parser.add_argument('--output', help="Write this run's per-request results here")
+    parser.add_argument('--baseline', help="Results of an earlier run to compare against")
+    parser.add_argument('--max-slowdown', type=float, default=1.2, help="Allowed p95 latency ratio vs baseline")
+    parser.add_argument('--ignore-key', action='append', default=[], help="Extra response key to drop before hashing")
+    parser.add_argument('--timeout', type=float, default=60.0)
+    args = parser.parse_args()
+
+    entries = load_jsonl(args.capture)
+    print(f"Replaying {len(entries)} requests against {args.base_url} (speed {args.speed})")
+    results = replay(entries, args.base_url, args.speed, VOLATILE_KEYS | set(args.ignore_key), args.timeout)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            for result in results:
+                f.write(json.dumps(result) + "\n")
+        print(f"Results written to {args.output}")
+
+    if args.baseline:
+        if not compare(load_jsonl(args.baseline), results, args.max_slowdown):
+            sys.exit(1)
+        print("✅ Replay matches the baseline")
+
+
+if __name__ == "__main__":
+    main()
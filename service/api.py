@@ -1,67 +1,226 @@
 from __future__ import annotations
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse, RedirectResponse
+from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse, Response, StreamingResponse
 from fastapi.templating import Jinja2Templates
 from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any
 from datetime import datetime, timedelta
 
 from pathlib import Path
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+import contextvars
 import json
+import logging
+import os
+import threading
+import copy
+import hashlib
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
 
 # Local imports
 from service.pdf_recommender import PDFRecommender, UserProfile
-from service.pdf_parser import parse_pdf_complete
+from service.pdf_parser import parse_pdf_complete, parse_cache
+from service.prefetch import ParsePrefetcher
+from service.match_cache import MatchCache
+from service.warmup import QueryLog, warm_caches
+from service.traffic import TrafficRecorderMiddleware
+from service.logging_config import configure_logging
+from service.hot_reload import SnapshotManager, SnapshotMiddleware
+from service.plan_catalog import DEFAULT_INDEX_PATH, PROJECT_ROOT, load_catalog
+from service.meal_schedule import MealScheduleResolver, new_schedule, is_schedule, day_offset
+from service.result_store import ResultSetStore
+from service.search_index import SearchIndex, build_search_index
+from service.nutrition_index import RANGE_FIELDS, NutritionIndex, rank_by_targets
+
+# Queue-backed logging (LOG_LEVEL / LOG_LEVELS / LOG_FORMAT / LOG_DEBUG_SAMPLE)
+configure_logging()
+logger = logging.getLogger(__name__)
+
+# Recommendation result sets, so select only needs (result_token, selected_ids)
+result_store = ResultSetStore()
+
+# Background parsing of the cards users are likely to pick
+PREFETCH_TOP_N = 5
+parse_prefetcher = ParsePrefetcher(parse_pdf_complete, is_cached=parse_cache.__contains__)
+_prefetch_handles = OrderedDict()  # result token -> PrefetchHandle
+_prefetch_handles_lock = threading.Lock()  # endpoints run on the threadpool
+
+def _store_results(plans: List[Dict[str, Any]]) -> str:
+    """Hold a result set for select and start parsing its top plans in the background"""
+    token = result_store.put(plans)
+    paths = [resolve_pdf_path(p['file_path']) for p in plans[:PREFETCH_TOP_N] if p.get('file_path')]
+    handle = parse_prefetcher.schedule(paths)
+    with _prefetch_handles_lock:
+        _prefetch_handles[token] = handle
+        while len(_prefetch_handles) > result_store.max_sets:
+            _prefetch_handles.popitem(last=False)
+    return token
+
+# Exact, goal-only and weighted matches per normalized profile
+def get_match_cache() -> MatchCache:
+    return corpus.active().get("match_cache")
+
+def _match_exact(profile: Dict[str, Any]) -> Dict[str, Any]:
+    return get_match_cache().get_or_compute("exact", profile, lambda: get_exact_recommender().recommend(profile, top_k=10))
+
+def _match_goal(profile: Dict[str, Any]) -> Dict[str, Any]:
+    return get_match_cache().get_or_compute("goal", profile, lambda: get_goal_recommender().recommend(profile, top_k=10))
+
+def _match_weighted(profile: Dict[str, Any]) -> List[Dict[str, Any]]:
+    plans = get_match_cache().get_or_compute(
+        "weighted", profile, lambda: get_recommender().recommend(_weighted_user_profile(profile), top_k=10))
+    return list(plans)
+
+# Recorded recommendation queries, replayed at startup to warm the caches
+QUERY_LOG_ENABLED = os.environ.get("QUERY_LOG_ENABLED", "1") != "0"
+WARMUP_TOP_N = int(os.environ.get("WARMUP_TOP_N", "20"))
+_query_logs: Dict[str, QueryLog] = {}
+
+def get_query_log() -> QueryLog:
+    """Query log in the current DATA_DIR"""
+    path = DATA_DIR / "query_log.jsonl"
+    query_log = _query_logs.get(str(path))
+    if query_log is None:
+        query_log = _query_logs.setdefault(str(path), QueryLog(path))
+    return query_log
+
+def _record_query(system: str, profile: Dict[str, Any]):
+    if not QUERY_LOG_ENABLED:
+        return
+    try:
+        get_query_log().record(system, profile)
+    except OSError as e:
+        logger.warning("Could not record query: %s", e)
+
+def _replay_query(system: str, profile: Dict[str, Any]):
+    """Run a recorded query the way its endpoint would, filling every cache on the way"""
+    profile = _normalize_profile(dict(profile))
+    if system == "compare":
+        for sub_system in COMPARE_SYSTEMS:
+            _replay_query(sub_system, profile)
+        return
+
+    if system == "exact":
+        plans = _match_exact(profile).get('recommendations', [])
+        extract_meals = _extract_card_meals_complete
+    elif system == "goal":
+        plans = _match_goal(profile).get('recommendations', [])
+        extract_meals = _extract_card_meals_simple
+    elif system == "weighted":
+        plans = _match_weighted(profile)
+        extract_meals = _extract_card_meals_simple
+    else:
+        return
+
+    for plan in plans:
+        _card_blob(plan, extract_meals)
+    for plan in plans[:PREFETCH_TOP_N]:
+        if plan.get('file_path'):
+            parse_pdf_complete(resolve_pdf_path(plan['file_path']))
+
+def _start_cache_warmup():
+    """Replay the most frequent recorded queries in a background thread"""
+    if WARMUP_TOP_N <= 0:
+        return
+    query_log = get_query_log()
+    if not query_log.files():
+        return
+    threading.Thread(
+        target=warm_caches, args=(query_log, WARMUP_TOP_N, _replay_query), name="cache-warmup", daemon=True
+    ).start()
+
+def _build_exact_recommender(snapshot):
+    try:
+        from service.recommender_exact.exact_recommender import ExactMatchRecommender
+    except ModuleNotFoundError:
+        from recommender_exact.exact_recommender import ExactMatchRecommender
+    return ExactMatchRecommender(catalog=snapshot.get("catalog"))
 
-# Cache recommenders to avoid reloading 460 plans on every request
-_recommender_cache = None
-_exact_recommender_cache = None
-_goal_recommender_cache = None
-_ml_recommender_cache = None
+def _build_goal_recommender(snapshot):
+    try:
+        from service.recommender_goal.goal_recommender import GoalOnlyRecommender
+    except ModuleNotFoundError:
+        from recommender_goal.goal_recommender import GoalOnlyRecommender
+    return GoalOnlyRecommender(catalog=snapshot.get("catalog"))
+
+def _build_ml_recommender(snapshot):
+    try:
+        from service.recommender_ml.ml_recommender import MLRecommender
+    except ModuleNotFoundError:
+        from recommender_ml.ml_recommender import MLRecommender
+    return MLRecommender(index_path=str(DEFAULT_INDEX_PATH), embeddings_path=str(EMBEDDINGS_PATH),
+                         search_index=snapshot.get("search"))
+
+def _build_search_index(snapshot):
+    """Search index from the build when it was built from the snapshot's index, else plan text only"""
+    catalog = snapshot.get("catalog")
+    search = SearchIndex.load(SEARCH_INDEX_PATH)
+    # The catalog may come from a shard manifest or binary index: compare with the
+    # sha256 of the JSON index it was loaded or converted from
+    if search is not None and catalog.index_sha256 is not None and search.index_sha256 == catalog.index_sha256:
+        return search
+    logger.warning("Search index %s is missing or stale, indexing plan text only (no meal options)", SEARCH_INDEX_PATH)
+    return build_search_index(catalog, catalog.absolute_path)
+
+# Everything derived from the index lives in a corpus snapshot: recommenders are
+# built once per index version (instead of reloading 460 plans per request) and a
+# rebuilt index is swapped in without a restart (see service/hot_reload.py)
+EMBEDDINGS_PATH = PROJECT_ROOT / "outputs" / "pdf_embeddings.npy"
+SEARCH_INDEX_PATH = Path(os.environ.get("SEARCH_INDEX_PATH", PROJECT_ROOT / "outputs" / "pdf_search.json"))
+HOT_RELOAD_INTERVAL = float(os.environ.get("HOT_RELOAD_INTERVAL", "5"))
+corpus = SnapshotManager(
+    factories={
+        "catalog": lambda snapshot: load_catalog(DEFAULT_INDEX_PATH),
+        "recommender": lambda snapshot: PDFRecommender(catalog=snapshot.get("catalog")),
+        "exact": _build_exact_recommender,
+        "goal": _build_goal_recommender,
+        "ml": _build_ml_recommender,
+        "search": _build_search_index,
+        "nutrition": lambda snapshot: NutritionIndex.from_catalog(snapshot.get("catalog")),
+        "schedule_resolver": lambda snapshot: MealScheduleResolver(snapshot.get("recommender")),
+        "match_cache": lambda snapshot: MatchCache(),
+        "card_blobs": lambda snapshot: {},
+    },
+    watch=[DEFAULT_INDEX_PATH, EMBEDDINGS_PATH, SEARCH_INDEX_PATH],
+    interval=HOT_RELOAD_INTERVAL,
+    eager=("catalog", "recommender"),
+)
 
 def get_recommender():
-    global _recommender_cache
-    if _recommender_cache is None:
-        _recommender_cache = PDFRecommender()
-    return _recommender_cache
+    return corpus.active().get("recommender")
 
 def get_exact_recommender():
-    global _exact_recommender_cache
-    if _exact_recommender_cache is None:
-        try:
-            from service.recommender_exact.exact_recommender import ExactMatchRecommender
-        except ModuleNotFoundError:
-            from recommender_exact.exact_recommender import ExactMatchRecommender
-        _exact_recommender_cache = ExactMatchRecommender()
-    return _exact_recommender_cache
+    return corpus.active().get("exact")
 
 def get_goal_recommender():
-    global _goal_recommender_cache
-    if _goal_recommender_cache is None:
-        try:
-            from service.recommender_goal.goal_recommender import GoalOnlyRecommender
-        except ModuleNotFoundError:
-            from recommender_goal.goal_recommender import GoalOnlyRecommender
-        _goal_recommender_cache = GoalOnlyRecommender()
-    return _goal_recommender_cache
+    return corpus.active().get("goal")
 
 def get_ml_recommender():
     """Get cached ML recommender (RAG + Fine-tuned)"""
-    global _ml_recommender_cache
-    if _ml_recommender_cache is None:
-        try:
-            from service.recommender_ml.ml_recommender import MLRecommender
-        except ModuleNotFoundError:
-            from recommender_ml.ml_recommender import MLRecommender
-        _ml_recommender_cache = MLRecommender()
-    return _ml_recommender_cache
+    return corpus.active().get("ml")
+
+def get_schedule_resolver():
+    """Get cached meal schedule resolver (memoizes computed days)"""
+    return corpus.active().get("schedule_resolver")
+
+def get_catalog():
+    """Shared plan catalog (id / path lookups over the index)"""
+    return corpus.active().get("catalog")
 
 def resolve_pdf_path(file_path: str) -> str:
     """Convert relative PDF path to absolute path with forward slashes for URLs"""
     if not file_path:
         return file_path
     
+    # Index plans have their absolute path precomputed in the catalog
+    catalog = get_catalog()
+    plan = catalog.find(file_path)
+    if plan is not None:
+        return catalog.absolute_path(plan)
+    
     # Normalize path separators first (convert Windows backslashes to forward slashes)
     file_path = file_path.replace('\\', '/')
     
@@ -165,9 +324,186 @@ def extract_meals_from_pdf(file_path: str) -> List[Dict[str, str]]:
         
         return meals[:6]  # Return max 6 meal types to keep cards compact
     except Exception as e:
-        print(f"Error extracting meals from {file_path}: {e}")
+        logger.warning("Error extracting meals from %s: %s", file_path, e)
         return []
 
+# Chronological meal order used by the comprehensive-parser cards
+CARD_MEAL_ORDER = [
+    'Early Morning (on Waking)',
+    'Early Morning',
+    'Pre-Yoga / Light Activity',
+    'Pre-Activity',
+    'Pre-Breakfast',
+    'Breakfast (Post-Yoga / Morning Meal)',
+    'Breakfast',
+    'Mid-Morning Snack',
+    'Mid-Morning',
+    'Lunch',
+    'Evening Snack',
+    'Evening',
+    'Dinner',
+    'Bedtime Snack',
+    'Bedtime'
+]
+
+CARD_MEAL_ICONS = {
+    'Early Morning (on Waking)': '☀️',
+    'Early Morning': '☀️',
+    'Pre-Yoga / Light Activity': '🏃',
+    'Pre-Activity': '🏃',
+    'Pre-Breakfast': '🌅',
+    'Breakfast (Post-Yoga / Morning Meal)': '🍳',
+    'Breakfast': '🍳',
+    'Mid-Morning Snack': '☕',
+    'Mid-Morning': '☕',
+    'Lunch': '🍛',
+    'Evening Snack': '🍵',
+    'Evening': '🍵',
+    'Dinner': '🌙',
+    'Bedtime Snack': '😴',
+    'Bedtime': '😴'
+}
+
+def _extract_card_meals_simple(plan: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Card meals via the quick text scan (first 3 options per meal type)"""
+    file_path = plan.get('file_path', '')
+    return extract_meals_from_pdf(file_path) if file_path else []
+
+class FallbackMeals(list):
+    """Card meals from a fallback extraction after a failed parse; never cached"""
+
+def _extract_card_meals_complete(plan: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Card meals via the comprehensive parser, falling back to the quick scan"""
+    file_path = plan.get('file_path', '')
+    absolute_file_path = resolve_pdf_path(file_path)
+
+    meals = []
+    try:
+        parsed_data = parse_pdf_complete(absolute_file_path)
+
+        # Convert to format expected by frontend
+        meals_dict = {}
+        for meal in parsed_data.get('meals', []):
+            if meal.get('options'):
+                meal_type = meal['meal_type']
+                meals_dict[meal_type] = {
+                    'type': meal_type,
+                    'icon': CARD_MEAL_ICONS.get(meal_type, '🍽️'),
+                    'options': [opt['name'] for opt in meal['options'][:3]]
+                }
+
+        # Sort meals by chronological order
+        for meal_type in CARD_MEAL_ORDER:
+            if meal_type in meals_dict:
+                meals.append(meals_dict[meal_type])
+
+    except Exception as e:
+        logger.warning("Error parsing PDF %s: %s", absolute_file_path, e)
+        # Fallback to simple extraction, for this response only: the parse may succeed next time
+        meals = FallbackMeals(_extract_card_meals_simple(plan))
+
+    return meals
+
+def build_plan_card(i: int, plan: Dict[str, Any], meals: List[Dict[str, Any]], include_score: bool = False) -> Dict[str, Any]:
+    """Format one index plan as a recommendation card for the frontend"""
+    nutrition = plan.get('nutrition', {})
+
+    # "id" and "score" first: _iter_cards splices them onto the cached rest of the card
+    card = {"id": i}
+    if include_score:
+        card["score"] = round(plan.get('recommendation_score', 0), 1)
+    card.update({
+        "plan_id": plan.get('id'),
+        "file_path": resolve_pdf_path(plan.get('file_path', '')),
+        "filename": plan.get('filename', ''),
+        "category": plan.get('category', 'N/A'),
+        "region": plan.get('region', 'N/A'),
+        "diet_type": plan.get('diet_type', 'N/A'),
+        "meals": meals,
+        "calories": f"{nutrition.get('calories_min', 0)}-{nutrition.get('calories_max', 0)} kcal",
+        "protein": f"{nutrition.get('protein_min', 0)}-{nutrition.get('protein_max', 0)} g",
+        "carbs": f"{nutrition.get('carbs_min', 0)}-{nutrition.get('carbs_max', 0)} g",
+        "fat": f"{nutrition.get('fat_min', 0)}-{nutrition.get('fat_max', 0)} g",
+        "fiber": f"{nutrition.get('fiber_min', 0)}-{nutrition.get('fiber_max', 0)} g"
+    })
+    return card
+
+class PreEncodedJSONResponse(Response):
+    """JSON response whose body is already encoded bytes (no jsonable_encoder pass)"""
+    media_type = "application/json"
+
+def _encode_json(data: Any) -> bytes:
+    return json.dumps(data, separators=(",", ":"), default=str).encode("utf-8")
+
+def _card_blob(plan: Dict[str, Any], extract_meals) -> bytes:
+    """Card for plan serialized once (on first use) and reused by every response
+
+    The corpus snapshot's "card_blobs" maps (meal extractor, plan file_path) to the
+    encoded card members, without the per-response "id"/"score" and the braces.
+    Cards built from fallback meals (a failed parse) are not cached.
+    """
+    card_blobs = corpus.active().get("card_blobs")
+    key = (extract_meals.__name__, plan.get('file_path'))
+    blob = card_blobs.get(key) if key[1] else None
+    if blob is None:
+        meals = extract_meals(plan)
+        card = build_plan_card(0, plan, meals)
+        del card["id"]
+        blob = _encode_json(card)[1:-1]
+        if key[1] and not isinstance(meals, FallbackMeals):
+            card_blobs[key] = blob
+    return blob
+
+def _iter_cards(plans: List[Dict[str, Any]], extract_meals, include_score: bool = False):
+    """Yield encoded cards one at a time so each is ready as soon as its meals are extracted
+
+    Each card is the per-response members spliced onto the plan's cached blob:
+    {"id":i[,"score":s],<blob>}
+    """
+    for i, plan in enumerate(plans):
+        head = b'{"id":' + str(i).encode("ascii") + b","
+        if include_score:
+            head += b'"score":' + _encode_json(round(plan.get('recommendation_score', 0), 1)) + b","
+        yield head + _card_blob(plan, extract_meals) + b"}"
+
+def _cards_response(summary: Dict[str, Any], cards) -> PreEncodedJSONResponse:
+    """{...summary, "recommendations": [cards]} assembled from encoded cards"""
+    envelope = _encode_json(summary)[:-1]
+    if summary:
+        envelope += b","
+    body = envelope + b'"recommendations":[' + b",".join(cards) + b"]}"
+    return PreEncodedJSONResponse(body)
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+def _wants_ndjson(request: Request) -> bool:
+    """Opt-in streaming: the client asked for newline-delimited JSON"""
+    return NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+def _ndjson_response(summary: Dict[str, Any], cards, event: str = "card") -> StreamingResponse:
+    """Stream the match summary first, then one line per card, then a done marker
+
+    Lines:
+        {"event": "summary", ...summary fields}
+        {"event": "card", "card": {...}}   (one per recommendation)
+        {"event": "done", "count": n}
+
+    Other item streams pass their own event name (e.g. "day" for date ranges).
+    """
+    def lines():
+        yield json.dumps({"event": "summary", **summary}, default=str) + "\n"
+        count = 0
+        for card in cards:
+            count += 1
+            if isinstance(card, bytes):
+                # Pre-encoded card, splice it in as is
+                yield b'{"event":"' + event.encode("ascii") + b'","' + event.encode("ascii") + b'":' + card + b"}\n"
+            else:
+                yield json.dumps({"event": event, event: card}, default=str) + "\n"
+        yield json.dumps({"event": "done", "count": count}) + "\n"
+
+    return StreamingResponse(lines(), media_type=NDJSON_MEDIA_TYPE)
+
 def parse_range_value(value: Any) -> float:
     """Parse range values like '70-72', '30-35', or single values like '70'
     Returns the middle value of the range
@@ -232,10 +568,79 @@ def validate_plan(category, plan_items):
     # This is now handled within llama_service via allergen safety checks
     return True
 
-app = FastAPI(title="Nutrition Digital Twin API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm caches from recorded traffic without delaying startup
+    _start_cache_warmup()
+    corpus.start()
+    yield
+    corpus.stop()
+
+app = FastAPI(title="Nutrition Digital Twin API", lifespan=lifespan)
+# Each request (streamed bodies included) runs on the corpus snapshot it started with
+app.add_middleware(SnapshotMiddleware, manager=corpus)
+
+# Opt-in request capture (personal and health data scrubbed) for scripts/replay_traffic.py
+TRAFFIC_CAPTURE_PATH = os.environ.get("TRAFFIC_CAPTURE_PATH")
+if TRAFFIC_CAPTURE_PATH:
+    app.add_middleware(TrafficRecorderMiddleware, path=TRAFFIC_CAPTURE_PATH)
 templates = Jinja2Templates(directory=str(Path(__file__).parent / "templates"))
 app.mount("/static", StaticFiles(directory=str(Path(__file__).parent / "static")), name="static")
 
+class SnapshotFiles(StaticFiles):
+    """Static catalog snapshot: content-hashed files are immutable, the manifest is revalidated.
+
+    Nothing is served (404) while the snapshot was exported from another index
+    than the active corpus snapshot's, e.g. after a hot reload.
+    """
+
+    async def __call__(self, scope, receive, send):
+        if not snapshot_is_current(Path(self.directory)):
+            raise HTTPException(status_code=404, detail="No static snapshot for the current index")
+        await super().__call__(scope, receive, send)
+
+    def file_response(self, full_path, stat_result, scope, status_code=200):
+        response = super().file_response(full_path, stat_result, scope, status_code)
+        if Path(full_path).name == "manifest.json":
+            response.headers["Cache-Control"] = "no-cache"
+        else:
+            response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+        return response
+
+# Pre-rendered plan pages and listings from pipeline/export_static_snapshot.py
+SNAPSHOT_DIR = Path(os.environ.get("STATIC_SNAPSHOT_DIR", Path(__file__).parent.parent / "outputs" / "static_snapshot"))
+
+# ((directory, corpus generation, manifest file), whether they match) of the last check
+_snapshot_check = (None, False)
+
+def snapshot_is_current(directory: Path = SNAPSHOT_DIR) -> bool:
+    """True if the snapshot in directory was exported from the index of the active corpus snapshot"""
+    global _snapshot_check
+    manifest_path = directory / "manifest.json"
+    try:
+        stat = manifest_path.stat()
+    except OSError:
+        return False
+    snapshot = corpus.active()
+    # The exporter replaces the manifest, so a new export is a new inode
+    key = (str(directory), snapshot.generation, stat.st_ino, stat.st_mtime_ns, stat.st_size)
+    checked, current = _snapshot_check
+    if checked == key:
+        return current
+    try:
+        with open(manifest_path, "rb") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return False
+    index_sha256 = snapshot.get("catalog").index_sha256
+    current = index_sha256 is not None and manifest.get("index_sha256") == index_sha256
+    if not current:
+        logger.warning("Static snapshot in %s is stale, not serving it", directory)
+    _snapshot_check = (key, current)
+    return current
+
+app.mount("/snapshot", SnapshotFiles(directory=str(SNAPSHOT_DIR), check_dir=False), name="snapshot")
+
 # Simple in-memory storage (replace with database in production)
 DATA_DIR = Path(__file__).parent / "data"
 DATA_DIR.mkdir(exist_ok=True)
@@ -252,9 +657,47 @@ def load_json_file(filename):
             return None
     return None
 
+# filename -> saves by this process, so validators change even when a rewrite
+# keeps the file's size and mtime (coarse filesystem timestamps)
+_data_writes: Dict[str, int] = {}
+_data_writes_lock = threading.Lock()
+
 def save_json_file(filename, data):
     filepath = DATA_DIR / filename
     filepath.write_text(json.dumps(data, indent=2, default=str))
+    with _data_writes_lock:
+        _data_writes[filename] = _data_writes.get(filename, 0) + 1
+    _date_index_cache.pop(filename, None)
+
+# filename -> ((path, saves, mtime_ns, size), document, {date: entry})
+_date_index_cache: Dict[str, tuple] = {}
+
+def load_date_indexed(filename):
+    """Load a JSON file together with a date-keyed index of its list entries.
+
+    Both are cached until the file is saved or its stat changes, so range
+    reads and per-day lookups don't re-parse and re-scan the file on every
+    request. The returned objects are shared; callers must not mutate them.
+    """
+    filepath = DATA_DIR / filename
+    # Taken before reading, so a save that races the read is not cached as current
+    writes = _data_writes.get(filename, 0)
+    try:
+        stat = filepath.stat()
+    except FileNotFoundError:
+        return None, {}
+    key = (str(filepath), writes, stat.st_mtime_ns, stat.st_size)
+
+    cached = _date_index_cache.get(filename)
+    if cached and cached[0] == key:
+        return cached[1], cached[2]
+
+    data = load_json_file(filename)
+    index = {}
+    if isinstance(data, list):
+        index = {entry.get("date"): entry for entry in data if isinstance(entry, dict)}
+    _date_index_cache[filename] = (key, data, index)
+    return data, index
 
 
 class Profile(BaseModel):
@@ -340,7 +783,9 @@ def choose_system_page(request: Request):
 @app.get("/get-recommendations", response_class=HTMLResponse)
 def get_recommendations_page(request: Request):
     """Page to view recommendations from selected system"""
-    return templates.TemplateResponse("get-recommendations.html", {"request": request, "show_nav": False})
+    return templates.TemplateResponse("get-recommendations.html", {
+        "request": request, "show_nav": False, "snapshot": snapshot_is_current()
+    })
 
 @app.get("/generate-plan", response_class=HTMLResponse)
 def generate_plan_page(request: Request):
@@ -350,6 +795,126 @@ def generate_plan_page(request: Request):
 def daily_feedback_page(request: Request):
     return templates.TemplateResponse("daily-feedback.html", {"request": request, "show_nav": False})
 
+@app.get("/api/corpus")
+def corpus_status():
+    """Corpus snapshot generation and how many requests each live snapshot is serving"""
+    return corpus.stats()
+
+MAX_SEARCH_RESULTS = 100
+
+@app.get("/api/search")
+def search_plans(
+    q: str = Query(..., min_length=1),
+    kind: Optional[str] = Query(None, pattern="^(plan|meal)$"),
+    limit: int = Query(20, ge=1, le=MAX_SEARCH_RESULTS),
+):
+    """Full-text search over plans and meal options: words, "phrases" and prefix* terms, all required"""
+    started = time.perf_counter()
+    catalog = corpus.active().get("catalog")
+    total, hits = corpus.active().get("search").search(q, kind=kind, limit=limit)
+    results = []
+    for hit in hits:
+        plan = catalog.get(hit['plan_id']) or {}
+        results.append({**hit, 'filename': plan.get('filename'), 'category': plan.get('category')})
+    return {
+        "query": q,
+        "total": total,
+        "results": results,
+        "took_ms": round((time.perf_counter() - started) * 1000, 2),
+    }
+
+@app.get("/api/plans/query")
+def query_plans(
+    request: Request,
+    age: Optional[float] = Query(None, ge=0),
+    target_calories: Optional[float] = Query(None, gt=0),
+    target_protein: Optional[float] = Query(None, gt=0),
+    limit: int = Query(50, ge=1, le=MAX_SEARCH_RESULTS),
+):
+    """Plans by nutrition and age band, e.g. ?calories_min=1800&calories_max=2000&age=34
+
+    <band>_min / <band>_max (calories, protein, carbs, fat, fiber) select plans
+    whose band overlaps the range (either bound may be left open); age selects
+    plans whose age band covers it. Matches are ranked like the weighted
+    recommender's, closest to target_calories / target_protein first; a
+    missing target defaults to the midpoint of that band's closed range.
+    Without any target results are in index order.
+    """
+    started = time.perf_counter()
+    bands = {}
+    for band in RANGE_FIELDS:
+        if band == 'age':
+            continue
+        bounds = []
+        for bound in ('min', 'max'):
+            value = request.query_params.get(f"{band}_{bound}")
+            try:
+                bounds.append(float(value) if value not in (None, '') else None)
+            except ValueError:
+                raise HTTPException(status_code=422, detail=f"{band}_{bound} must be a number")
+        if None not in bounds and bounds[0] > bounds[1]:
+            raise HTTPException(status_code=422, detail=f"{band}_min must not be greater than {band}_max")
+        if bounds != [None, None]:
+            bands[band] = tuple(bounds)
+    if age is not None:
+        bands['age'] = (age, age)
+
+    targets = {}
+    for band, target in (('calories', target_calories), ('protein', target_protein)):
+        if target is None and None not in bands.get(band, (None,)):
+            target = sum(bands[band]) / 2
+        if target:
+            targets[band] = target
+
+    catalog = corpus.active().get("catalog")
+    plan_ids = corpus.active().get("nutrition").query(bands)
+    if targets:
+        plans = rank_by_targets([catalog.get(plan_id) for plan_id in plan_ids], targets)[:limit]
+    else:
+        plans = [catalog.get(plan_id) for plan_id in plan_ids[:limit]]
+    results = []
+    for plan in plans:
+        results.append({
+            "plan_id": plan['id'],
+            "filename": plan.get('filename'),
+            "category": plan.get('category'),
+            "nutrition": plan.get('nutrition'),
+            "age_info": plan.get('age_info'),
+        })
+    return {
+        "query": {band: list(bounds) for band, bounds in bands.items()},
+        "targets": targets,
+        "total": len(plan_ids),
+        "results": results,
+        "took_ms": round((time.perf_counter() - started) * 1000, 2),
+    }
+
+@app.get("/api/plans/facets")
+def plan_facets(
+    goal: Optional[str] = None,
+    gender: Optional[str] = None,
+    region: Optional[str] = None,
+    diet_type: Optional[str] = None,
+    activity_level: Optional[str] = None,
+    bmi_category: Optional[str] = None,
+    bmi: Optional[float] = Query(None, gt=0),
+):
+    """Exact-match plan counts for the given profile fields, per value of each field (availability hints)"""
+    started = time.perf_counter()
+    recommender = get_exact_recommender()
+    if goal and goal not in recommender.GOAL_TO_CATEGORY:
+        raise HTTPException(status_code=400, detail=f"Unknown goal: {goal}")
+    profile = {"goal": goal, "gender": gender, "region": region, "diet_type": diet_type,
+               "activity_level": activity_level, "bmi_category": bmi_category}
+    if bmi is not None and not bmi_category:
+        profile["bmi_category"] = get_bmi_category(bmi, goal)
+    result = recommender.facets(profile)
+    return {
+        **result,
+        "query": {field: value for field, value in profile.items() if value},
+        "took_ms": round((time.perf_counter() - started) * 1000, 2),
+    }
+
 @app.get("/ping")
 def ping():
     return {"pong": True}
@@ -421,12 +986,14 @@ def get_profile():
         raise HTTPException(status_code=404, detail="Profile not found")
     
     # Merge with user data if available
-    users = load_json_file("users.json") or {}
+    return _merge_user_details(profile, load_json_file("users.json") or {})
+
+def _merge_user_details(profile: Dict[str, Any], users: Dict[str, Any]) -> Dict[str, Any]:
+    """Copy name/email from the account record onto the profile"""
     user_email = profile.get("email")
     if user_email and user_email in users:
         profile["name"] = users[user_email].get("name")
         profile["email"] = user_email
-    
     return profile
 
 @app.post("/api/auth/signup")
@@ -490,11 +1057,22 @@ def new_cycle():
     save_json_file("profile.json", profile)
     return {"status": "success"}
 
+def _meal_plan_for_date(meal_plans: Any, date: str) -> Optional[Dict[str, Any]]:
+    """Daily plan for date from a stored schedule (computed) or a legacy list of days"""
+    if is_schedule(meal_plans):
+        return get_schedule_resolver().plan_for_date(meal_plans, date)
+    return next((p for p in meal_plans or [] if p.get("date") == date), None)
+
+def _indexed_meal_plan_for_date(meal_plans: Any, plans_by_date: Dict[str, Any], date: str) -> Optional[Dict[str, Any]]:
+    """Same as _meal_plan_for_date, using the date index for legacy lists"""
+    if is_schedule(meal_plans):
+        return get_schedule_resolver().plan_for_date(meal_plans, date)
+    return plans_by_date.get(date)
+
 @app.get("/api/meal-plan")
 def get_meal_plan(date: str):
     """Get meal plan for a specific date"""
-    meal_plans = load_json_file("meal_plans.json") or []
-    plan = next((p for p in meal_plans if p.get("date") == date), None)
+    plan = _indexed_meal_plan_for_date(*load_date_indexed("meal_plans.json"), date)
     
     if not plan:
         # No meal plan found - user needs to select plans from recommendations
@@ -502,23 +1080,92 @@ def get_meal_plan(date: str):
     
     return plan
 
-@app.post("/api/meal-plan/generate")
-def generate_meal_plan(data: Dict[str, Any]):
-    """Generate meal plan recommendations from PDF database"""
+MAX_RANGE_PAGE = 366
+
+def _date_range_page(from_date: str, to_date: str, offset: int, limit: int):
+    """Validate a from/to range and return (dates on this page, paging summary)"""
+    try:
+        start = datetime.strptime(from_date, "%Y-%m-%d")
+        end = datetime.strptime(to_date, "%Y-%m-%d")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="from and to must be YYYY-MM-DD dates")
+    if end < start:
+        raise HTTPException(status_code=400, detail="to must not be before from")
+    if offset < 0 or not 1 <= limit <= MAX_RANGE_PAGE:
+        raise HTTPException(status_code=400, detail=f"offset must be >= 0 and limit between 1 and {MAX_RANGE_PAGE}")
+
+    total = (end - start).days + 1
+    dates = [
+        (start + timedelta(days=i)).strftime("%Y-%m-%d")
+        for i in range(offset, min(offset + limit, total))
+    ]
+    next_offset = offset + limit if offset + limit < total else None
+    summary = {
+        "from": from_date,
+        "to": to_date,
+        "total": total,
+        "offset": offset,
+        "limit": limit,
+        "next_offset": next_offset,
+    }
+    return dates, summary
+
+def _range_response(request: Request, summary: Dict[str, Any], days):
+    """Paged range as one JSON object, or streamed as NDJSON day lines"""
+    if _wants_ndjson(request):
+        return _ndjson_response(summary, days, event="day")
+    return {**summary, "days": list(days)}
+
+def _primary_goal(profile: Dict[str, Any]) -> str:
+    """First entry of the goals array (weight_loss if none)"""
+    goals = profile.get("goals", ["weight_loss"])
+    return goals[0] if isinstance(goals, list) and goals else profile.get("goal") or "weight_loss"
+
+def _normalize_profile(profile: Dict[str, Any]) -> Dict[str, Any]:
+    """Parse range inputs and fill in the BMI category, in place
+
+    Handles range inputs:
+    - Age: '30-35 years' -> 32.5
+    - Height: '162 cm' or '160-165 cm' -> middle value
+    - Weight: '70-72 kg' -> 71.0
+    """
+    # Parse range values for age, height, weight
+    for field in ('age', 'height', 'weight'):
+        if field in profile:
+            profile[field] = parse_range_value(profile[field])
+    
+    # Calculate BMI category if not present
+    if 'bmi_category' not in profile or not profile['bmi_category']:
+        bmi = profile.get('bmi', 0)
+        if bmi == 0 and profile.get('height') and profile.get('weight'):
+            height_m = profile['height'] / 100
+            bmi = profile['weight'] / (height_m ** 2)
+        
+        # Get primary goal
+        goals = profile.get('goals', [])
+        primary_goal = goals[0] if isinstance(goals, list) and goals else profile.get('goal', '')
+        
+        # Calculate BMI category
+        profile['bmi_category'] = get_bmi_category(bmi, primary_goal)
+    
+    return profile
+
+def _load_normalized_profile() -> Dict[str, Any]:
+    """Stored profile, normalized for the recommenders (404 if there is none)"""
     profile = load_json_file("profile.json")
     if not profile:
         raise HTTPException(status_code=404, detail="Profile not found")
-    
-    # Convert profile to UserProfile format
-    # Get first goal from goals array
-    goals = profile.get("goals", ["weight_loss"])
-    primary_goal = goals[0] if goals else "weight_loss"
+    return _normalize_profile(profile)
+
+def _weighted_user_profile(profile: Dict[str, Any]) -> UserProfile:
+    """Convert a stored profile to the PDFRecommender's UserProfile"""
+    primary_goal = _primary_goal(profile)
     
     # Calculate BMI category from BMI value (goal-aware)
     bmi = profile.get("bmi", 22)
     bmi_category = get_bmi_category(bmi, primary_goal)
     
-    user = UserProfile(
+    return UserProfile(
         gender=profile.get("gender", "female").lower(),
         age=profile.get("age", 30),
         height=profile.get("height", 160),
@@ -531,50 +1178,66 @@ def generate_meal_plan(data: Dict[str, Any]):
         health_conditions=[c.lower().replace(" ", "_") for c in profile.get("medical_conditions", [])],
         allergies=profile.get("allergies", [])
     )
+
+@app.get("/api/meal-plan/range")
+def get_meal_plan_range(
+    request: Request,
+    from_date: str = Query(..., alias="from"),
+    to_date: str = Query(..., alias="to"),
+    offset: int = 0,
+    limit: int = 31,
+):
+    """Meal plans for every date in [from, to], one entry per day (plan is null on days without one)"""
+    dates, summary = _date_range_page(from_date, to_date, offset, limit)
+    meal_plans, plans_by_date = load_date_indexed("meal_plans.json")
+
+    days = (
+        {"date": date, "plan": _indexed_meal_plan_for_date(meal_plans, plans_by_date, date)}
+        for date in dates
+    )
+    return _range_response(request, summary, days)
+
+@app.get("/api/daily-log/range")
+def get_daily_log_range(
+    request: Request,
+    from_date: str = Query(..., alias="from"),
+    to_date: str = Query(..., alias="to"),
+    offset: int = 0,
+    limit: int = 31,
+):
+    """Daily logs for every date in [from, to]; days without a log get an empty one"""
+    dates, summary = _date_range_page(from_date, to_date, offset, limit)
+    _, logs_by_date = load_date_indexed("daily_logs.json")
+
+    days = (logs_by_date.get(date) or _daily_log_for_date([], date) for date in dates)
+    return _range_response(request, summary, days)
+
+@app.post("/api/meal-plan/generate")
+def generate_meal_plan(data: Dict[str, Any], request: Request):
+    """Generate meal plan recommendations from PDF database"""
+    profile = _load_normalized_profile()
+    _record_query("weighted", profile)
     
     # Get recommendations from PDF database (cached)
-    recommender = get_recommender()
     try:
-        recommendations = recommender.recommend(user, top_k=10)
+        recommendations = _match_weighted(profile)
     except Exception as e:
-        print(f"Error generating recommendations: {e}")
+        logger.exception("Error generating recommendations")
         raise HTTPException(status_code=500, detail=f"Failed to generate recommendations: {str(e)}")
     
     if not recommendations:
         raise HTTPException(status_code=404, detail="No matching meal plans found for your profile")
     
-    # Format recommendations for frontend
-    cards = []
-    for i, plan in enumerate(recommendations):
-        nutrition = plan.get('nutrition', {})
-        
-        # Extract meals from PDF text file
-        file_path = plan.get('file_path', '')
-        absolute_file_path = resolve_pdf_path(file_path)
-        meals = extract_meals_from_pdf(file_path) if file_path else []
-        
-        card = {
-            "id": i,
-            "file_path": absolute_file_path,
-            "filename": plan.get('filename', ''),
-            "category": plan.get('category', 'N/A'),
-            "region": plan.get('region', 'N/A'),
-            "diet_type": plan.get('diet_type', 'N/A'),
-            "score": round(plan.get('recommendation_score', 0), 1),
-            "meals": meals,
-            "calories": f"{nutrition.get('calories_min', 0)}-{nutrition.get('calories_max', 0)} kcal",
-            "protein": f"{nutrition.get('protein_min', 0)}-{nutrition.get('protein_max', 0)} g",
-            "carbs": f"{nutrition.get('carbs_min', 0)}-{nutrition.get('carbs_max', 0)} g",
-            "fat": f"{nutrition.get('fat_min', 0)}-{nutrition.get('fat_max', 0)} g",
-            "fiber": f"{nutrition.get('fiber_min', 0)}-{nutrition.get('fiber_max', 0)} g"
-        }
-        cards.append(card)
+    summary = {"status": "success", "result_token": _store_results(recommendations)}
+    if _wants_ndjson(request):
+        return _ndjson_response(summary, _iter_cards(recommendations, _extract_card_meals_simple, include_score=True))
     
-    return {"status": "success", "recommendations": cards}
+    # Format recommendations for frontend
+    return _cards_response(summary, _iter_cards(recommendations, _extract_card_meals_simple, include_score=True))
 
 
 @app.post("/api/meal-plan/generate-exact")
-def generate_exact_match_recommendations():
+def generate_exact_match_recommendations(request: Request):
     """Generate recommendations using EXACT MATCH on ALL fields (Case 1)
     
     Matches: Gender, BMI Category, Activity, Diet, Region, Category
@@ -585,213 +1248,80 @@ def generate_exact_match_recommendations():
     - Height: '162 cm' or '160-165 cm' -> middle value
     - Weight: '70-72 kg' -> 71.0
     """
-    profile = load_json_file("profile.json")
-    if not profile:
-        raise HTTPException(status_code=404, detail="Profile not found")
-    
-    # Parse range values for age, height, weight
-    if 'age' in profile:
-        profile['age'] = parse_range_value(profile['age'])
-    
-    if 'height' in profile:
-        profile['height'] = parse_range_value(profile['height'])
-    
-    if 'weight' in profile:
-        profile['weight'] = parse_range_value(profile['weight'])
-    
-    # Calculate BMI category if not present
-    if 'bmi_category' not in profile or not profile['bmi_category']:
-        bmi = profile.get('bmi', 0)
-        if bmi == 0 and profile.get('height') and profile.get('weight'):
-            height_m = profile['height'] / 100
-            bmi = profile['weight'] / (height_m ** 2)
-        
-        # Get primary goal
-        goals = profile.get('goals', [])
-        primary_goal = goals[0] if isinstance(goals, list) and goals else profile.get('goal', '')
-        
-        # Calculate BMI category
-        profile['bmi_category'] = get_bmi_category(bmi, primary_goal)
+    profile = _load_normalized_profile()
     
-    # Use cached exact match recommender
-    exact_recommender = get_exact_recommender()
+    _record_query("exact", profile)
     
-    # Get exact matches
-    result = exact_recommender.recommend(profile, top_k=10)
+    # Get exact matches (memoized per profile)
+    result = _match_exact(profile)
     
     if result['status'] == 'not_available':
+        if _wants_ndjson(request):
+            return _ndjson_response(result, iter(()))
         return result
     
-    # Format recommendations for frontend
-    cards = []
-    for i, plan in enumerate(result['recommendations']):
-        nutrition = plan.get('nutrition', {})
-        
-        # Extract meals from PDF text file using comprehensive parser
-        file_path = plan.get('file_path', '')
-        absolute_file_path = resolve_pdf_path(file_path)
-        
-        # Use comprehensive parser to get ALL meals including breakfast
-        meals = []
-        try:
-            parsed_data = parse_pdf_complete(absolute_file_path)
-            
-            # Define meal order (chronological order throughout the day)
-            meal_order = [
-                'Early Morning (on Waking)',
-                'Early Morning',
-                'Pre-Yoga / Light Activity',
-                'Pre-Activity',
-                'Pre-Breakfast',
-                'Breakfast (Post-Yoga / Morning Meal)',
-                'Breakfast',
-                'Mid-Morning Snack',
-                'Mid-Morning',
-                'Lunch',
-                'Evening Snack',
-                'Evening',
-                'Dinner',
-                'Bedtime Snack',
-                'Bedtime'
-            ]
-            
-            meal_icon_map = {
-                'Early Morning (on Waking)': '☀️',
-                'Early Morning': '☀️',
-                'Pre-Yoga / Light Activity': '🏃',
-                'Pre-Activity': '🏃',
-                'Pre-Breakfast': '🌅',
-                'Breakfast (Post-Yoga / Morning Meal)': '🍳',
-                'Breakfast': '🍳',
-                'Mid-Morning Snack': '☕',
-                'Mid-Morning': '☕',
-                'Lunch': '🍛',
-                'Evening Snack': '🍵',
-                'Evening': '🍵',
-                'Dinner': '🌙',
-                'Bedtime Snack': '😴',
-                'Bedtime': '😴'
-            }
-            
-            # Convert to format expected by frontend
-            meals_dict = {}
-            for meal in parsed_data.get('meals', []):
-                if meal.get('options'):
-                    meal_type = meal['meal_type']
-                    meals_dict[meal_type] = {
-                        'type': meal_type,
-                        'icon': meal_icon_map.get(meal_type, '🍽️'),
-                        'options': [opt['name'] for opt in meal['options'][:3]]
-                    }
-            
-            # Sort meals by chronological order
-            for meal_type in meal_order:
-                if meal_type in meals_dict:
-                    meals.append(meals_dict[meal_type])
-                    
-        except Exception as e:
-            print(f"Error parsing PDF {absolute_file_path}: {e}")
-            # Fallback to simple extraction
-            meals = extract_meals_from_pdf(file_path) if file_path else []
-        
-        card = {
-            "id": i,
-            "file_path": absolute_file_path,
-            "filename": plan.get('filename', ''),
-            "category": plan.get('category', 'N/A'),
-            "region": plan.get('region', 'N/A'),
-            "diet_type": plan.get('diet_type', 'N/A'),
-            "meals": meals,
-            "calories": f"{nutrition.get('calories_min', 0)}-{nutrition.get('calories_max', 0)} kcal",
-            "protein": f"{nutrition.get('protein_min', 0)}-{nutrition.get('protein_max', 0)} g",
-            "carbs": f"{nutrition.get('carbs_min', 0)}-{nutrition.get('carbs_max', 0)} g",
-            "fat": f"{nutrition.get('fat_min', 0)}-{nutrition.get('fat_max', 0)} g",
-            "fiber": f"{nutrition.get('fiber_min', 0)}-{nutrition.get('fiber_max', 0)} g"
-        }
-        cards.append(card)
+    summary = {
+        "status": "success",
+        "match_type": "exact",
+        "total_matches": result.get('total_matches', 0),
+        "result_token": _store_results(result['recommendations']),
+    }
+    if _wants_ndjson(request):
+        return _ndjson_response(summary, _iter_cards(result['recommendations'], _extract_card_meals_complete))
     
-    return {"status": "success", "recommendations": cards, "match_type": "exact", "total_matches": result.get('total_matches', 0)}
+    # Format recommendations for frontend (comprehensive parser gets ALL meals including breakfast)
+    return _cards_response(summary, _iter_cards(result['recommendations'], _extract_card_meals_complete))
 
 
 @app.post("/api/meal-plan/generate-goal")
-def generate_goal_only_recommendations():
+def generate_goal_only_recommendations(request: Request):
     """Generate recommendations using GOAL + REGION only (Case 2)
     
     Matches: Primary Goal + Region ONLY
     Ignores: Gender, BMI, Activity, Diet, Health, Age, Allergies
     Handles range inputs for age, height, weight
     """
-    profile = load_json_file("profile.json")
-    if not profile:
-        raise HTTPException(status_code=404, detail="Profile not found")
+    profile = _load_normalized_profile()
     
-    # Parse range values for age, height, weight
-    if 'age' in profile:
-        profile['age'] = parse_range_value(profile['age'])
-    
-    if 'height' in profile:
-        profile['height'] = parse_range_value(profile['height'])
-    
-    if 'weight' in profile:
-        profile['weight'] = parse_range_value(profile['weight'])
-    
-    # Calculate BMI category if not present
-    if 'bmi_category' not in profile or not profile['bmi_category']:
-        bmi = profile.get('bmi', 0)
-        if bmi == 0 and profile.get('height') and profile.get('weight'):
-            height_m = profile['height'] / 100
-            bmi = profile['weight'] / (height_m ** 2)
-        
-        # Get primary goal
-        goals = profile.get('goals', [])
-        primary_goal = goals[0] if isinstance(goals, list) and goals else profile.get('goal', '')
-        
-        # Calculate BMI category
-        profile['bmi_category'] = get_bmi_category(bmi, primary_goal)
+    _record_query("goal", profile)
     
-    # Use cached goal-only recommender
-    goal_recommender = get_goal_recommender()
-    
-    # Get goal-based matches
-    result = goal_recommender.recommend(profile, top_k=10)
+    # Get goal-based matches (memoized per profile)
+    result = _match_goal(profile)
     
     if result['status'] == 'not_available':
+        if _wants_ndjson(request):
+            return _ndjson_response(result, iter(()))
         return result
     
+    summary = {
+        "status": "success", 
+        "match_type": "goal_only", 
+        "total_matches": result.get('total_matches', 0),
+        "criteria": result.get('criteria', {}),
+        "result_token": _store_results(result['recommendations']),
+    }
+    if _wants_ndjson(request):
+        return _ndjson_response(summary, _iter_cards(result['recommendations'], _extract_card_meals_simple))
+    
     # Format recommendations for frontend
+    return _cards_response(summary, _iter_cards(result['recommendations'], _extract_card_meals_simple))
+
+
+def _ml_cards(recommendations: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Format ML recommender plans as cards for the frontend"""
     cards = []
-    for i, plan in enumerate(result['recommendations']):
-        nutrition = plan.get('nutrition', {})
-        
-        # Extract meals from PDF text file
-        file_path = plan.get('file_path', '')
-        absolute_file_path = resolve_pdf_path(file_path)
-        meals = extract_meals_from_pdf(file_path) if file_path else []
-        
+    for i, rec in enumerate(recommendations):
         card = {
             "id": i,
-            "file_path": absolute_file_path,
-            "filename": plan.get('filename', ''),
-            "category": plan.get('category', 'N/A'),
-            "region": plan.get('region', 'N/A'),
-            "diet_type": plan.get('diet_type', 'N/A'),
-            "meals": meals,
-            "calories": f"{nutrition.get('calories_min', 0)}-{nutrition.get('calories_max', 0)} kcal",
-            "protein": f"{nutrition.get('protein_min', 0)}-{nutrition.get('protein_max', 0)} g",
-            "carbs": f"{nutrition.get('carbs_min', 0)}-{nutrition.get('carbs_max', 0)} g",
-            "fat": f"{nutrition.get('fat_min', 0)}-{nutrition.get('fat_max', 0)} g",
-            "fiber": f"{nutrition.get('fiber_min', 0)}-{nutrition.get('fiber_max', 0)} g"
+            "method": "ml_rag",
+            "title": rec.get('title', f'AI-Generated Plan {i+1}'),
+            "plan_text": rec.get('plan_text', ''),
+            "sources": rec.get('sources', []),
+            "confidence": rec.get('confidence', 'medium'),
+            "meals": rec.get('meals', [])  # If LLM parsed meals
         }
         cards.append(card)
-    
-    return {
-        "status": "success", 
-        "recommendations": cards, 
-        "match_type": "goal_only", 
-        "total_matches": result.get('total_matches', 0),
-        "criteria": result.get('criteria', {})
-    }
-
+    return cards
 
 @app.post("/api/meal-plan/generate-ml")
 def generate_ml_recommendations():
@@ -809,26 +1339,10 @@ def generate_ml_recommendations():
     
     Handles range inputs for age, height, weight
     """
-    profile = load_json_file("profile.json")
-    if not profile:
-        raise HTTPException(status_code=404, detail="Profile not found")
-    
-    # Parse range values for age, height, weight
-    if 'age' in profile:
-        profile['age'] = parse_range_value(profile['age'])
-    
-    if 'height' in profile:
-        profile['height'] = parse_range_value(profile['height'])
-    
-    if 'weight' in profile:
-        profile['weight'] = parse_range_value(profile['weight'])
-    
-    # Extract primary goal from goals array
-    goals = profile.get("goals", ["weight_loss"])
-    primary_goal = goals[0] if goals else "weight_loss"
+    profile = _load_normalized_profile()
     
     # Add goal (singular) to profile for ML recommender
-    profile["goal"] = primary_goal
+    profile["goal"] = _primary_goal(profile)
     
     # Use cached ML recommender
     ml_recommender = get_ml_recommender()
@@ -852,22 +1366,12 @@ def generate_ml_recommendations():
     metadata = result.get('metadata', {})
     
     # If we have structured meal data, format it like other endpoints
-    cards = []
-    for i, rec in enumerate(recommendations):
-        card = {
-            "id": i,
-            "method": "ml_rag",
-            "title": rec.get('title', f'AI-Generated Plan {i+1}'),
-            "plan_text": rec.get('plan_text', ''),
-            "sources": rec.get('sources', []),
-            "confidence": rec.get('confidence', 'medium'),
-            "meals": rec.get('meals', [])  # If LLM parsed meals
-        }
-        cards.append(card)
+    cards = _ml_cards(recommendations)
     
     return {
         "status": "success",
         "recommendations": cards,
+        "result_token": result_store.put(cards),
         "match_type": "ml_rag",
         "metadata": metadata,
         "total_sources": metadata.get('total_sources', 0),
@@ -875,9 +1379,130 @@ def generate_ml_recommendations():
     }
 
 
+# Worker pool for the compare endpoint's per-system fan-out
+_compare_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="compare")
+
+def _in_request_context(fn):
+    """fn bound to a copy of the caller's context, so pool threads see the request's corpus snapshot"""
+    context = contextvars.copy_context()
+    return lambda *args: context.copy().run(fn, *args)
+
+COMPARE_SYSTEMS = ("exact", "goal", "weighted")
+COMPARE_ML_TIMEOUT = 20.0
+
+def _compare_exact(profile: Dict[str, Any]):
+    result = _match_exact(profile)
+    return result, result.get('recommendations', [])
+
+def _compare_goal(profile: Dict[str, Any]):
+    result = _match_goal(profile)
+    return result, result.get('recommendations', [])
+
+def _compare_weighted(profile: Dict[str, Any]):
+    plans = _match_weighted(profile)
+    status = "success" if plans else "not_available"
+    return {"status": status, "total_matches": len(plans)}, plans
+
+def _compare_ml(profile: Dict[str, Any]):
+    result = get_ml_recommender().recommend({**profile, "goal": _primary_goal(profile)}, top_k=5)
+    cards = _ml_cards(result.get('recommendations', []))
+    return {
+        "status": "not_available" if result.get('status') == 'no_match' else result.get('status', 'success'),
+        "message": result.get('message'),
+        "cards": cards,
+    }, []
+
+_COMPARE_RUNNERS = {
+    "exact": _compare_exact,
+    "goal": _compare_goal,
+    "weighted": _compare_weighted,
+    "ml": _compare_ml,
+}
+
+def _system_summary(result: Dict[str, Any], plan_count: int) -> Dict[str, Any]:
+    summary = {"status": result.get("status", "success"), "total_matches": result.get("total_matches", plan_count)}
+    # ML plans are generated rather than taken from the index, so their
+    # cards are reported with the system instead of being merged
+    for key in ("message", "criteria", "cards"):
+        if result.get(key):
+            summary[key] = result[key]
+    return summary
+
+@app.post("/api/meal-plan/compare")
+def compare_systems(data: Optional[Dict[str, Any]] = None):
+    """Run the exact, goal-only and weighted systems side by side (Cases 1, 2 and weighted)
+
+    The systems run concurrently on one normalized profile, so the response
+    takes about as long as the slowest of them. Body (optional):
+    - include_ml: also run the ML recommender (default false)
+    - ml_timeout: seconds to wait for ML before reporting it as "timeout"
+
+    Plans found by several systems appear once in "recommendations", with
+    every system that returned them listed in the card's "systems".
+    """
+    data = data or {}
+    profile = _load_normalized_profile()
+    _record_query("compare", profile)
+
+    systems = list(COMPARE_SYSTEMS)
+    if data.get("include_ml"):
+        systems.append("ml")
+    futures = {
+        name: _compare_executor.submit(_in_request_context(_COMPARE_RUNNERS[name]), copy.deepcopy(profile))
+        for name in systems
+    }
+
+    ml_timeout = float(data.get("ml_timeout", COMPARE_ML_TIMEOUT))
+    deadline = time.monotonic() + ml_timeout
+
+    summaries = {}
+    merged = {}  # plan key -> (id, plan, [systems]), in first-seen order
+    for name, future in futures.items():
+        try:
+            if name == "ml":
+                result, plans = future.result(timeout=max(0.0, deadline - time.monotonic()))
+            else:
+                result, plans = future.result()
+        except FuturesTimeoutError:
+            summaries[name] = {"status": "timeout", "total_matches": 0}
+            continue
+        except Exception as e:
+            logger.warning("Error running %s recommender: %s", name, e)
+            summaries[name] = {"status": "error", "message": str(e), "total_matches": 0}
+            continue
+
+        ids = []
+        for plan in plans:
+            key = plan.get('relative_path') or plan.get('file_path')
+            if key not in merged:
+                merged[key] = (len(merged), plan, [])
+            merged[key][2].append(name)
+            ids.append(merged[key][0])
+        summaries[name] = {**_system_summary(result, len(plans)), "ids": ids}
+
+    # Card meals for all merged plans are extracted in parallel through the shared parse cache
+    entries = list(merged.values())
+    blobs = _compare_executor.map(
+        _in_request_context(lambda entry: _card_blob(entry[1], _extract_card_meals_complete)), entries
+    )
+    cards = (
+        b'{"id":' + str(i).encode("ascii") + b',"systems":' + _encode_json(found_by) + b"," + blob + b"}"
+        for (i, _, found_by), blob in zip(entries, blobs)
+    )
+
+    summary = {
+        "status": "success" if entries else "not_available",
+        "match_type": "compare",
+        "systems": summaries,
+        "total_plans": len(entries),
+        "result_token": _store_results([plan for _, plan, _ in entries]),
+    }
+    return _cards_response(summary, cards)
+
+
 @app.post("/api/meal-plan/select")
 def select_meal_plans(data: Dict[str, Any]):
-    """Finalize selected meal plans and generate 14-day cycle"""
+    """Finalize selected meal plans as a rotation (14 days unless "days" is given)"""
     profile = load_json_file("profile.json")
     if not profile:
         raise HTTPException(status_code=404, detail="Profile not found")
@@ -886,29 +1511,33 @@ def select_meal_plans(data: Dict[str, Any]):
     if not selected_ids or len(selected_ids) < 1 or len(selected_ids) > 5:
         raise HTTPException(status_code=400, detail="Please select 1-5 meal plans")
     
-    # Get the recommendations from the frontend (they already have file_path)
+    # Preferred: resolve the card ids against the result set held for the token
+    result_token = data.get("result_token")
+    if result_token:
+        stored = result_store.resolve(result_token, selected_ids)
+        # Speculation is over: drop the rest of the batch, parse the chosen plans first
+        with _prefetch_handles_lock:
+            handle = _prefetch_handles.pop(result_token, None)
+        if handle is not None:
+            handle.cancel()
+        if stored:
+            parse_prefetcher.schedule(
+                [resolve_pdf_path(p['file_path']) for p in stored if p.get('file_path')], urgent=True
+            )
+        if stored is None and not data.get("recommendations"):
+            raise HTTPException(status_code=410, detail="Recommendations expired, please generate them again")
+        if stored is not None:
+            return _save_selection(profile, selected_ids, [
+                _ai_selection_plan(rec, profile) if rec.get('ai_generated') or not rec.get('file_path') else rec
+                for rec in stored
+            ], data)
+    
+    # Legacy clients post the recommendations back (they already have file_path)
     recommendations = data.get("recommendations", [])
     
     if not recommendations:
         # Fallback: regenerate recommendations if not provided
-        goals = profile.get("goals", ["weight_loss"])
-        primary_goal = goals[0] if goals else "weight_loss"
-        bmi = profile.get("bmi", 22)
-        bmi_category = get_bmi_category(bmi, primary_goal)
-        
-        user = UserProfile(
-            gender=profile.get("gender", "female").lower(),
-            age=profile.get("age", 30),
-            height=profile.get("height", 160),
-            weight=profile.get("weight", 60),
-            bmi_category=bmi_category,
-            activity_level=profile.get("activity_level", "light").lower().replace(" ", "_"),
-            diet_type=profile.get("diet_type", "vegetarian").lower(),
-            region=profile.get("region", "north_indian").lower().replace(" ", "_"),
-            goal=primary_goal.lower().replace(" ", "_"),
-            health_conditions=[c.lower().replace(" ", "_") for c in profile.get("medical_conditions", [])],
-            allergies=profile.get("allergies", [])
-        )
+        user = _weighted_user_profile(profile)
         
         system = data.get("system", "weighted")
         if system == "exact":
@@ -927,62 +1556,70 @@ def select_meal_plans(data: Dict[str, Any]):
     # Handle both PDF-based plans (with file_path) and ML-generated plans (without file_path)
     selected_plans = []
     
-    # Load PDF index once (for PDF-based plans only)
-    import json
-    with open("outputs/pdf_index.json", 'r', encoding='utf-8') as f:
-        index = json.load(f)
+    catalog = get_catalog()
     
     for rec in recommendations:
         # Check if this is an AI-generated plan (no file_path or ai_generated flag)
         if rec.get('ai_generated') or not rec.get('file_path'):
             # ML-generated plan - use it directly with meals from recommendation
-            selected_plans.append({
-                'title': rec.get('category', 'AI Generated Plan'),
-                'category': rec.get('category', 'ai_generated'),
-                'region': rec.get('region', profile.get('region', 'north_indian')),
-                'diet_type': rec.get('diet_type', profile.get('diet_type', 'vegetarian')),
-                'gender': profile.get('gender', 'female'),
-                'bmi_category': profile.get('bmi_category', 'normal'),
-                'activity': profile.get('activity_level', 'light'),
-                'meals': rec.get('meals', []),
-                'file_path': None,
-                'ai_generated': True
-            })
+            selected_plans.append(_ai_selection_plan(rec, profile))
         else:
-            # PDF-based plan - load from index
-            file_path = rec.get('file_path', '')
-            if file_path:
-                # Normalize paths for comparison (handle both forward and backslashes)
-                normalized_file_path = file_path.replace('\\', '/').replace('//', '/')
-                
-                # Find the matching plan in the index
-                for plan in index.get('plans', []):
-                    plan_file_path = plan.get('file_path', '').replace('\\', '/').replace('//', '/')
-                    if plan_file_path == normalized_file_path or plan_file_path.endswith(normalized_file_path) or normalized_file_path.endswith(plan_file_path):
-                        selected_plans.append(plan)
-                        break
+            # PDF-based plan - load from index by id, else by path
+            plan = catalog.get(rec['plan_id']) if isinstance(rec.get('plan_id'), int) else catalog.find(rec.get('file_path', ''))
+            if plan is None:
+                # Absolute path from another machine: match on the part under outputs/raw
+                file_path = rec.get('file_path', '').replace('\\', '/')
+                marker = file_path.find('outputs/raw/')
+                if marker >= 0:
+                    plan = catalog.find(file_path[marker:])
+            if plan is not None:
+                selected_plans.append(plan)
     
     if not selected_plans:
-        # Print debug info
-        print(f"DEBUG: Failed to match plans. Recommendations file_paths:")
-        for rec in recommendations:
-            print(f"  - file_path: {rec.get('file_path', 'NO PATH')}, ai_generated: {rec.get('ai_generated', False)}")
+        logger.warning("Failed to match selected plans", extra={
+            'file_paths': [rec.get('file_path') for rec in recommendations],
+        })
         raise HTTPException(status_code=500, detail=f"Failed to load selected plans. Received {len(recommendations)} recommendations but matched 0 plans.")
     
-    # Generate 14-day rotation using the smart recommender (has the method)
-    recommender = get_recommender()
-    cycle = recommender.generate_multi_plan_cycle(selected_plans, days=14)
+    return _save_selection(profile, selected_ids, selected_plans, data)
+
+def _ai_selection_plan(rec: Dict[str, Any], profile: Dict[str, Any]) -> Dict[str, Any]:
+    """Plan record for a selected ML-generated recommendation (no PDF behind it)"""
+    return {
+        'title': rec.get('category', 'AI Generated Plan'),
+        'category': rec.get('category', 'ai_generated'),
+        'region': rec.get('region', profile.get('region', 'north_indian')),
+        'diet_type': rec.get('diet_type', profile.get('diet_type', 'vegetarian')),
+        'gender': profile.get('gender', 'female'),
+        'bmi_category': profile.get('bmi_category', 'normal'),
+        'activity': profile.get('activity_level', 'light'),
+        'meals': rec.get('meals', []),
+        'file_path': None,
+        'ai_generated': True
+    }
+
+def _save_selection(profile: Dict[str, Any], selected_ids: List[int], selected_plans: List[Dict[str, Any]], data: Dict[str, Any]):
+    """Store the selected plans as the rotation schedule starting today"""
+    if not selected_plans:
+        raise HTTPException(status_code=400, detail="None of the selected plans were found")
+    
+    # Store the selection only - each day of the rotation is computed on request
+    days = int(data.get("days", 14))
+    if days < 1 or days > 366:
+        raise HTTPException(status_code=400, detail="Plan length must be 1-366 days")
+    
+    start_date = datetime.now().strftime("%Y-%m-%d")
+    schedule = new_schedule(selected_plans, start_date, days)
     
     # Update profile with new plan start date (today)
-    from datetime import datetime
-    profile["plan_start_date"] = datetime.now().strftime("%Y-%m-%d")
+    profile["plan_start_date"] = start_date
     save_json_file("profile.json", profile)
     
     # Save to meal_plans.json
-    save_json_file("meal_plans.json", cycle)
+    save_json_file("meal_plans.json", schedule)
     save_json_file("selected_plan_ids.json", selected_ids)
     
-    return {"status": "success", "cycle": cycle, "days": len(cycle)}
+    return {"status": "success", "start_date": start_date, "days": days, "plans": len(schedule["selection"])}
 
 @app.post("/api/meal-plan/swap")
 def swap_meal(data: Dict[str, Any]):
@@ -992,28 +1629,41 @@ def swap_meal(data: Dict[str, Any]):
     reason = data.get("reason", "variety")
     
     meal_plans = load_json_file("meal_plans.json") or []
-    plan_index = next((i for i, p in enumerate(meal_plans) if p.get("date") == date), None)
-    
-    if plan_index is None:
-        raise HTTPException(status_code=404, detail="Meal plan not found")
-    
-    # Get profile for preferences
     profile = load_json_file("profile.json")
-    original_meal = meal_plans[plan_index].get(meal_type, {})
     
-    # Generate basic alternative (PDF-based alternatives coming soon)
-    alternative = _generate_alternative_meal(meal_type, profile)
-    meal_plans[plan_index][meal_type] = alternative
-    meal_plans[plan_index]["is_adjusted"] = True
-    meal_plans[plan_index]["swap_reason"] = reason
+    if is_schedule(meal_plans):
+        if day_offset(meal_plans, date) is None:
+            raise HTTPException(status_code=404, detail="Meal plan not found")
+        
+        # Generate basic alternative (PDF-based alternatives coming soon)
+        alternative = _generate_alternative_meal(meal_type, profile)
+        override = meal_plans.setdefault("overrides", {}).setdefault(date, {})
+        override[meal_type] = alternative
+        override["is_adjusted"] = True
+        override["swap_reason"] = reason
+    else:
+        plan_index = next((i for i, p in enumerate(meal_plans) if p.get("date") == date), None)
+        
+        if plan_index is None:
+            raise HTTPException(status_code=404, detail="Meal plan not found")
+        
+        # Generate basic alternative (PDF-based alternatives coming soon)
+        alternative = _generate_alternative_meal(meal_type, profile)
+        meal_plans[plan_index][meal_type] = alternative
+        meal_plans[plan_index]["is_adjusted"] = True
+        meal_plans[plan_index]["swap_reason"] = reason
     
     save_json_file("meal_plans.json", meal_plans)
-    return {"status": "success", "meal": alternative, "alternatives": alternatives}
+    return {"status": "success", "meal": alternative, "alternatives": [alternative]}
 
 @app.get("/api/daily-log")
 def get_daily_log(date: str):
     """Get daily log for a specific date"""
-    logs = load_json_file("daily_logs.json") or []
+    _, logs_by_date = load_date_indexed("daily_logs.json")
+    return logs_by_date.get(date) or _daily_log_for_date([], date)
+
+def _daily_log_for_date(logs: List[Dict[str, Any]], date: str) -> Dict[str, Any]:
+    """Stored log for date, or an empty log"""
     log = next((l for l in logs if l.get("date") == date), None)
     
     if not log:
@@ -1027,6 +1677,87 @@ def get_daily_log(date: str):
     
     return log
 
+# Files the dashboard is assembled from; their saves and (mtime, size) make up the ETag
+DASHBOARD_FILES = ("profile.json", "users.json", "meal_plans.json", "daily_logs.json")
+# Write counts restart with the process; this keeps ETags from before a restart from matching
+_DATA_EPOCH = f"{os.getpid()}:{time.time_ns()}"
+
+def _data_etag(filenames, *extra) -> str:
+    """Weak validator from the save counts and stat of DATA_DIR files, without reading them"""
+    parts = [_DATA_EPOCH] + [str(e) for e in extra]
+    for filename in filenames:
+        writes = _data_writes.get(filename, 0)
+        try:
+            stat = (DATA_DIR / filename).stat()
+            parts.append(f"{filename}:{writes}:{stat.st_mtime_ns}:{stat.st_size}")
+        except FileNotFoundError:
+            parts.append(f"{filename}:{writes}:-")
+    return 'W/"' + hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest() + '"'
+
+def _cycle_position(profile: Dict[str, Any], meal_plans: Any, date: str) -> Dict[str, Any]:
+    """Where date falls in the current plan cycle"""
+    if is_schedule(meal_plans):
+        start_date = meal_plans.get("start_date")
+        days = meal_plans.get("days", 14)
+    else:
+        start_date = profile.get("plan_start_date")
+        days = len(meal_plans) if isinstance(meal_plans, list) and meal_plans else 14
+
+    day = None
+    try:
+        offset = (datetime.strptime(date, "%Y-%m-%d") - datetime.strptime(start_date, "%Y-%m-%d")).days
+        day = min(max(offset + 1, 1), days)
+    except (TypeError, ValueError):
+        pass
+
+    return {
+        "start_date": start_date,
+        "day": day,
+        "days": days,
+        "days_remaining": days - day if day is not None else None,
+        "cycle": profile.get("current_plan_cycle", 1),
+    }
+
+@app.get("/api/dashboard")
+def get_dashboard(request: Request, date: Optional[str] = None):
+    """Profile, the day's plan and log and the cycle position in one response.
+
+    Supports conditional GET: the ETag is derived from the data files' saves
+    and stat, the date and the corpus snapshot (plans are resolved from the
+    index), so an unchanged dashboard costs a 304 and no file reads.
+    """
+    date = date or datetime.now().strftime("%Y-%m-%d")
+    headers = {"Cache-Control": "no-cache"}
+    generation = corpus.active().generation
+
+    etag = _data_etag(DASHBOARD_FILES, date, generation)
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={**headers, "ETag": etag})
+
+    # Re-read if a file changed while we were reading, so the response is
+    # one consistent snapshot that matches its ETag
+    for _ in range(3):
+        profile = load_json_file("profile.json")
+        users = load_json_file("users.json") or {}
+        meal_plans = load_json_file("meal_plans.json")
+        logs = load_json_file("daily_logs.json") or []
+        current = _data_etag(DASHBOARD_FILES, date, generation)
+        if current == etag:
+            break
+        etag = current
+
+    if not profile:
+        raise HTTPException(status_code=404, detail="Profile not found")
+
+    payload = {
+        "date": date,
+        "profile": _merge_user_details(profile, users),
+        "plan": _meal_plan_for_date(meal_plans, date),
+        "log": _daily_log_for_date(logs, date),
+        "cycle": _cycle_position(profile, meal_plans, date),
+    }
+    return JSONResponse(payload, headers={**headers, "ETag": etag})
+
 @app.post("/api/daily-log/meal")
 def toggle_meal_eaten(data: Dict[str, Any]):
     """Mark a meal as eaten or not eaten"""
@@ -1078,8 +1809,8 @@ def save_daily_feedback(data: Dict[str, Any]):
     
     # Get profile and current meal plan for context
     profile = load_json_file("profile.json")
-    meal_plans = load_json_file("meal_plans.json") or []
-    current_plan = next((p for p in meal_plans if p.get("date") == date), None)
+    meal_plans = load_json_file("meal_plans.json")
+    current_plan = _meal_plan_for_date(meal_plans, date)
     
     # Save feedback data
     logs = load_json_file("daily_logs.json") or []
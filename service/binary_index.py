@@ -0,0 +1,226 @@
+"""
+Binary, memory-mapped plan index.
+
+pdf_index.json has to be parsed in full, materializing every field of every
+plan (content previews, ingredient lists) before the first query. The binary
+index stores the same data by column, so a reader maps the file and decodes
+only what it reads:
+
+- categorical fields (CODE_FIELDS) as fixed-width codes into a small vocabulary,
+- integer fields (the plan id) as int64 columns,
+- strings (paths, filenames, content preview) as an offset table into a UTF-8 blob,
+- nested values (age_info, nutrition, meals, ingredients) as JSON text, the same way,
+- and per plan a code for its key layout, so absent keys and key order survive.
+
+File layout: b"PIDX", a little-endian uint32 header length, the JSON header
+(metadata, plan count, the sha256 of the JSON index it was written from, and
+each column's kind, vocabulary and byte offsets),
+then the 8-byte aligned column sections. Written by build_pdf_index.py's
+save_index next to the JSON index; see plan_catalog.BinaryPlanCatalog.
+"""
+
+import hashlib
+import json
+import mmap
+import struct
+from array import array
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+MAGIC = b"PIDX"
+FORMAT_VERSION = 1
+
+# Fields stored as codes into a vocabulary (the fields recommenders filter on)
+CODE_FIELDS = ('category', 'region', 'diet_type', 'gender', 'bmi_category', 'activity')
+LAYOUT_COLUMN = '_layout'
+
+
+def _column_kind(field: str, values: List[Any]) -> str:
+    if field in CODE_FIELDS:
+        return 'code'
+    if all(isinstance(v, int) and not isinstance(v, bool) for v in values):
+        return 'int'
+    if all(isinstance(v, str) for v in values):
+        return 'str'
+    return 'json'
+
+
+def _code_array(codes: List[int], vocab_size: int) -> array:
+    return array('H' if vocab_size <= 0xFFFF else 'I', codes)
+
+
+def write_binary_index(index: Dict[str, Any], path: Union[str, Path], index_sha256: Optional[str] = None):
+    """Write index ({'metadata', 'plans'}) as a binary index at path (atomically).
+
+    index_sha256 identifies the JSON index file this one was converted from.
+    """
+    plans = index.get('plans', [])
+    fields: Dict[str, None] = {}
+    layouts: Dict[tuple, int] = {}
+    layout_codes = []
+    for plan in plans:
+        layout = tuple(plan)
+        layout_codes.append(layouts.setdefault(layout, len(layouts)))
+        fields.update(dict.fromkeys(layout))
+
+    sections: List[bytes] = []
+    columns: Dict[str, Dict[str, Any]] = {}
+    offset = 0
+
+    def add_section(data: bytes) -> int:
+        nonlocal offset
+        start = offset
+        sections.append(data)
+        padding = -len(data) % 8
+        if padding:
+            sections.append(b"\0" * padding)
+        offset += len(data) + padding
+        return start
+
+    codes = _code_array(layout_codes, len(layouts))
+    columns[LAYOUT_COLUMN] = {'kind': 'code', 'typecode': codes.typecode, 'offset': add_section(codes.tobytes()),
+                              'vocab': [list(layout) for layout in layouts]}
+
+    for field in fields:
+        present = [plan[field] for plan in plans if field in plan]
+        values = [plan.get(field) for plan in plans]
+        kind = _column_kind(field, present)
+        column: Dict[str, Any] = {'kind': kind}
+        if kind == 'code':
+            vocab: Dict[str, int] = {}
+            codes = _code_array([vocab.setdefault(json.dumps(v), len(vocab)) for v in values], len(vocab))
+            column.update(typecode=codes.typecode, offset=add_section(codes.tobytes()),
+                          vocab=[json.loads(v) for v in vocab])
+        elif kind == 'int':
+            column.update(offset=add_section(array('q', (v or 0 for v in values)).tobytes()))
+        else:
+            encoded = [(v if kind == 'str' else json.dumps(v, ensure_ascii=False)).encode('utf-8')
+                       if v is not None else b"" for v in values]
+            ends = array('Q', [0])
+            for item in encoded:
+                ends.append(ends[-1] + len(item))
+            column.update(offset=add_section(ends.tobytes()), data=add_section(b"".join(encoded)))
+        columns[field] = column
+
+    header = json.dumps({
+        'version': FORMAT_VERSION,
+        'plans': len(plans),
+        'metadata': index.get('metadata', {}),
+        'index_sha256': index_sha256,
+        'columns': columns,
+    }, ensure_ascii=False).encode('utf-8')
+    header += b" " * (-(len(MAGIC) + 4 + len(header)) % 8)
+
+    path = Path(path)
+    tmp_path = Path(str(path) + '.tmp')
+    with open(tmp_path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(struct.pack('<I', len(header)))
+        f.write(header)
+        for section in sections:
+            f.write(section)
+    tmp_path.replace(path)
+
+
+class BinaryIndex:
+    """Read-only view of a binary index; plans are decoded on access, fields on demand."""
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        with open(self.path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[:4] != MAGIC:
+            raise ValueError(f"{self.path} is not a binary plan index")
+        (header_length,) = struct.unpack_from('<I', self._mmap, 4)
+        header = json.loads(self._mmap[8:8 + header_length])
+        if header['version'] != FORMAT_VERSION:
+            raise ValueError(f"{self.path}: unsupported binary index version {header['version']}")
+        self.size: int = header['plans']
+        self.metadata: Dict[str, Any] = header['metadata']
+        self.index_sha256: Optional[str] = header.get('index_sha256')
+        self.columns: Dict[str, Dict[str, Any]] = header['columns']
+        self._base = 8 + header_length
+        self._view = memoryview(self._mmap)
+        self._arrays: Dict[str, memoryview] = {}
+        self._layouts = [tuple(layout) for layout in self.columns[LAYOUT_COLUMN]['vocab']]
+
+    def _array(self, field: str, key: str, typecode: str, count: int) -> memoryview:
+        name = f"{field}:{key}"
+        view = self._arrays.get(name)
+        if view is None:
+            start = self._base + self.columns[field][key]
+            view = self._view[start:start + count * array(typecode).itemsize].cast(typecode)
+            self._arrays[name] = view
+        return view
+
+    def codes(self, field: str) -> memoryview:
+        """Code column of a categorical field (indexes into vocab(field)), zero-copy."""
+        column = self.columns[field]
+        return self._array(field, 'offset', column['typecode'], self.size)
+
+    def vocab(self, field: str) -> tuple:
+        return tuple(self.columns[field]['vocab'])
+
+    def ints(self, field: str) -> memoryview:
+        return self._array(field, 'offset', 'q', self.size)
+
+    def has_field(self, field: str) -> bool:
+        return field in self.columns
+
+    def value(self, position: int, field: str, default: Any = None) -> Any:
+        """One field of one plan (default if the plan doesn't have it)."""
+        column = self.columns.get(field)
+        if column is None or field not in self._layouts[self.codes(LAYOUT_COLUMN)[position]]:
+            return default
+        return self._decode(position, field, column)
+
+    def _decode(self, position: int, field: str, column: Dict[str, Any]) -> Any:
+        kind = column['kind']
+        if kind == 'code':
+            return column['vocab'][self.codes(field)[position]]
+        if kind == 'int':
+            return self.ints(field)[position]
+        ends = self._array(field, 'offset', 'Q', self.size + 1)
+        start = self._base + column['data']
+        text = str(self._view[start + ends[position]:start + ends[position + 1]], 'utf-8')
+        return text if kind == 'str' else json.loads(text)
+
+    def plan(self, position: int, fields: Optional[tuple] = None) -> Dict[str, Any]:
+        """Plan at position as a dict (only the given fields, if any), keys in their original order."""
+        layout = self._layouts[self.codes(LAYOUT_COLUMN)[position]]
+        return {field: self._decode(position, field, self.columns[field])
+                for field in layout if fields is None or field in fields}
+
+    def to_index(self) -> Dict[str, Any]:
+        """The whole index as the JSON structure it was written from."""
+        return {'metadata': self.metadata, 'plans': [self.plan(i) for i in range(self.size)]}
+
+    def __len__(self) -> int:
+        return self.size
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Convert between the JSON and binary plan index formats")
+    parser.add_argument('source', help="pdf_index.json or pdf_index.bin")
+    parser.add_argument('target', help="output file (.bin writes the binary format, anything else JSON)")
+    args = parser.parse_args()
+
+    if args.source.endswith('.bin'):
+        index = BinaryIndex(args.source).to_index()
+        index_sha256 = None
+    else:
+        with open(args.source, 'rb') as f:
+            data = f.read()
+        index = json.loads(data)
+        index_sha256 = hashlib.sha256(data).hexdigest()
+    if args.target.endswith('.bin'):
+        write_binary_index(index, args.target, index_sha256)
+    else:
+        with open(args.target, 'w', encoding='utf-8') as f:
+            json.dump(index, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Coverage lattice over the exact-match fields, for the nearest available profile.
+
+The exact recommender needs a plan on all six of category, region, diet,
+gender, BMI class and activity, and most of those combinations hold none.
+CoverageLattice counts the plans in every populated cell once, at load.
+When a profile's own cell is empty, nearest() searches outward from it
+(uniform-cost search over the lattice), relaxing one field a step at a time
+at the cost given in RELAXATION, and returns the first populated cells it
+reaches within max_distance. Fields without a relaxation rule (the category,
+i.e. the user's goal) are never changed.
+"""
+
+import heapq
+import itertools
+import math
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Index fields of a cell, in key order
+LATTICE_FIELDS = ('category', 'region', 'diet_type', 'gender', 'bmi_category', 'activity')
+
+# How each field may be relaxed. A field with a 'scale' costs 'step' per position moved
+# along it (a value off the scale may move onto any position for one step). Other fields
+# cost 'cost' to change to any value the lattice has, or only to their 'substitutes'.
+# With these costs a neighbouring activity or BMI class is tried before a different
+# region, gender or diet.
+RELAXATION = {
+    'activity': {'scale': ('sedentary', 'light', 'moderate', 'heavy'), 'step': 1},
+    'bmi_category': {'scale': ('underweight', 'normal', 'overweight', 'obese'), 'step': 2},
+    'region': {'cost': 3},
+    'gender': {'cost': 4},
+    # Only towards a stricter diet: vegetarians can follow a vegan plan, not a non-veg one
+    'diet_type': {'cost': 5, 'substitutes': {'non_veg': ('vegetarian', 'vegan'), 'vegetarian': ('vegan',)}},
+}
+MAX_DISTANCE = 10
+MAX_ALTERNATIVES = 3
+
+Cell = Tuple[Any, ...]
+
+
+class CoverageLattice:
+    """Plan counts per populated cell, and the nearest populated cells to any cell"""
+
+    def __init__(self, counts: Dict[Cell, int], fields: Sequence[str] = LATTICE_FIELDS,
+                 relaxation: Optional[Dict[str, Dict[str, Any]]] = None, max_distance: float = MAX_DISTANCE):
+        """counts: cell (values in fields order) -> plans, as returned by a catalog's cells()"""
+        self.fields = tuple(fields)
+        self.counts = {cell: count for cell, count in counts.items() if count > 0}
+        self.relaxation = RELAXATION if relaxation is None else relaxation
+        self.max_distance = max_distance
+        # Values each field takes in some populated cell: the candidates for a flat-cost change
+        self.values = [sorted({cell[i] for cell in self.counts}, key=str) for i in range(len(self.fields))]
+
+    @classmethod
+    def from_catalog(cls, catalog: Any, normalize: Optional[Dict[str, Any]] = None,
+                     fields: Sequence[str] = LATTICE_FIELDS, **params) -> "CoverageLattice":
+        return cls(catalog.cells(fields, normalize), fields, **params)
+
+    def __len__(self) -> int:
+        return len(self.counts)
+
+    def count(self, criteria: Dict[str, Any]) -> int:
+        return self.counts.get(self.cell(criteria), 0)
+
+    def cell(self, criteria: Dict[str, Any]) -> Cell:
+        return tuple(criteria.get(field) for field in self.fields)
+
+    def _moves(self, position: int, value: Any) -> Iterator[Tuple[Any, float]]:
+        """(other value, cost) for one relaxation step of the field at position"""
+        rule = self.relaxation.get(self.fields[position])
+        if rule is None:
+            return
+        scale = rule.get('scale')
+        if scale is not None:
+            if value not in scale:
+                for other in scale:
+                    yield other, rule['step']
+                return
+            i = scale.index(value)
+            for j in (i - 1, i + 1):
+                if 0 <= j < len(scale):
+                    yield scale[j], rule['step']
+            return
+        substitutes = rule.get('substitutes')
+        candidates = substitutes.get(value, ()) if substitutes is not None else self.values[position]
+        for other in candidates:
+            if other != value:
+                yield other, rule['cost']
+
+    def nearest(self, criteria: Dict[str, Any], limit: int = MAX_ALTERNATIVES,
+                max_distance: Optional[float] = None) -> List[Tuple[float, Dict[str, Any], int]]:
+        """Up to limit populated cells closest to criteria, nearest first: (distance, cell, plans).
+
+        The criteria's own cell comes first (distance 0) when it is populated. Equal
+        distances keep the order in which the search reached them.
+        """
+        max_distance = self.max_distance if max_distance is None else max_distance
+        start = self.cell(criteria)
+        best = {start: 0}
+        tie = itertools.count()
+        heap = [(0, next(tie), start)]
+        found = []
+        while heap and len(found) < limit:
+            distance, _, cell = heapq.heappop(heap)
+            if distance > best[cell]:
+                continue
+            if cell in self.counts:
+                found.append((distance, dict(zip(self.fields, cell)), self.counts[cell]))
+            for position, value in enumerate(cell):
+                for other, cost in self._moves(position, value):
+                    neighbour = cell[:position] + (other,) + cell[position + 1:]
+                    reached = distance + cost
+                    if reached <= max_distance and reached < best.get(neighbour, math.inf):
+                        best[neighbour] = reached
+                        heapq.heappush(heap, (reached, next(tie), neighbour))
+        return found
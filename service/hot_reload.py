@@ -0,0 +1,241 @@
+"""
+Hot reload of the plan corpus with snapshot isolation.
+
+Everything derived from the index files (catalog, recommenders, schedule
+resolver, match cache, card blobs) lives in a CorpusSnapshot. A watcher
+thread polls the watched files' (mtime, size); once a change has settled for
+one poll interval, a new snapshot is built in the background and swapped in
+under a lock. Requests pin the snapshot that was current when they started
+(see SnapshotManager.use), so an in-flight request never mixes two versions.
+A replaced snapshot is released once its last request finishes.
+
+Parsed plan text is not part of a snapshot: the parse cache already checks
+each file's (mtime, size) on every lookup.
+"""
+
+import contextvars
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+Fingerprint = Tuple[Tuple[str, Optional[int], Optional[int]], ...]
+
+
+def fingerprint(paths: Iterable[Union[str, Path]]) -> Fingerprint:
+    """(path, mtime_ns, size) for each path; missing files are (path, None, None)"""
+    entries = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+            entries.append((str(path), st.st_mtime_ns, st.st_size))
+        except OSError:
+            entries.append((str(path), None, None))
+    return tuple(entries)
+
+
+class CorpusSnapshot:
+    """One version of the corpus; components are built on first use from the manager's factories"""
+
+    def __init__(self, generation: int, version: Fingerprint, factories: Dict[str, Callable[["CorpusSnapshot"], Any]]):
+        self.generation = generation
+        self.version = version
+        self.factories = factories
+        self.refs = 0
+        self.retired = False
+        self._components: Dict[str, Any] = {}
+        self._lock = threading.RLock()
+
+    def get(self, name: str) -> Any:
+        component = self._components.get(name)
+        if component is None:
+            with self._lock:
+                component = self._components.get(name)
+                if component is None:
+                    component = self.factories[name](self)
+                    self._components[name] = component
+        return component
+
+    def built(self) -> Iterable[str]:
+        """Names of the components built so far"""
+        return list(self._components)
+
+    def release(self):
+        self._components.clear()
+
+
+class SnapshotManager:
+    """Current corpus snapshot, per-request pinning and background reloads"""
+
+    def __init__(self, factories: Dict[str, Callable[[CorpusSnapshot], Any]], watch: Iterable[Union[str, Path]],
+                 interval: float = 5.0, eager: Iterable[str] = (), on_swap: Optional[Callable] = None):
+        self.factories = factories
+        self.watch = [Path(p) for p in watch]
+        self.interval = interval
+        self.eager = tuple(eager)
+        self.on_swap = on_swap
+        self.generation = 0
+        self.released = 0
+        self._current: Optional[CorpusSnapshot] = None
+        self._retired = set()
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self._active = contextvars.ContextVar(f"corpus_snapshot_{id(self)}", default=None)
+        self._pending: Optional[Fingerprint] = None
+        self._failed: Optional[Fingerprint] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _build(self, components: Iterable[str]) -> CorpusSnapshot:
+        # Fingerprint first: a write that lands during the build is picked up by the next check
+        version = fingerprint(self.watch)
+        snapshot = CorpusSnapshot(self.generation + 1, version, self.factories)
+        for name in components:
+            snapshot.get(name)
+        return snapshot
+
+    def current(self) -> CorpusSnapshot:
+        """Latest snapshot (built on first use)"""
+        snapshot = self._current
+        if snapshot is None:
+            with self._build_lock:
+                if self._current is None:
+                    snapshot = self._build(self.eager)
+                    with self._lock:
+                        self.generation = snapshot.generation
+                        self._current = snapshot
+                snapshot = self._current
+        return snapshot
+
+    def active(self) -> CorpusSnapshot:
+        """Snapshot pinned by the running request, else the current one"""
+        return self._active.get() or self.current()
+
+    def acquire(self) -> CorpusSnapshot:
+        self.current()
+        with self._lock:
+            # Read under the lock so a swap can't retire it between the read and the increment
+            snapshot = self._current
+            snapshot.refs += 1
+        return snapshot
+
+    def release(self, snapshot: CorpusSnapshot):
+        with self._lock:
+            snapshot.refs -= 1
+            drained = snapshot.retired and snapshot.refs == 0
+            if drained:
+                self._retired.discard(snapshot)
+        if drained:
+            self._drop(snapshot)
+
+    @contextmanager
+    def use(self):
+        """Pin the current snapshot for the duration of the block (one request).
+
+        Before the first snapshot is built nothing is pinned: the request builds
+        it on first access (in its worker thread, not here).
+        """
+        if self._current is None:
+            yield None
+            return
+        snapshot = self.acquire()
+        token = self._active.set(snapshot)
+        try:
+            yield snapshot
+        finally:
+            self._active.reset(token)
+            self.release(snapshot)
+
+    def reload(self) -> CorpusSnapshot:
+        """Build a new snapshot now (with the components the current one has built) and swap it in"""
+        with self._build_lock:
+            old = self.current()
+            snapshot = self._build(self.eager + tuple(n for n in old.built() if n not in self.eager))
+            with self._lock:
+                self.generation = snapshot.generation
+                self._current = snapshot
+                old.retired = True
+                drained = old.refs == 0
+                if not drained:
+                    self._retired.add(old)
+        logger.info("Swapped in corpus snapshot %d", snapshot.generation,
+                    extra={"draining": 0 if drained else old.refs})
+        if drained:
+            self._drop(old)
+        if self.on_swap:
+            self.on_swap(snapshot)
+        return snapshot
+
+    def _drop(self, snapshot: CorpusSnapshot):
+        snapshot.release()
+        self.released += 1
+        logger.info("Released corpus snapshot %d", snapshot.generation)
+
+    def check(self) -> bool:
+        """Reload if the watched files changed and have been stable since the last check"""
+        current = self.current()
+        version = fingerprint(self.watch)
+        if version == current.version:
+            self._pending = None
+            return False
+        if version != self._pending:
+            # Still being written (or just noticed): wait one more interval
+            self._pending = version
+            return False
+        if version == self._failed:
+            return False
+        try:
+            self.reload()
+        except Exception:
+            logger.exception("Corpus reload failed, keeping snapshot %d", current.generation)
+            self._failed = version
+            return False
+        self._pending = None
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            current = self._current
+            return {
+                "generation": current.generation if current else 0,
+                "active_requests": current.refs if current else 0,
+                "draining": {s.generation: s.refs for s in self._retired},
+                "released": self.released,
+            }
+
+    def start(self):
+        """Start the watcher thread (no-op if interval <= 0 or already running)"""
+        if self.interval <= 0 or (self._thread and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._watch, name="corpus-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _watch(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception:
+                logger.exception("Corpus watcher check failed")
+
+
+class SnapshotMiddleware:
+    """ASGI middleware pinning one corpus snapshot per HTTP request (including streamed bodies)"""
+
+    def __init__(self, app, manager: SnapshotManager):
+        self.app = app
+        self.manager = manager
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        with self.manager.use():
+            await self.app(scope, receive, send)
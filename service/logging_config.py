@@ -0,0 +1,189 @@
+"""
+Non-blocking, structured logging for the service.
+
+Records are put on an in-memory queue by a QueueHandler on the root logger
+and written to stderr by a QueueListener thread, so request threads never
+wait on terminal or file I/O. Configuration comes from the environment:
+
+- LOG_LEVEL: root level (default INFO)
+- LOG_LEVELS: per-module levels, e.g. "service.pdf_recommender=DEBUG,service.api=WARNING"
+- LOG_FORMAT: "text" (default) or "json"
+- LOG_DEBUG_SAMPLE: keep 1 in N DEBUG records per logger (default 1, i.e. all)
+
+Structured fields are passed with `extra=` and rendered as key=value pairs
+(text) or top-level keys (json). Hot paths should log with %-style args so
+messages are only built for records that pass the level check.
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+from typing import Dict, Optional
+
+LOG_FORMAT_TEXT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+
+# Attributes every LogRecord has; anything else came in through extra=
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "taskName", "color_message"}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional[logging.handlers.QueueHandler] = None
+_lock = threading.Lock()
+
+
+def structured_fields(record: logging.LogRecord) -> Dict[str, object]:
+    """Fields passed to the logging call with extra="""
+    return {k: v for k, v in vars(record).items() if k not in _RECORD_ATTRS and not k.startswith("_")}
+
+
+class StructuredFormatter(logging.Formatter):
+    """Text lines with the structured fields appended as key=value"""
+
+    def __init__(self):
+        super().__init__(LOG_FORMAT_TEXT)
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        fields = structured_fields(record)
+        if fields:
+            line += " " + " ".join(f"{k}={v!r}" if isinstance(v, str) and " " in v else f"{k}={v}"
+                                   for k, v in fields.items())
+        return line
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per record, structured fields as top-level keys"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        entry.update(structured_fields(record))
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class DebugSampler(logging.Filter):
+    """Keeps 1 in every `every` DEBUG (and lower) records per logger; other levels always pass"""
+
+    def __init__(self, every: int = 1):
+        super().__init__()
+        self.every = max(1, every)
+        self._counts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.every == 1 or record.levelno > logging.DEBUG:
+            return True
+        with self._lock:
+            count = self._counts.get(record.name, 0)
+            self._counts[record.name] = count + 1
+        return count % self.every == 0
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that keeps the exception for the listener's formatter.
+
+    The stdlib handler formats the whole record (and drops exc_info) on the
+    calling thread; here only the message is merged so args can't change
+    before the listener gets to it, and the traceback is rendered off-thread.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = logging.makeLogRecord(vars(record))
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.exc_info = None
+        return record
+
+
+def parse_module_levels(spec: str) -> Dict[str, str]:
+    """'a=DEBUG,b.c=warning' -> {'a': 'DEBUG', 'b.c': 'WARNING'}"""
+    levels = {}
+    for item in (spec or "").split(","):
+        name, sep, level = item.partition("=")
+        if sep and name.strip() and level.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def configure_logging(level: Optional[str] = None,
+                      module_levels: Optional[Dict[str, str]] = None,
+                      fmt: Optional[str] = None,
+                      debug_sample: Optional[int] = None,
+                      stream=None) -> logging.handlers.QueueListener:
+    """Route all logging through a queue; safe to call more than once (reconfigures)"""
+    global _listener, _queue_handler
+
+    level = (level or os.environ.get("LOG_LEVEL", "INFO")).upper()
+    if module_levels is None:
+        module_levels = parse_module_levels(os.environ.get("LOG_LEVELS", ""))
+    fmt = fmt or os.environ.get("LOG_FORMAT", "text")
+    if debug_sample is None:
+        debug_sample = int(os.environ.get("LOG_DEBUG_SAMPLE", "1"))
+
+    with _lock:
+        shutdown_logging()
+
+        output = logging.StreamHandler(stream or sys.stderr)
+        output.setFormatter(JSONFormatter() if fmt == "json" else StructuredFormatter())
+
+        log_queue = queue.SimpleQueue()
+        _queue_handler = _QueueHandler(log_queue)
+        _queue_handler.addFilter(DebugSampler(debug_sample))
+
+        root = logging.getLogger()
+        # Replace handlers installed by basicConfig in scripts we were imported from
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(_queue_handler)
+        root.setLevel(level)
+        for name, module_level in module_levels.items():
+            logging.getLogger(name).setLevel(module_level)
+
+        _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+        _listener.start()
+        return _listener
+
+
+def shutdown_logging():
+    """Flush queued records and stop the listener thread"""
+    global _listener, _queue_handler
+    if _queue_handler is not None:
+        logging.getLogger().removeHandler(_queue_handler)
+        _queue_handler = None
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.flush()
+        _listener = None
+
+
+def _restart_listener_after_fork():
+    """Threads don't survive fork: give a forked worker its own queue and listener.
+
+    Records still queued in the parent at fork time stay the parent's to write.
+    """
+    global _listener
+    if _listener is not None and _queue_handler is not None:
+        _queue_handler.queue = queue.SimpleQueue()
+        _listener = logging.handlers.QueueListener(_queue_handler.queue, *_listener.handlers,
+                                                   respect_handler_level=True)
+        _listener.start()
+
+
+atexit.register(shutdown_logging)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_restart_listener_after_fork)
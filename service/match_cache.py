@@ -0,0 +1,82 @@
+"""
+Memoized recommender matches.
+
+Exact-match and goal-only results depend only on a handful of profile
+fields, so they are cached per (system, profile key). The profile key is the
+canonical JSON of those fields, which is also what the query log records
+for cache pre-warming (see service/warmup.py).
+"""
+
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+# Profile fields any recommender reads; everything else (name, email,
+# plan dates, ...) is irrelevant to matching
+MATCH_PROFILE_FIELDS = (
+    'gender',
+    'age',
+    'height',
+    'weight',
+    'target_weight',
+    'bmi',
+    'bmi_category',
+    'activity_level',
+    'diet_type',
+    'region',
+    'goal',
+    'goals',
+    'medical_conditions',
+    'allergies',
+)
+
+
+def match_profile(profile: Dict[str, Any]) -> Dict[str, Any]:
+    """The matching-relevant subset of a (normalized) profile."""
+    return {field: profile[field] for field in MATCH_PROFILE_FIELDS if profile.get(field) not in (None, '', [])}
+
+
+def profile_key(profile: Dict[str, Any]) -> str:
+    """Canonical, compact key for the matching-relevant part of a profile."""
+    return json.dumps(match_profile(profile), sort_keys=True, separators=(',', ':'), default=str)
+
+
+class MatchCache:
+    """Bounded LRU of recommender results keyed by (system, profile key)."""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, system: str, key: str) -> Optional[Any]:
+        with self._lock:
+            result = self._entries.get((system, key))
+            if result is not None:
+                self._entries.move_to_end((system, key))
+            return result
+
+    def put(self, system: str, key: str, result: Any):
+        with self._lock:
+            self._entries[(system, key)] = result
+            self._entries.move_to_end((system, key))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_or_compute(self, system: str, profile: Dict[str, Any], compute: Callable[[], Any]) -> Any:
+        """Cached result for the profile, computing (and caching) it on a miss."""
+        key = profile_key(profile)
+        result = self.get(system, key)
+        if result is None:
+            result = compute()
+            self.put(system, key, result)
+        return result
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,145 @@
+"""
+On-demand meal plan schedule.
+
+Instead of materializing every day of the cycle into meal_plans.json, the
+stored plan only holds:
+- the selected plans (catalog ids for PDF plans, inline meals for AI plans)
+- the start date and horizon (number of days)
+- per-day overrides (meal swaps)
+
+The plan for any date is computed from those with
+PDFRecommender.plan_for_day and memoized, so a 90-day program costs the same
+to store and to look up as a 14-day one.
+"""
+
+import copy
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+SCHEDULE_VERSION = 2
+DATE_FORMAT = "%Y-%m-%d"
+
+
+def new_schedule(selected_plans: List[Dict[str, Any]], start_date: str, days: int) -> Dict[str, Any]:
+    """Build the persisted schedule document for a plan selection."""
+    selection = []
+    for plan in selected_plans:
+        if plan.get('ai_generated') or not plan.get('file_path'):
+            # AI-generated plans have no file to re-read, keep their meals inline
+            selection.append(plan)
+        else:
+            selection.append({
+                'plan_id': plan.get('id'),
+                'file_path': plan.get('file_path'),
+            })
+
+    return {
+        'version': SCHEDULE_VERSION,
+        'start_date': start_date,
+        'days': days,
+        'selection': selection,
+        'overrides': {},
+    }
+
+
+def is_schedule(meal_plans: Any) -> bool:
+    """True for a v2 schedule document (legacy files hold a list of days)."""
+    return isinstance(meal_plans, dict) and meal_plans.get('version') == SCHEDULE_VERSION
+
+
+def day_offset(schedule: Dict[str, Any], date: str) -> Optional[int]:
+    """Offset of date from the schedule start, or None if outside the horizon."""
+    try:
+        start = datetime.strptime(schedule['start_date'], DATE_FORMAT)
+        target = datetime.strptime(date, DATE_FORMAT)
+    except (KeyError, TypeError, ValueError):
+        return None
+
+    offset = (target - start).days
+    if offset < 0 or offset >= schedule.get('days', 0):
+        return None
+    return offset
+
+
+class MealScheduleResolver:
+    """Computes (and memoizes) the daily plan for a date of a stored schedule."""
+
+    def __init__(self, recommender, max_days: int = 512, max_selections: int = 32):
+        self.recommender = recommender
+        self.max_days = max_days
+        self.max_selections = max_selections
+        self._days = OrderedDict()
+        self._selections = OrderedDict()
+        self._lock = threading.Lock()
+
+    def plan_for_date(self, schedule: Dict[str, Any], date: str) -> Optional[Dict[str, Any]]:
+        """Daily plan for date with that day's overrides applied, or None."""
+        offset = day_offset(schedule, date)
+        if offset is None:
+            return None
+
+        selection = schedule.get('selection', [])
+        fingerprint = self._fingerprint(selection)
+        key = (fingerprint, schedule['start_date'], offset)
+
+        with self._lock:
+            daily_plan = self._days.get(key)
+            if daily_plan is not None:
+                self._days.move_to_end(key)
+
+        if daily_plan is None:
+            plans_with_meals = self._plans_with_meals(fingerprint, selection)
+            if not plans_with_meals:
+                return None
+            start = datetime.strptime(schedule['start_date'], DATE_FORMAT)
+            daily_plan = self.recommender.plan_for_day(plans_with_meals, start, offset)
+            with self._lock:
+                self._days[key] = daily_plan
+                if len(self._days) > self.max_days:
+                    self._days.popitem(last=False)
+
+        # Callers get their own copy; cached days are never mutated
+        daily_plan = copy.deepcopy(daily_plan)
+        override = schedule.get('overrides', {}).get(date)
+        if override:
+            daily_plan.update(override)
+        return daily_plan
+
+    def _plans_with_meals(self, fingerprint: str, selection: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        with self._lock:
+            cached = self._selections.get(fingerprint)
+            if cached is not None:
+                self._selections.move_to_end(fingerprint)
+                return cached
+
+        plans_with_meals = []
+        for entry in selection:
+            plan = self._resolve_plan(entry)
+            meal_options = self.recommender.load_meal_options(plan)
+            if meal_options is not None:
+                plans_with_meals.append({'plan': plan, 'meals': meal_options})
+
+        with self._lock:
+            self._selections[fingerprint] = plans_with_meals
+            if len(self._selections) > self.max_selections:
+                self._selections.popitem(last=False)
+        return plans_with_meals
+
+    def _resolve_plan(self, entry: Dict[str, Any]) -> Dict[str, Any]:
+        """Full index record for a stored selection entry."""
+        # Schedules saved before plans had ids store the relative path instead
+        plan_id = entry.get('plan_id')
+        if plan_id is not None and plan_id != '':
+            plan = self.recommender.get_plan_details(plan_id)
+            if plan:
+                return plan
+        return entry
+
+    @staticmethod
+    def _fingerprint(selection: List[Dict[str, Any]]) -> str:
+        encoded = json.dumps(selection, sort_keys=True, default=str).encode('utf-8')
+        return hashlib.sha1(encoded).hexdigest()
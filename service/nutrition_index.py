@@ -0,0 +1,188 @@
+"""
+Range queries over the plans' nutrition and age bands, and daily targets.
+
+Every index entry carries nutrition.calories_min/max (and protein, carbs,
+fat, fiber) and age_info.age_min/max. NutritionIndex keeps one interval tree
+per band, so "calorie band overlaps 1800-2000 kcal and age band covers 34"
+costs O(log n + k) per band instead of a scan of every plan.
+
+daily_targets estimates a user's calories (Mifflin-St Jeor BMR x activity
+factor, adjusted for the goal) and protein; rank_by_targets orders plans by
+how far their calorie and protein bands are from those targets.
+"""
+
+import bisect
+import math
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Sequence, Tuple
+
+# Band name -> (plan field, min key, max key)
+RANGE_FIELDS = {
+    'calories': ('nutrition', 'calories_min', 'calories_max'),
+    'protein': ('nutrition', 'protein_min', 'protein_max'),
+    'carbs': ('nutrition', 'carbs_min', 'carbs_max'),
+    'fat': ('nutrition', 'fat_min', 'fat_max'),
+    'fiber': ('nutrition', 'fiber_min', 'fiber_max'),
+    'age': ('age_info', 'age_min', 'age_max'),
+}
+
+# Total energy expenditure = BMR x factor (index activity levels)
+ACTIVITY_FACTORS = {
+    'sedentary': 1.2,
+    'light': 1.375,
+    'moderate': 1.55,
+    'heavy': 1.725,
+}
+
+# Goal adjustments, matched as substrings of the goal: kcal per day and protein g/kg
+GOAL_CALORIE_ADJUSTMENTS = (('weight_loss', -500), ('weight_gain', 300))
+GOAL_PROTEIN_PER_KG = (('protein', 1.6), ('muscle', 1.6), ('weight_loss', 1.2), ('weight_gain', 1.2))
+DEFAULT_PROTEIN_PER_KG = 1.0
+MIN_CALORIES = 1200
+
+Interval = Tuple[float, float, Hashable]
+
+
+class IntervalTree:
+    """Static centered interval tree over closed intervals (start, end, key)"""
+
+    def __init__(self, intervals: Iterable[Interval]):
+        by_start = sorted(intervals, key=lambda interval: interval[0])
+        self._starts = [interval[0] for interval in by_start]
+        self._by_start = by_start
+        self._root = self._build(by_start)
+
+    def _build(self, intervals: List[Interval]) -> Optional[tuple]:
+        """(center, intervals containing it by start, the same by end descending, left, right)"""
+        if not intervals:
+            return None
+        endpoints = sorted(point for interval in intervals for point in interval[:2])
+        center = endpoints[len(endpoints) // 2]
+        left = [interval for interval in intervals if interval[1] < center]
+        right = [interval for interval in intervals if interval[0] > center]
+        here = [interval for interval in intervals if interval[0] <= center <= interval[1]]
+        return (center, here, sorted(here, key=lambda interval: -interval[1]),
+                self._build(left), self._build(right))
+
+    def stab(self, point: float) -> List[Hashable]:
+        """Keys of the intervals containing point"""
+        keys = []
+        node = self._root
+        while node is not None:
+            center, by_start, by_end, left, right = node
+            if point < center:
+                for start, _, key in by_start:
+                    if start > point:
+                        break
+                    keys.append(key)
+                node = left
+            elif point > center:
+                for _, end, key in by_end:
+                    if end < point:
+                        break
+                    keys.append(key)
+                node = right
+            else:
+                keys.extend(key for _, _, key in by_start)
+                break
+        return keys
+
+    def overlap(self, low: float, high: float) -> List[Hashable]:
+        """Keys of the intervals overlapping [low, high]: those containing low, plus those starting in (low, high]"""
+        if low > high:
+            return []  # an empty range, not a stab at low
+        keys = self.stab(low)
+        first = bisect.bisect_right(self._starts, low)
+        last = bisect.bisect_right(self._starts, high)
+        keys.extend(key for _, _, key in self._by_start[first:last])
+        return keys
+
+    def __len__(self) -> int:
+        return len(self._by_start)
+
+
+def plan_band(plan: Dict[str, Any], band: str) -> Optional[Tuple[float, float]]:
+    """(min, max) of one of the plan's bands, or None if the index has no values for it"""
+    field, min_key, max_key = RANGE_FIELDS[band]
+    values = plan.get(field) or {}
+    low, high = values.get(min_key), values.get(max_key)
+    if low is None or high is None:
+        return None
+    return (low, high) if low <= high else (high, low)
+
+
+class NutritionIndex:
+    """Interval trees over the nutrition and age bands of a catalog's plans (keyed by plan id)"""
+
+    def __init__(self, plans: Iterable[Dict[str, Any]] = (),
+                 bands: Optional[Iterable[Tuple[Hashable, Dict[str, Tuple[float, float]]]]] = None):
+        """plans in catalog order, or bands: (plan id, {band: (min, max)}) in catalog order"""
+        if bands is None:
+            bands = ((plan['id'], {band: plan_band(plan, band) for band in RANGE_FIELDS}) for plan in plans)
+        intervals: Dict[str, List[Interval]] = {band: [] for band in RANGE_FIELDS}
+        self.order: Dict[Hashable, int] = {}
+        for position, (plan_id, plan_bands) in enumerate(bands):
+            self.order[plan_id] = position
+            for band, bounds in plan_bands.items():
+                if bounds is not None and band in intervals:
+                    intervals[band].append((bounds[0], bounds[1], plan_id))
+        self.trees = {band: IntervalTree(band_intervals) for band, band_intervals in intervals.items()}
+
+    @classmethod
+    def from_catalog(cls, catalog: Any) -> "NutritionIndex":
+        """Index of a catalog; a sharded catalog's bands come from its manifest, so no shard is loaded"""
+        plan_bands = getattr(catalog, 'plan_bands', None)
+        bands = plan_bands() if plan_bands is not None else None
+        return cls(catalog) if bands is None else cls(bands=bands)
+
+    def query(self, bands: Dict[str, Tuple[Optional[float], Optional[float]]]) -> List[Hashable]:
+        """Ids of the plans whose band overlaps every given (low, high), in catalog order.
+
+        A None bound is open; (age, age) asks for age bands covering age.
+        Plans without a value for a queried band never match it, and an
+        inverted range (low > high) matches nothing.
+        """
+        matched = None
+        for band, (low, high) in bands.items():
+            keys = self.trees[band].overlap(-math.inf if low is None else low, math.inf if high is None else high)
+            matched = set(keys) if matched is None else matched.intersection(keys)
+            if not matched:
+                return []
+        if matched is None:
+            return sorted(self.order, key=self.order.__getitem__)
+        return sorted(matched, key=self.order.__getitem__)
+
+
+def daily_targets(gender: str, age: Any, height: Any, weight: Any,
+                  activity: str, goal: str = '') -> Optional[Dict[str, float]]:
+    """Estimated daily calories and protein (g), or None without a usable age, height (cm) and weight (kg)"""
+    try:
+        age, height, weight = float(age), float(height), float(weight)
+    except (TypeError, ValueError):
+        return None
+    if min(age, height, weight) <= 0:
+        return None
+
+    # Mifflin-St Jeor
+    bmr = 10 * weight + 6.25 * height - 5 * age + (5 if (gender or '').lower() == 'male' else -161)
+    calories = bmr * ACTIVITY_FACTORS.get(activity, ACTIVITY_FACTORS['light'])
+    goal = (goal or '').lower()
+    calories += next((delta for name, delta in GOAL_CALORIE_ADJUSTMENTS if name in goal), 0)
+    protein_per_kg = next((grams for name, grams in GOAL_PROTEIN_PER_KG if name in goal), DEFAULT_PROTEIN_PER_KG)
+    return {'calories': round(max(calories, MIN_CALORIES)), 'protein': round(weight * protein_per_kg)}
+
+
+def target_distance(plan: Dict[str, Any], targets: Dict[str, float]) -> float:
+    """Sum over the targets of how far the plan's band is from each, relative to the target (0 = all inside)"""
+    distance = 0.0
+    for band, target in targets.items():
+        bounds = plan_band(plan, band)
+        if bounds is None:
+            return math.inf
+        low, high = bounds
+        distance += max(low - target, target - high, 0) / target
+    return distance
+
+
+def rank_by_targets(plans: Sequence[Dict[str, Any]], targets: Dict[str, float]) -> List[Dict[str, Any]]:
+    """Plans closest to the targets first (plans without the bands last, ties in their given order)"""
+    return sorted(plans, key=lambda plan: target_distance(plan, targets))
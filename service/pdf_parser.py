@@ -2,8 +2,11 @@
 Comprehensive PDF Parser for Diet Plans
 Extracts ALL food-related content from PDF text files
 """
+from collections import OrderedDict
 from typing import Dict, List, Any, Optional
+import os
 import re
+import threading
 
 
 class CompletePDFParser:
@@ -397,8 +400,65 @@ class CompletePDFParser:
         return references
 
 
+class ParseCache:
+    """Bounded LRU of parsed plans keyed by path, invalidated by mtime/size.
+
+    Shared by every caller of parse_pdf_complete (card extraction, meal
+    schedules, the PDF viewer, the compare endpoint), so a plan parsed for one
+    of them is free for the others. Cached results are shared objects and
+    must be treated as read-only.
+    """
+
+    def __init__(self, max_entries: int = 512):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _stat_key(file_path: str):
+        stat = os.stat(file_path)
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def get(self, file_path: str, parser: "CompletePDFParser") -> Dict[str, Any]:
+        try:
+            stat_key = self._stat_key(file_path)
+        except OSError:
+            # Let the parser report the missing file; errors are never cached
+            return parser.parse_complete_pdf(file_path)
+
+        with self._lock:
+            entry = self._entries.get(file_path)
+            if entry is not None and entry[0] == stat_key:
+                self._entries.move_to_end(file_path)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        result = parser.parse_complete_pdf(file_path)
+        if "error" not in result:
+            with self._lock:
+                self._entries[file_path] = (stat_key, result)
+                self._entries.move_to_end(file_path)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return result
+
+    def __contains__(self, file_path: str) -> bool:
+        with self._lock:
+            return file_path in self._entries
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_parser = CompletePDFParser()
+parse_cache = ParseCache()
+
+
 # Convenience function for API use
 def parse_pdf_complete(file_path: str) -> Dict[str, Any]:
-    """Parse complete food information from PDF"""
-    parser = CompletePDFParser()
-    return parser.parse_complete_pdf(file_path)
+    """Parse complete food information from PDF (memoized in parse_cache)"""
+    return parse_cache.get(file_path, _parser)
@@ -9,15 +9,16 @@ HIERARCHICAL EXACT MATCH - matches in order:
 6. Activity Level (sedentary/light/moderate/heavy)
 """
 
-import json
 import logging
 from pathlib import Path
 from typing import List, Dict, Any, Optional
 from dataclasses import dataclass
+from datetime import datetime, timedelta
 from service.pdf_parser import parse_pdf_complete
-import random
+from service.plan_catalog import PlanCatalog, load_catalog
+from service.search_index import SearchIndex, build_search_index, tokenize
+from service.nutrition_index import daily_targets, rank_by_targets
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
@@ -69,23 +70,23 @@ class PDFRecommender:
         # Skip: edema, insulin_resistance_obesity (no folders)
     }
     
-    def __init__(self, index_path: str = "outputs/pdf_index.json"):
-        """Initialize recommender with PDF index."""
+    def __init__(self, index_path: str = "outputs/pdf_index.json", catalog: Optional[PlanCatalog] = None,
+                 search_index: Optional[SearchIndex] = None):
+        """Initialize recommender with PDF index (or an already loaded catalog and search index)."""
         self.index_path = Path(index_path)
         self.index = None
+        self.catalog = catalog
+        self.search_index = search_index
         self.load_index()
     
     def load_index(self):
-        """Load PDF index from file."""
-        logger.info(f"Loading PDF index from {self.index_path}")
+        """Load PDF index from file (shared with the other recommenders)."""
+        if self.catalog is None:
+            logger.info("Loading PDF index from %s", self.index_path)
+            self.catalog = load_catalog(self.index_path)
+        self.index = self.catalog.index
         
-        if not self.index_path.exists():
-            raise FileNotFoundError(f"Index file not found: {self.index_path}")
-        
-        with open(self.index_path, 'r', encoding='utf-8') as f:
-            self.index = json.load(f)
-        
-        logger.info(f"Loaded {self.index['metadata']['total_plans']} plans")
+        logger.info("Loaded %d plans", self.index['metadata']['total_plans'])
     
     def hierarchical_exact_match(self, user: UserProfile) -> List[Dict[str, Any]]:
         """
@@ -97,40 +98,27 @@ class PDFRecommender:
         5. BMI Category → underweight/normal/overweight/obese
         6. Activity Level → sedentary/light/moderate/heavy
         """
-        matched = []
-        
         # Step 1: Map goal to category
         category = self.GOAL_TO_CATEGORY.get(user.goal)
         if not category:
-            logger.warning(f"Goal '{user.goal}' has no matching category folder")
+            logger.warning("Goal %r has no matching category folder", user.goal)
             return []
         
-        logger.info(f"\n{'='*80}")
-        logger.info(f"HIERARCHICAL EXACT MATCH")
-        logger.info(f"{'='*80}")
-        logger.info(f"Step 1: GOAL = '{user.goal}' → Category = '{category}'")
-        logger.info(f"Step 2: Region = '{user.region}'")
-        logger.info(f"Step 3: Diet = '{user.diet_type}'")
-        logger.info(f"Step 4: Gender = '{user.gender}'")
-        logger.info(f"Step 5: BMI = '{user.bmi_category}'")
-        logger.info(f"Step 6: Activity = '{user.activity_level}'")
-        logger.info(f"{'='*80}\n")
-        
-        # Filter through index
-        for plan in self.index['plans']:
-            plan_category = plan.get('category', '')
-            
-            # ALL 6 factors must match EXACTLY in hierarchy
-            if (plan_category == category and
-                plan.get('region') == user.region and
-                self._normalize_diet(plan.get('diet_type')) == self._normalize_diet(user.diet_type) and
-                plan.get('gender') == user.gender and
-                self._normalize_bmi(plan.get('bmi_category')) == self._normalize_bmi(user.bmi_category) and
-                self._normalize_activity(plan.get('activity')) == self._normalize_activity(user.activity_level)):
-                
-                matched.append(plan)
-        
-        logger.info(f"✓ Found {len(matched)} plans matching ALL 6 factors (goal + 5 others)")
+        # ALL 6 factors must match EXACTLY in hierarchy (scans the catalog's code columns)
+        matched = self.catalog.select(
+            {'category': category, 'region': user.region,
+             'diet_type': self._normalize_diet(user.diet_type), 'gender': user.gender,
+             'bmi_category': self._normalize_bmi(user.bmi_category),
+             'activity': self._normalize_activity(user.activity_level)},
+            normalize={'diet_type': self._normalize_diet, 'bmi_category': self._normalize_bmi,
+                       'activity': self._normalize_activity},
+        )
+        
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Hierarchical exact match found %d plans", len(matched), extra={
+                'goal': user.goal, 'category': category, 'region': user.region, 'diet': user.diet_type,
+                'gender': user.gender, 'bmi': user.bmi_category, 'activity': user.activity_level,
+            })
         return matched
     
     def _normalize_diet(self, diet: str) -> str:
@@ -188,23 +176,120 @@ class PDFRecommender:
             top_k: Number of recommendations to return (default 10)
         
         Returns:
-            List of plan dicts (exact matches only)
+            List of plan dicts (exact matches only), closest to the user's
+            calorie and protein targets first
         """
-        logger.info(f"Starting hierarchical exact match for user: {user.goal}")
-        
         # Get hierarchical exact matches
         matched_plans = self.hierarchical_exact_match(user)
         
         if not matched_plans:
-            logger.warning(f"❌ No plans match ALL 6 factors for goal='{user.goal}'")
+            logger.debug("No plans match all 6 factors for goal %r", user.goal)
             return []
         
-        # Return matched plans (shuffle for variety)
-        random.shuffle(matched_plans)
+        targets = self.daily_targets(user)
+        if targets:
+            matched_plans = rank_by_targets(matched_plans, targets)
         
-        logger.info(f"✓ Returning {min(top_k, len(matched_plans))} exact matches")
         return matched_plans[:top_k]
     
+    def daily_targets(self, user: UserProfile) -> Optional[Dict[str, float]]:
+        """User's estimated daily calories and protein (None without age, height and weight)."""
+        return daily_targets(user.gender, user.age, user.height, user.weight,
+                             self._normalize_activity(user.activity_level), user.goal)
+    
+    # Meal slots every daily plan carries (dashboard expects all 8)
+    MEAL_SLOTS = [
+        'early_morning',
+        'pre_activity',
+        'breakfast',
+        'mid_morning_snack',
+        'lunch',
+        'evening_snack',
+        'dinner',
+        'bedtime'
+    ]
+    
+    def load_meal_options(self, plan: Dict[str, Any]) -> Optional[Dict[str, List[Dict[str, Any]]]]:
+        """
+        Meal options per slot for one selected plan.
+        
+        AI-generated plans carry their meals inline; PDF plans are parsed from
+        their text file. Returns None when a PDF plan has no file path.
+        """
+        # Check if this is an AI-generated plan
+        if plan.get('ai_generated') or (plan.get('meals') and not plan.get('file_path')):
+            # ML plan - convert meals array to meal_options format
+            meal_options = {slot: [] for slot in self.MEAL_SLOTS}
+            
+            for meal_group in plan.get('meals', []):
+                meal_type = meal_group.get('meal_type', '').lower()
+                meal_options_list = meal_group.get('options', [])
+                
+                if meal_type in meal_options and meal_options_list:
+                    meal_options[meal_type].extend(meal_options_list)
+            
+            return meal_options
+        
+        # PDF plan - parse from file
+        file_path = plan.get('file_path')
+        if not file_path:
+            return None
+        # Catalog plans have their absolute path precomputed
+        path = self.catalog.absolute_path(plan) or file_path.replace('\\', '/')
+        return self._parse_meal_options_from_pdf(path)
+    
+    def plan_for_day(
+        self,
+        plans_with_meals: List[Dict[str, Any]],
+        start_date: datetime,
+        day_offset: int
+    ) -> Dict[str, Any]:
+        """
+        Daily plan for one day of the rotation - a pure function of the
+        selected plans, the start date and the day offset (0 = start date).
+        
+        Plans rotate day by day; within a plan the meal option advances with
+        the day (Day 1: Option 1, Day 2: Option 2, Day 3: Option 3, Day 4: Option 1...).
+        """
+        day = day_offset + 1
+        current_plan_data = plans_with_meals[day_offset % len(plans_with_meals)]
+        current_plan = current_plan_data['plan']
+        meal_options = current_plan_data['meals']
+        current_date = (start_date + timedelta(days=day_offset)).strftime("%Y-%m-%d")
+        
+        option_index = day_offset % 3
+        
+        def get_meal_for_option(meal_type: str, option_idx: int):
+            options = meal_options.get(meal_type, [])
+            if not options:
+                return {
+                    'name': f"{meal_type.replace('_', ' ').title()}",
+                    'calories': 0,
+                    'protein': 0,
+                    'carbs': 0,
+                    'fat': 0,
+                    'fiber': 0,
+                    'ingredients': [],
+                    'method': '',
+                    'serving': ''
+                }
+            selected_option = options[option_idx % len(options)]
+            return selected_option
+        
+        daily_plan = {
+            'date': current_date,
+            'day': day,
+            'day_name': self._get_day_name(day),
+            'plan_id': current_plan.get('id'),
+            'plan_category': current_plan.get('category'),
+            'plan_file': current_plan.get('file_path'),
+            'nutrition': current_plan.get('nutrition', {}),
+        }
+        for slot in self.MEAL_SLOTS:
+            daily_plan[slot] = get_meal_for_option(slot, option_index)
+        
+        return daily_plan
+    
     def generate_multi_plan_cycle(
         self, 
         selected_plans: List[Dict[str, Any]], 
@@ -223,106 +308,26 @@ class PDFRecommender:
         if not selected_plans:
             raise ValueError("Must select at least 1 plan")
         
-        logger.info(f"Generating {days}-day cycle from {len(selected_plans)} plans")
+        logger.debug("Generating %d-day cycle from %d plans", days, len(selected_plans))
         
         # Parse meal options from all selected plans
         plans_with_meals = []
         for plan in selected_plans:
-            # Check if this is an AI-generated plan
-            if plan.get('ai_generated') or (plan.get('meals') and not plan.get('file_path')):
-                # ML plan - convert meals array to meal_options format
-                meal_options = {
-                    'early_morning': [],
-                    'pre_activity': [],
-                    'breakfast': [],
-                    'mid_morning_snack': [],
-                    'lunch': [],
-                    'evening_snack': [],
-                    'dinner': [],
-                    'bedtime': []
-                }
-                
-                for meal_group in plan.get('meals', []):
-                    meal_type = meal_group.get('meal_type', '').lower()
-                    meal_options_list = meal_group.get('options', [])
-                    
-                    if meal_type in meal_options and meal_options_list:
-                        meal_options[meal_type].extend(meal_options_list)
-                
+            meal_options = self.load_meal_options(plan)
+            if meal_options is not None:
                 plans_with_meals.append({
                     'plan': plan,
                     'meals': meal_options
                 })
-            else:
-                # PDF plan - parse from file
-                file_path = plan.get('file_path')
-                if file_path:
-                    # Normalize path separators for cross-platform compatibility
-                    file_path = file_path.replace('\\', '/')
-                    meal_options = self._parse_meal_options_from_pdf(file_path)
-                    plans_with_meals.append({
-                        'plan': plan,
-                        'meals': meal_options
-                    })
         
         if not plans_with_meals:
             raise ValueError("Could not parse meal options from selected plans")
         
         # Create rotation schedule
-        schedule = []
-        plan_index = 0
-        
-        from datetime import datetime, timedelta
         start_date = datetime.now()
+        schedule = [self.plan_for_day(plans_with_meals, start_date, offset) for offset in range(days)]
         
-        for day in range(1, days + 1):
-            current_plan_data = plans_with_meals[plan_index]
-            current_plan = current_plan_data['plan']
-            meal_options = current_plan_data['meals']
-            current_date = (start_date + timedelta(days=day-1)).strftime("%Y-%m-%d")
-            nutrition = current_plan.get('nutrition', {})
-            
-            option_index = (day - 1) % 3
-            
-            def get_meal_for_option(meal_type: str, option_idx: int):
-                options = meal_options.get(meal_type, [])
-                if not options:
-                    return {
-                        'name': f"{meal_type.replace('_', ' ').title()}",
-                        'calories': 0,
-                        'protein': 0,
-                        'carbs': 0,
-                        'fat': 0,
-                        'fiber': 0,
-                        'ingredients': [],
-                        'method': '',
-                        'serving': ''
-                    }
-                selected_option = options[option_idx % len(options)]
-                return selected_option
-            
-            daily_plan = {
-                'date': current_date,
-                'day': day,
-                'day_name': self._get_day_name(day),
-                'plan_id': current_plan.get('relative_path'),
-                'plan_category': current_plan.get('category'),
-                'plan_file': current_plan.get('file_path'),
-                'nutrition': nutrition,
-                'early_morning': get_meal_for_option('early_morning', option_index),
-                'pre_activity': get_meal_for_option('pre_activity', option_index),
-                'breakfast': get_meal_for_option('breakfast', option_index),
-                'mid_morning_snack': get_meal_for_option('mid_morning_snack', option_index),
-                'lunch': get_meal_for_option('lunch', option_index),
-                'evening_snack': get_meal_for_option('evening_snack', option_index),
-                'dinner': get_meal_for_option('dinner', option_index),
-                'bedtime': get_meal_for_option('bedtime', option_index)
-            }
-            
-            schedule.append(daily_plan)
-            plan_index = (plan_index + 1) % len(plans_with_meals)
-        
-        logger.info(f"Generated {days}-day cycle")
+        logger.debug("Generated %d-day cycle", days)
         return schedule
     
     def _get_day_name(self, day: int) -> str:
@@ -400,32 +405,27 @@ class PDFRecommender:
             return meals_data
             
         except Exception as e:
-            logger.error(f"Error parsing PDF file {file_path}: {e}")
+            logger.error("Error parsing PDF file %s: %s", file_path, e)
             return {}
     
-    def get_plan_details(self, plan_id: str) -> Optional[Dict[str, Any]]:
-        """Get full details for a specific plan by ID."""
-        for plan in self.index['plans']:
-            if plan.get('relative_path') == plan_id or plan.get('file_path') == plan_id:
-                return plan
-        return None
+    def get_plan_details(self, plan_id) -> Optional[Dict[str, Any]]:
+        """Get full details for a specific plan by integer id or (relative/absolute) path."""
+        if isinstance(plan_id, int):
+            return self.catalog.get(plan_id)
+        return self.catalog.find(plan_id)
     
     def get_category_stats(self) -> Dict[str, int]:
         """Get statistics on available categories."""
         return self.index['metadata']['category']
     
     def search_by_keyword(self, keyword: str) -> List[Dict[str, Any]]:
-        """Search plans by keyword in filename or content."""
-        keyword_lower = keyword.lower()
-        results = []
-        
-        for plan in self.index['plans']:
-            if (keyword_lower in plan.get('filename', '').lower() or
-                keyword_lower in plan.get('category', '').lower() or
-                keyword_lower in plan.get('content_preview', '').lower()):
-                results.append(plan)
-        
-        return results
+        """Plans whose filename, category or text has words starting with each keyword word, best first."""
+        if self.search_index is None:
+            self.search_index = build_search_index(self.catalog, self.catalog.absolute_path)
+        query = ' '.join(f'{word}*' for word in tokenize(keyword))
+        _, hits = self.search_index.search(query, kind='plan', limit=None)
+        plans = (self.catalog.get(hit['plan_id']) for hit in hits)
+        return [plan for plan in plans if plan is not None]
 
 
 # Example usage
@@ -472,7 +472,7 @@ if __name__ == "__main__":
         if not (1 <= len(selected_plans) <= 5):
             raise ValueError("Must select between 1-5 plans")
         
-        logger.info(f"Generating {days}-day cycle from {len(selected_plans)} plans")
+        logger.debug("Generating %d-day cycle from %d plans", days, len(selected_plans))
         
         # Parse meal options from all selected plans
         plans_with_meals = []
@@ -502,11 +502,8 @@ if __name__ == "__main__":
                         # Each option should be a full meal object with name, calories, etc.
                         meal_options[meal_type].extend(meal_options_list)
                 
-                logger.info(f"Using ML-generated plan with meals:")
-                for meal_type, options in meal_options.items():
-                    if len(options) > 0:
-                        logger.info(f"  {meal_type}: {len(options)} options")
-                        logger.info(f"    First option: {options[0].get('name', 'NO NAME')}")
+                logger.debug("Using ML-generated plan with meals",
+                             extra={'options': {k: len(v) for k, v in meal_options.items() if v}})
                 
                 plans_with_meals.append({
                     'plan': plan,
@@ -520,11 +517,9 @@ if __name__ == "__main__":
                     file_path = file_path.replace('\\', '/')
                     meal_options = self._parse_meal_options_from_pdf(file_path)
                     # Debug: Log how many options were found for each meal type
-                    logger.info(f"Parsed meals from {Path(file_path).name}:")
-                    for meal_type, options in meal_options.items():
-                        logger.info(f"  {meal_type}: {len(options)} options")
-                        if len(options) > 0:
-                            logger.info(f"    First option: {options[0].get('name', 'NO NAME')}")
+                    if logger.isEnabledFor(logging.DEBUG):
+                        logger.debug("Parsed meals from %s", Path(file_path).name,
+                                     extra={'options': {k: len(v) for k, v in meal_options.items()}})
                     plans_with_meals.append({
                         'plan': plan,
                         'meals': meal_options
@@ -597,7 +592,7 @@ if __name__ == "__main__":
             # Move to next plan
             plan_index = (plan_index + 1) % len(plans_with_meals)
         
-        logger.info(f"Generated {days}-day cycle")
+        logger.debug("Generated %d-day cycle", days)
         return schedule
     
     def _get_day_name(self, day: int) -> str:
@@ -686,8 +681,7 @@ if __name__ == "__main__":
             return meals_data
             
         except Exception as e:
-            logger.error(f"Error parsing PDF file {file_path}: {e}")
-            logger.exception("Full traceback:")
+            logger.exception("Error parsing PDF file %s", file_path)
             return {}
         
         # OLD FALLBACK CODE BELOW (will be removed)
@@ -726,23 +720,23 @@ if __name__ == "__main__":
                 # Check for "Meal Type: Breakfast" or "Meal Type:Breakfast"
                 if 'Meal Type:' in line and pattern in line:
                     current_meal_type = meal_key
-                    logger.info(f"[DEBUG] Detected meal type: {meal_key} from line: {line}")
+                    logger.debug("Detected meal type %s from line: %s", meal_key, line)
                     break
                 # Check for "Breakfast (time)" format (with time or description in parentheses)
                 if pattern in line and '(' in line and ')' in line and 'Option' not in line:
                     current_meal_type = meal_key
-                    logger.info(f"[DEBUG] Detected meal type: {meal_key} from line: {line}")
+                    logger.debug("Detected meal type %s from line: %s", meal_key, line)
                     break
             
             # Parse options
             if current_meal_type and line.startswith('Option '):
-                logger.info(f"[DEBUG] Parsing option for {current_meal_type}: {line}")
+                logger.debug("Parsing option for %s: %s", current_meal_type, line)
                 option_data = self._parse_meal_option(lines, i)
                 if option_data:
-                    logger.info(f"[DEBUG] Successfully parsed: {option_data.get('name', 'NO NAME')}")
+                    logger.debug("Parsed option %s", option_data.get('name', 'NO NAME'))
                     meals_data[current_meal_type].append(option_data)
                 else:
-                    logger.warning(f"[DEBUG] Failed to parse option from: {line}")
+                    logger.debug("Failed to parse option from: %s", line)
             
             i += 1
         
@@ -0,0 +1,741 @@
+"""
+Plan catalog: the PDF index loaded once, with O(1) lookups.
+
+Index entries carry a stable integer `id` and POSIX `file_path` /
+`relative_path` (written by pipeline/build_pdf_index.py). Older index files
+built on Windows have backslash paths and no ids; for those, paths are
+canonicalized and ids assigned (in sorted relative path order) once at load,
+so request handlers never normalize paths or scan the plan list.
+
+The catalog is shared by every recommender (see load_catalog), so the index
+is parsed and held in memory once. Plan records are shared and must be
+treated as read-only.
+
+Matching works on flat code columns (PlanColumns) instead of the plan dicts,
+so a request touches a few arrays rather than every record; in pre-forked
+workers (see prefork.py) the records' pages then stay shared copy-on-write.
+Each (field, value) also has a bitmap (a Python int, bit i = plan i), so a
+filter combination is a few ANDs and facet counts are popcounts.
+
+For large corpora the index can be split by category (build_pdf_index.py
+--shards). Pointing PLAN_INDEX_PATH at the shard manifest makes load_catalog
+return a ShardedCatalog: same lookups, but each category is loaded on its
+first query and the least recently used ones are dropped again once the
+loaded shards exceed PLAN_SHARD_BUDGET_MB. Counts, facets and cells come from
+the per-shard summaries in the manifest (CellCounts), so they load nothing.
+
+A binary index (pdf_index.bin, see service/binary_index.py) loads as a
+BinaryPlanCatalog: the file is memory-mapped, matching reads its code columns
+in place and a plan record is only decoded when something asks for it.
+"""
+
+import bisect
+import hashlib
+import json
+import os
+import sys
+import threading
+from array import array
+from collections import Counter, OrderedDict
+from collections.abc import Mapping, Sequence
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+try:
+    from service.binary_index import BinaryIndex
+except ImportError:
+    from binary_index import BinaryIndex
+
+PROJECT_ROOT = Path(__file__).parent.parent
+DEFAULT_INDEX_PATH = Path(os.environ.get("PLAN_INDEX_PATH", PROJECT_ROOT / "outputs" / "pdf_index.json"))
+SHARD_MANIFEST_NAME = "manifest.json"
+UNCATEGORIZED_SHARD = "_uncategorized"
+SHARD_BUDGET_BYTES = int(float(os.environ.get("PLAN_SHARD_BUDGET_MB", "512")) * 1024 * 1024)
+
+
+# Plan fields the recommenders filter on
+MATCH_FIELDS = ('category', 'region', 'diet_type', 'gender', 'bmi_category', 'activity')
+
+
+def canonical_path(path: str) -> str:
+    """POSIX form of an index path ("outputs\\raw\\1\\x.txt" -> "outputs/raw/1/x.txt")."""
+    return path.replace('\\', '/') if path else path
+
+
+def resolve_path(file_path: str, base_dir: Path = PROJECT_ROOT) -> str:
+    """Absolute POSIX path for an index file_path (relative to base_dir)."""
+    path = Path(canonical_path(file_path))
+    if not path.is_absolute():
+        path = base_dir / path
+    return path.as_posix()
+
+
+# Set bit offsets of every byte value, for listing a bitmap's positions
+_BYTE_BITS = tuple(tuple(bit for bit in range(8) if byte >> bit & 1) for byte in range(256))
+
+
+def bitmap_positions(bitmap: int) -> List[int]:
+    """Positions of the set bits, ascending"""
+    data = bitmap.to_bytes((bitmap.bit_length() + 7) // 8, 'little')
+    return [i * 8 + bit for i, byte in enumerate(data) if byte for bit in _BYTE_BITS[byte]]
+
+
+def popcount(bitmap: int) -> int:
+    return bitmap.bit_count() if hasattr(bitmap, 'bit_count') else bin(bitmap).count('1')
+
+
+def _code_bitmaps(codes: Sequence, vocab_size: int, size: int) -> List[int]:
+    """One bitmap per code: bit i set where codes[i] == code"""
+    rows = [bytearray((size + 7) // 8) for _ in range(vocab_size)]
+    for i, code in enumerate(codes):
+        rows[code][i >> 3] |= 1 << (i & 7)
+    return [int.from_bytes(row, 'little') for row in rows]
+
+
+def _intern(value: Any) -> Any:
+    if isinstance(value, str):
+        return sys.intern(value)
+    if isinstance(value, dict):
+        return {sys.intern(k) if isinstance(k, str) else k: _intern(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_intern(v) for v in value]
+    return value
+
+
+class PlanColumns:
+    """Match fields as flat arrays (one small integer code per plan, plus each field's vocabulary) and per-code bitmaps."""
+
+    def __init__(self, plans: List[Dict[str, Any]], fields=MATCH_FIELDS):
+        self.size = len(plans)
+        self.vocab: Dict[str, tuple] = {}
+        self.codes: Dict[str, Sequence] = {}
+        for field in fields:
+            values: Dict[Any, int] = {}
+            codes = array('I', (values.setdefault(plan.get(field), len(values)) for plan in plans))
+            self.vocab[field] = tuple(values)
+            self.codes[field] = codes
+        self._build_bitmaps()
+
+    @classmethod
+    def from_codes(cls, size: int, vocab: Dict[str, tuple], codes: Dict[str, Sequence]) -> "PlanColumns":
+        """Columns over existing code arrays (e.g. memoryviews into a binary index)"""
+        columns = cls([], fields=())
+        columns.size = size
+        columns.vocab = vocab
+        columns.codes = codes
+        columns._build_bitmaps()
+        return columns
+
+    def _build_bitmaps(self):
+        self.all = (1 << self.size) - 1
+        self.bitmaps: Dict[str, List[int]] = {
+            field: _code_bitmaps(codes, len(self.vocab[field]), self.size) for field, codes in self.codes.items()
+        }
+
+    def value_bitmap(self, field: str, wanted: Any, norm: Optional[Callable[[Any], Any]] = None) -> int:
+        """Plans whose (normalized) value of field equals wanted"""
+        bitmap = 0
+        for code, value in enumerate(self.vocab[field]):
+            if (norm(value) if norm else value) == wanted:
+                bitmap |= self.bitmaps[field][code]
+        return bitmap
+
+    def bitmap(self, criteria: Dict[str, Any],
+               normalize: Optional[Dict[str, Callable[[Any], Any]]] = None) -> int:
+        """Plans whose (normalized) field values equal every criterion.
+
+        Normalizers are applied to each field's vocabulary, not to every plan.
+        """
+        normalize = normalize or {}
+        bitmap = self.all
+        for field, wanted in criteria.items():
+            bitmap &= self.value_bitmap(field, wanted, normalize.get(field))
+            if not bitmap:
+                break
+        return bitmap
+
+    def positions(self, criteria: Dict[str, Any],
+                  normalize: Optional[Dict[str, Callable[[Any], Any]]] = None) -> List[int]:
+        """Positions (ascending) of plans matching every criterion; see bitmap."""
+        return bitmap_positions(self.bitmap(criteria, normalize))
+
+    def facets(self, criteria: Dict[str, Any], fields: Sequence[str] = MATCH_FIELDS,
+               normalize: Optional[Dict[str, Callable[[Any], Any]]] = None) -> Dict[str, Dict[Any, int]]:
+        """Drill-down counts: per field, per (normalized) value, the plans matching the
+        other fields' criteria and that value. A field's own criterion is left out, so
+        the counts show what each alternative value would match. Values with no plans
+        (or no value) are omitted.
+        """
+        normalize = normalize or {}
+        facets = {}
+        for field in fields:
+            base = self.bitmap({f: v for f, v in criteria.items() if f != field}, normalize)
+            norm = normalize.get(field)
+            counts: Dict[Any, int] = {}
+            for code, value in enumerate(self.vocab[field]):
+                key = norm(value) if norm else value
+                count = popcount(base & self.bitmaps[field][code]) if base else 0
+                if count and key not in (None, ''):
+                    counts[key] = counts.get(key, 0) + count
+            facets[field] = counts
+        return facets
+
+    def cells(self, fields: Sequence[str] = MATCH_FIELDS,
+              normalize: Optional[Dict[str, Callable[[Any], Any]]] = None) -> Dict[tuple, int]:
+        """Plan count per combination of (normalized) field values, for the combinations that occur"""
+        normalize = normalize or {}
+        columns = []
+        for field in fields:
+            norm = normalize.get(field)
+            values = [norm(value) if norm else value for value in self.vocab[field]]
+            columns.append([values[code] for code in self.codes[field]])
+        return dict(Counter(zip(*columns)))
+
+
+class CellCounts:
+    """Plan counts per combination of field values, answering count/facets/cells like PlanColumns
+    without the plans (a sharded index keeps these in its manifest)."""
+
+    def __init__(self, fields: Sequence[str], rows: Iterable[Tuple[Sequence[Any], int]]):
+        self.fields = tuple(fields)
+        self.position = {field: i for i, field in enumerate(self.fields)}
+        self.rows = [(tuple(values), count) for values, count in rows]
+
+    def _normalized(self, normalize: Optional[Dict[str, Callable[[Any], Any]]]) -> List[Tuple[tuple, int]]:
+        """Rows with the normalizers applied (once per distinct value, like a vocabulary)"""
+        normalize = normalize or {}
+        mappings = []
+        for i, field in enumerate(self.fields):
+            norm = normalize.get(field)
+            mappings.append({values[i]: norm(values[i]) for values, _ in self.rows} if norm else None)
+        if not any(mappings):
+            return self.rows
+        return [(tuple(value if mapping is None else mapping[value] for value, mapping in zip(values, mappings)), count)
+                for values, count in self.rows]
+
+    def _matching(self, rows, criteria: Dict[str, Any]) -> List[Tuple[tuple, int]]:
+        wanted = [(self.position[field], value) for field, value in criteria.items()]
+        return [(values, count) for values, count in rows if all(values[i] == value for i, value in wanted)]
+
+    def count(self, criteria: Dict[str, Any],
+              normalize: Optional[Dict[str, Callable[[Any], Any]]] = None) -> int:
+        return sum(count for _, count in self._matching(self._normalized(normalize), criteria))
+
+    def facets(self, criteria: Dict[str, Any], fields: Sequence[str] = MATCH_FIELDS,
+               normalize: Optional[Dict[str, Callable[[Any], Any]]] = None) -> Dict[str, Dict[Any, int]]:
+        """Drill-down counts; see PlanColumns.facets."""
+        rows = self._normalized(normalize)
+        facets = {}
+        for field in fields:
+            i = self.position[field]
+            counts: Dict[Any, int] = {}
+            for values, count in self._matching(rows, {f: v for f, v in criteria.items() if f != field}):
+                if values[i] not in (None, ''):
+                    counts[values[i]] = counts.get(values[i], 0) + count
+            facets[field] = counts
+        return facets
+
+    def cells(self, fields: Sequence[str] = MATCH_FIELDS,
+              normalize: Optional[Dict[str, Callable[[Any], Any]]] = None) -> Dict[tuple, int]:
+        positions = [self.position[field] for field in fields]
+        cells = Counter()
+        for values, count in self._normalized(normalize):
+            cells[tuple(values[i] for i in positions)] += count
+        return dict(cells)
+
+
+class PlanCatalog:
+    """Index plans keyed by id, relative path and absolute path."""
+
+    # sha256 of the JSON index file this catalog was read from, when it was
+    index_sha256: Optional[str] = None
+
+    def __init__(self, index: Dict[str, Any], base_dir: Union[str, Path] = PROJECT_ROOT):
+        self.index = index
+        self.metadata: Dict[str, Any] = index.get('metadata', {})
+        self.plans: List[Dict[str, Any]] = index.get('plans', [])
+        self.base_dir = Path(base_dir)
+
+        for plan in self.plans:
+            for key in ('file_path', 'relative_path', 'folder'):
+                if plan.get(key):
+                    plan[key] = canonical_path(plan[key])
+        self._backfill_ids()
+
+        self.by_id: Dict[int, Dict[str, Any]] = {}
+        self.by_relative_path: Dict[str, Dict[str, Any]] = {}
+        self.by_absolute_path: Dict[str, Dict[str, Any]] = {}
+        self._absolute_paths: Dict[int, str] = {}
+        for plan in self.plans:
+            self.by_id[plan['id']] = plan
+            if plan.get('relative_path'):
+                self.by_relative_path[plan['relative_path']] = plan
+            if plan.get('file_path'):
+                absolute = self.resolve_path(plan['file_path'])
+                self._absolute_paths[plan['id']] = absolute
+                self.by_absolute_path[absolute] = plan
+                self.by_relative_path.setdefault(plan['file_path'], plan)
+        self.columns = PlanColumns(self.plans)
+
+    @classmethod
+    def from_file(cls, index_path: Union[str, Path] = DEFAULT_INDEX_PATH) -> "PlanCatalog":
+        with open(index_path, 'rb') as f:
+            data = f.read()
+        index = json.loads(data)
+        if isinstance(index, list):
+            # Old format: bare list of plans
+            index = {'metadata': {'total_plans': len(index)}, 'plans': index}
+        catalog = cls(index)
+        catalog.index_sha256 = hashlib.sha256(data).hexdigest()
+        return catalog
+
+    def _backfill_ids(self):
+        """Give plans without an id the next free ids, in sorted relative path order."""
+        missing = [plan for plan in self.plans if not isinstance(plan.get('id'), int)]
+        if not missing:
+            return
+        next_id = max((plan['id'] for plan in self.plans if isinstance(plan.get('id'), int)), default=-1) + 1
+        for plan in sorted(missing, key=lambda p: p.get('relative_path') or p.get('file_path') or ''):
+            plan['id'] = next_id
+            next_id += 1
+
+    def resolve_path(self, file_path: str) -> str:
+        """Absolute POSIX path for an index file_path (relative to the project root)."""
+        return resolve_path(file_path, self.base_dir)
+
+    def __len__(self) -> int:
+        return len(self.plans)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return iter(self.plans)
+
+    def get(self, plan_id: int) -> Optional[Dict[str, Any]]:
+        return self.by_id.get(plan_id)
+
+    def select(self, criteria: Dict[str, Any],
+               normalize: Optional[Dict[str, Callable[[Any], Any]]] = None) -> List[Dict[str, Any]]:
+        """Plans (in index order) matching every field in criteria; see PlanColumns.positions."""
+        plans = self.plans
+        return [plans[i] for i in self.columns.positions(criteria, normalize)]
+
+    def count(self, criteria: Dict[str, Any],
+              normalize: Optional[Dict[str, Callable[[Any], Any]]] = None) -> int:
+        """Number of plans select() would return"""
+        return popcount(self.columns.bitmap(criteria, normalize))
+
+    def facets(self, criteria: Dict[str, Any], fields: Sequence[str] = MATCH_FIELDS,
+               normalize: Optional[Dict[str, Callable[[Any], Any]]] = None) -> Dict[str, Dict[Any, int]]:
+        """Drill-down counts per field value; see PlanColumns.facets."""
+        return self.columns.facets(criteria, fields, normalize)
+
+    def cells(self, fields: Sequence[str] = MATCH_FIELDS,
+              normalize: Optional[Dict[str, Callable[[Any], Any]]] = None) -> Dict[tuple, int]:
+        """Plan count per occurring combination of field values; see PlanColumns.cells."""
+        return self.columns.cells(fields, normalize)
+
+    def freeze(self):
+        """Intern the strings in every plan record so repeated values share one object.
+
+        Called once before forking workers; the records are not modified afterwards.
+        This only deduplicates strings: the match fields are already flat integer
+        arrays in self.columns, but the records stay ordinary mutable dicts, since
+        the recommenders copy them and the API serializes them as JSON. Reading a
+        record still touches refcounts, so its pages are not guaranteed to stay
+        shared.
+        """
+        for plan in self.plans:
+            for key, value in plan.items():
+                plan[key] = _intern(value)
+
+    def find(self, path: str) -> Optional[Dict[str, Any]]:
+        """Plan for a relative, index-style or absolute path (any separator style)."""
+        if not path:
+            return None
+        plan = self.by_relative_path.get(path) or self.by_absolute_path.get(path)
+        if plan is None:
+            # Paths from older clients / stored selections may use backslashes
+            path = canonical_path(path)
+            plan = self.by_relative_path.get(path) or self.by_absolute_path.get(path)
+        return plan
+
+    def absolute_path(self, plan: Dict[str, Any]) -> Optional[str]:
+        """Precomputed absolute path of a catalog plan."""
+        return self._absolute_paths.get(plan.get('id'))
+
+
+class _ShardedIndex(Mapping):
+    """index-style view of a ShardedCatalog: 'plans' is only assembled when read"""
+
+    def __init__(self, catalog: "ShardedCatalog"):
+        self._catalog = catalog
+
+    def __getitem__(self, key):
+        if key == 'metadata':
+            return self._catalog.metadata
+        if key == 'plans':
+            return self._catalog.plans
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(('metadata', 'plans'))
+
+    def __len__(self) -> int:
+        return 2
+
+
+class ShardedCatalog:
+    """PlanCatalog over a category-sharded index (see build_pdf_index.py save_shards).
+
+    Each shard is a PlanCatalog loaded on first use. Queries naming a
+    category touch only that shard; anything else loads every shard. Loaded
+    shards are kept in LRU order and evicted once their combined file size
+    exceeds budget_bytes (the shard just loaded always stays). Plans from an
+    evicted shard stay valid for whoever holds them. Reading every plan
+    (plans, index['plans'], iteration) assembles the full list once and keeps it.
+    """
+
+    def __init__(self, manifest_path: Union[str, Path], base_dir: Union[str, Path] = PROJECT_ROOT,
+                 budget_bytes: int = SHARD_BUDGET_BYTES):
+        self.manifest_path = Path(manifest_path)
+        if self.manifest_path.is_dir():
+            self.manifest_path = self.manifest_path / SHARD_MANIFEST_NAME
+        with open(self.manifest_path, 'r', encoding='utf-8') as f:
+            self.manifest = json.load(f)
+        self.base_dir = Path(base_dir)
+        self.budget_bytes = budget_bytes
+        self.metadata: Dict[str, Any] = self.manifest.get('metadata', {})
+        self.index_sha256: Optional[str] = self.manifest.get('index_sha256')
+        self.shards: Dict[str, Dict[str, Any]] = self.manifest['shards']
+        self.index = _ShardedIndex(self)
+        self.loads = 0
+        self.evictions = 0
+        self._loaded: "OrderedDict[str, PlanCatalog]" = OrderedDict()
+        self._plans: Optional[List[Dict[str, Any]]] = None
+        self._lock = threading.RLock()
+
+        # id -> shard by bisecting the shards' sorted id ranges
+        ranges = sorted((start, end, name) for name, shard in self.shards.items()
+                        for start, end in shard.get('id_ranges', []))
+        self._range_starts = [start for start, _, _ in ranges]
+        self._ranges = ranges
+
+        # Per-shard cell counts written by the builder; manifests from before them fall back to reading the shards
+        self.summary: Optional[CellCounts] = None
+        if 'cell_fields' in self.manifest and all('cells' in shard for shard in self.shards.values()):
+            self.summary = CellCounts(self.manifest['cell_fields'], (
+                (cell[:-1], cell[-1]) for shard in self.shards.values() for cell in shard['cells']))
+
+    def shard(self, name: str) -> Optional[PlanCatalog]:
+        """Catalog of one shard (loading it, and evicting cold ones, if needed)."""
+        with self._lock:
+            catalog = self._loaded.get(name)
+            if catalog is not None:
+                self._loaded.move_to_end(name)
+                return catalog
+            info = self.shards.get(name)
+            if info is None:
+                return None
+            with open(self.manifest_path.parent / info['file'], 'r', encoding='utf-8') as f:
+                catalog = PlanCatalog(json.load(f), self.base_dir)
+            self._loaded[name] = catalog
+            self.loads += 1
+            while len(self._loaded) > 1 and self.loaded_bytes() > self.budget_bytes:
+                self._loaded.popitem(last=False)
+                self.evictions += 1
+            return catalog
+
+    def loaded_bytes(self) -> int:
+        return sum(self.shards[name]['bytes'] for name in self._loaded)
+
+    def loaded(self) -> List[str]:
+        """Names of the resident shards, least recently used first"""
+        return list(self._loaded)
+
+    def _all_shards(self) -> Iterator[PlanCatalog]:
+        for name in self.shards:
+            yield self.shard(name)
+
+    def _shards_for(self, criteria: Dict[str, Any],
+                    normalize: Dict[str, Callable[[Any], Any]]) -> Iterator[PlanCatalog]:
+        """Shards whose category can satisfy criteria (normalizing the shard names, like a vocabulary)"""
+        if 'category' not in criteria:
+            yield from self._all_shards()
+            return
+        norm = normalize.get('category')
+        for name in self.shards:
+            value = None if name == UNCATEGORIZED_SHARD else name
+            if (norm(value) if norm else value) == criteria['category']:
+                yield self.shard(name)
+
+    def _in_index_order(self, pairs) -> List[Dict[str, Any]]:
+        return [plan for _, plan in sorted(pairs, key=lambda pair: pair[0])]
+
+    @property
+    def plans(self) -> List[Dict[str, Any]]:
+        """Every plan in index order (loads every shard the first time; the list is reused after that)."""
+        plans = self._plans
+        if plans is None:
+            with self._lock:
+                if self._plans is None:
+                    self._plans = self._in_index_order(
+                        (position, plan) for catalog in self._all_shards()
+                        for position, plan in zip(catalog.index['positions'], catalog.plans))
+                plans = self._plans
+        return plans
+
+    def __len__(self) -> int:
+        return self.manifest.get('total_plans', 0)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return iter(self.plans)
+
+    def get(self, plan_id: int) -> Optional[Dict[str, Any]]:
+        i = bisect.bisect_right(self._range_starts, plan_id) - 1
+        if i < 0 or plan_id > self._ranges[i][1]:
+            return None
+        catalog = self.shard(self._ranges[i][2])
+        return catalog.get(plan_id) if catalog else None
+
+    def select(self, criteria: Dict[str, Any],
+               normalize: Optional[Dict[str, Callable[[Any], Any]]] = None) -> List[Dict[str, Any]]:
+        """Plans (in index order) matching every field in criteria; a category criterion limits the shards read."""
+        pairs = []
+        for catalog in self._shards_for(criteria, normalize or {}):
+            positions = catalog.index['positions']
+            pairs.extend((positions[i], catalog.plans[i]) for i in catalog.columns.positions(criteria, normalize))
+        return self._in_index_order(pairs)
+
+    def count(self, criteria: Dict[str, Any],
+              normalize: Optional[Dict[str, Callable[[Any], Any]]] = None) -> int:
+        if self.summary is not None:
+            return self.summary.count(criteria, normalize)
+        return sum(catalog.count(criteria, normalize) for catalog in self._shards_for(criteria, normalize or {}))
+
+    def facets(self, criteria: Dict[str, Any], fields: Sequence[str] = MATCH_FIELDS,
+               normalize: Optional[Dict[str, Callable[[Any], Any]]] = None) -> Dict[str, Dict[Any, int]]:
+        """Drill-down counts from the manifest (or, without a summary, per-shard counts summed)."""
+        if self.summary is not None:
+            return self.summary.facets(criteria, fields, normalize)
+        shards = self._all_shards() if 'category' in fields else self._shards_for(criteria, normalize or {})
+        facets: Dict[str, Dict[Any, int]] = {field: {} for field in fields}
+        for catalog in shards:
+            for field, counts in catalog.facets(criteria, fields, normalize).items():
+                for value, count in counts.items():
+                    facets[field][value] = facets[field].get(value, 0) + count
+        return facets
+
+    def cells(self, fields: Sequence[str] = MATCH_FIELDS,
+              normalize: Optional[Dict[str, Callable[[Any], Any]]] = None) -> Dict[tuple, int]:
+        """Cell counts from the manifest (or, without a summary, per-shard counts summed)."""
+        if self.summary is not None:
+            return self.summary.cells(fields, normalize)
+        cells = Counter()
+        for catalog in self._all_shards():
+            cells.update(catalog.cells(fields, normalize))
+        return dict(cells)
+
+    def plan_bands(self) -> Optional[List[Tuple[Any, Dict[str, Tuple[float, float]]]]]:
+        """(plan id, {band: (min, max)}) in index order from the manifest, or None if it has no bands"""
+        if 'band_fields' not in self.manifest or not all('bands' in shard for shard in self.shards.values()):
+            return None
+        fields = self.manifest['band_fields']
+        rows = sorted(row for shard in self.shards.values() for row in shard['bands'])
+        return [(plan_id, {band: tuple(bounds) for band, bounds in zip(fields, values) if bounds is not None})
+                for _, plan_id, *values in rows]
+
+    def freeze(self):
+        for catalog in list(self._loaded.values()):
+            catalog.freeze()
+
+    def find(self, path: str) -> Optional[Dict[str, Any]]:
+        """Plan for a path, looking in resident shards before loading the others."""
+        if not path:
+            return None
+        with self._lock:
+            resident = list(self._loaded.values())
+        for catalog in resident:
+            plan = catalog.find(path)
+            if plan is not None:
+                return plan
+        for name in self.shards:
+            if name not in self._loaded:
+                plan = self.shard(name).find(path)
+                if plan is not None:
+                    return plan
+        return None
+
+    def absolute_path(self, plan: Dict[str, Any]) -> Optional[str]:
+        return resolve_path(plan['file_path'], self.base_dir) if plan.get('file_path') else None
+
+
+class _LazyPlans(Sequence):
+    """Plan list of a BinaryPlanCatalog: records are decoded on first access"""
+
+    def __init__(self, catalog: "BinaryPlanCatalog"):
+        self._catalog = catalog
+
+    def __len__(self) -> int:
+        return len(self._catalog)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self._catalog.plan_at(j) for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return self._catalog.plan_at(i)
+
+
+class BinaryPlanCatalog:
+    """PlanCatalog over a memory-mapped binary index (see service/binary_index.py).
+
+    select() scans the mapped code columns; ids and paths are read from their
+    columns without decoding records. A plan dict is built (once) when a
+    lookup returns it or `plans` is indexed, with paths canonicalized as in
+    PlanCatalog.
+    """
+
+    PATH_FIELDS = ('file_path', 'relative_path', 'folder')
+
+    def __init__(self, index_path: Union[str, Path], base_dir: Union[str, Path] = PROJECT_ROOT):
+        self.store = BinaryIndex(index_path)
+        self.base_dir = Path(base_dir)
+        self.metadata: Dict[str, Any] = self.store.metadata
+        self.index_sha256 = self.store.index_sha256
+        self.plans = _LazyPlans(self)
+        self.index = {'metadata': self.metadata, 'plans': self.plans}
+        self._records: List[Optional[Dict[str, Any]]] = [None] * len(self.store)
+        self._records_lock = threading.Lock()
+        self._paths: Optional[Dict[str, int]] = None
+
+        size = len(self.store)
+        vocab, codes = {}, {}
+        for field in MATCH_FIELDS:
+            if self.store.has_field(field):
+                vocab[field] = self.store.vocab(field)
+                codes[field] = self.store.codes(field)
+            else:
+                vocab[field] = (None,)
+                codes[field] = bytes(size)
+        self.columns = PlanColumns.from_codes(size, vocab, codes)
+
+        if self.store.has_field('id'):
+            self._ids = list(self.store.ints('id'))
+        else:
+            # Old index without ids: backfill in sorted relative path order, like PlanCatalog
+            order = sorted(range(size), key=lambda i: canonical_path(self.store.value(i, 'relative_path')
+                                                                     or self.store.value(i, 'file_path') or ''))
+            self._ids = [0] * size
+            for plan_id, position in enumerate(order):
+                self._ids[position] = plan_id
+        self._positions = {plan_id: position for position, plan_id in enumerate(self._ids)}
+
+    def plan_at(self, position: int) -> Dict[str, Any]:
+        plan = self._records[position]
+        if plan is None:
+            plan = self.store.plan(position)
+            for key in self.PATH_FIELDS:
+                if plan.get(key):
+                    plan[key] = canonical_path(plan[key])
+            if 'id' not in plan:
+                plan = {'id': self._ids[position], **plan}
+            with self._records_lock:
+                # Another thread may have decoded it meanwhile: keep one shared record
+                plan = self._records[position] = self._records[position] or plan
+        return plan
+
+    def __len__(self) -> int:
+        return len(self.store)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return iter(self.plans)
+
+    def get(self, plan_id: int) -> Optional[Dict[str, Any]]:
+        position = self._positions.get(plan_id)
+        return None if position is None else self.plan_at(position)
+
+    def select(self, criteria: Dict[str, Any],
+               normalize: Optional[Dict[str, Callable[[Any], Any]]] = None) -> List[Dict[str, Any]]:
+        """Plans (in index order) matching every field in criteria; see PlanColumns.positions."""
+        return [self.plan_at(i) for i in self.columns.positions(criteria, normalize)]
+
+    def count(self, criteria: Dict[str, Any],
+              normalize: Optional[Dict[str, Callable[[Any], Any]]] = None) -> int:
+        return popcount(self.columns.bitmap(criteria, normalize))
+
+    def facets(self, criteria: Dict[str, Any], fields: Sequence[str] = MATCH_FIELDS,
+               normalize: Optional[Dict[str, Callable[[Any], Any]]] = None) -> Dict[str, Dict[Any, int]]:
+        return self.columns.facets(criteria, fields, normalize)
+
+    def cells(self, fields: Sequence[str] = MATCH_FIELDS,
+              normalize: Optional[Dict[str, Callable[[Any], Any]]] = None) -> Dict[tuple, int]:
+        return self.columns.cells(fields, normalize)
+
+    def _path_positions(self) -> Dict[str, int]:
+        """relative, index-style and absolute path -> position (built from the path columns on first use)"""
+        if self._paths is None:
+            paths = {}
+            for position in range(len(self.store)):
+                file_path = canonical_path(self.store.value(position, 'file_path'))
+                if file_path:
+                    paths[resolve_path(file_path, self.base_dir)] = position
+                relative_path = canonical_path(self.store.value(position, 'relative_path'))
+                if relative_path:
+                    paths[relative_path] = position
+                if file_path:
+                    paths.setdefault(file_path, position)
+            self._paths = paths
+        return self._paths
+
+    def find(self, path: str) -> Optional[Dict[str, Any]]:
+        """Plan for a relative, index-style or absolute path (any separator style)."""
+        if not path:
+            return None
+        paths = self._path_positions()
+        position = paths.get(path)
+        if position is None:
+            position = paths.get(canonical_path(path))
+        return None if position is None else self.plan_at(position)
+
+    def absolute_path(self, plan: Dict[str, Any]) -> Optional[str]:
+        return resolve_path(plan['file_path'], self.base_dir) if plan.get('file_path') else None
+
+    def freeze(self):
+        """Intern the strings of the records decoded so far (the rest live in the mapped file)."""
+        for plan in self._records:
+            if plan is not None:
+                for key, value in plan.items():
+                    plan[key] = _intern(value)
+
+
+_catalogs: Dict[str, tuple] = {}  # resolved path -> ((mtime_ns, size), catalog)
+_catalogs_lock = threading.Lock()
+
+
+def load_catalog(index_path: Union[str, Path] = DEFAULT_INDEX_PATH) -> Union[PlanCatalog, ShardedCatalog, BinaryPlanCatalog]:
+    """Shared catalog for an index file (loaded on first use, and again after the file changes).
+
+    Holders of an older catalog keep it; only the latest version is shared.
+    A shard manifest (or its directory) gives a ShardedCatalog, a .bin file a
+    BinaryPlanCatalog.
+    """
+    path = Path(index_path)
+    if not path.exists() and (PROJECT_ROOT / path).exists():
+        # Default paths are relative to the project root, not the working directory
+        path = PROJECT_ROOT / path
+    key = str(path.resolve())
+    st = path.stat()
+    version = (st.st_mtime_ns, st.st_size)
+    with _catalogs_lock:
+        entry = _catalogs.get(key)
+        if entry is None or entry[0] != version:
+            if path.is_dir() or path.name == SHARD_MANIFEST_NAME:
+                catalog = ShardedCatalog(path)
+            elif path.suffix == '.bin':
+                catalog = BinaryPlanCatalog(path)
+            else:
+                catalog = PlanCatalog.from_file(path)
+            entry = (version, catalog)
+            _catalogs[key] = entry
+        return entry[1]
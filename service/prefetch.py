@@ -0,0 +1,107 @@
+"""
+Speculative background parsing of likely-selected plans.
+
+After a generate call the top few cards are queued here; a single
+low-priority worker thread parses them into the shared parse cache while the
+user is still reading the list, so picking them later costs no parsing.
+The queue is bounded (oldest speculative work is dropped first) and every
+batch can be cancelled, e.g. once the user has made their selection.
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from typing import Callable, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class PrefetchHandle:
+    """Cancels the not-yet-started part of one scheduled batch."""
+
+    def __init__(self):
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class ParsePrefetcher:
+    """Bounded queue of paths parsed by one background daemon thread."""
+
+    def __init__(
+        self,
+        load: Callable[[str], object],
+        is_cached: Optional[Callable[[str], bool]] = None,
+        max_pending: int = 16,
+        delay: float = 0.05,
+    ):
+        self._load = load
+        self._is_cached = is_cached or (lambda path: False)
+        self.max_pending = max_pending
+        # Pause before each parse so request threads get the GIL first
+        self.delay = delay
+        self._pending = deque()
+        self._cond = threading.Condition()
+        self._thread = None
+        self.completed = 0
+        self.dropped = 0
+
+    def schedule(self, paths: Iterable[str], urgent: bool = False) -> PrefetchHandle:
+        """Queue paths for parsing; urgent batches go ahead of speculative ones."""
+        handle = PrefetchHandle()
+        with self._cond:
+            queued = {path for path, h, _ in self._pending if not h.cancelled}
+            batch = []
+            for path in paths:
+                if path and path not in queued and not self._is_cached(path):
+                    queued.add(path)
+                    batch.append(path)
+            if urgent:
+                self._pending.extendleft((path, handle, True) for path in reversed(batch))
+            else:
+                self._pending.extend((path, handle, False) for path in batch)
+            while len(self._pending) > self.max_pending:
+                self._drop_one()
+            if batch:
+                self._ensure_worker()
+                self._cond.notify()
+        return handle
+
+    def pending(self) -> int:
+        with self._cond:
+            return sum(1 for _, handle, _ in self._pending if not handle.cancelled)
+
+    def _drop_one(self):
+        """Drop the oldest speculative entry (the newest entry if all are urgent)."""
+        for i, (_, _, urgent) in enumerate(self._pending):
+            if not urgent:
+                del self._pending[i]
+                break
+        else:
+            self._pending.pop()
+        self.dropped += 1
+
+    def _ensure_worker(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="parse-prefetch", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                path, handle, _ = self._pending.popleft()
+            if handle.cancelled or self._is_cached(path):
+                continue
+
+            time.sleep(self.delay)
+            if handle.cancelled:
+                continue
+            try:
+                self._load(path)
+                self.completed += 1
+            except Exception as e:
+                logger.warning("Prefetch of %s failed: %s", path, e)
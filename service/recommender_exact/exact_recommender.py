@@ -8,13 +8,23 @@ Matches in hierarchical order:
 5. BMI Category (underweight/normal/overweight/obese)
 6. Activity Level (sedentary/light/moderate/heavy)
 
-Returns empty list if no exact match found on ALL 6 factors.
+Returns empty list if no exact match found on ALL 6 factors; recommend() then
+offers the nearest populated profiles from the coverage lattice instead.
 """
 
-import json
+import logging
 import os
 from pathlib import Path
 
+try:
+    from service.coverage_lattice import MAX_ALTERNATIVES, MAX_DISTANCE, CoverageLattice
+    from service.plan_catalog import load_catalog
+except ModuleNotFoundError:
+    from coverage_lattice import MAX_ALTERNATIVES, MAX_DISTANCE, CoverageLattice
+    from plan_catalog import load_catalog
+
+logger = logging.getLogger(__name__)
+
 class ExactMatchRecommender:
     
     # Goal to category folder mapping
@@ -39,23 +49,27 @@ class ExactMatchRecommender:
         'weight_loss_type1_diabetes': 'weight_loss_diabetes',
     }
     
-    def __init__(self, index_path=None):
-        """Initialize with PDF index"""
-        if index_path is None:
-            base_dir = Path(__file__).parent.parent.parent
-            index_path = base_dir / "outputs" / "pdf_index.json"
-        
-        with open(index_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        if isinstance(data, dict) and 'plans' in data:
-            self.plans = data['plans']
-            self.metadata = data.get('metadata', {})
-        else:
-            self.plans = data
-            self.metadata = {}
+    def __init__(self, index_path=None, catalog=None, relaxation=None, max_distance=MAX_DISTANCE):
+        """
+        Initialize with PDF index (or an already loaded PlanCatalog)
         
-        print(f"[ExactMatchRecommender] Loaded {len(self.plans)} plans")
+        relaxation and max_distance set how far the nearest-profile fallback may
+        stray from the requested profile (default: coverage_lattice.RELAXATION).
+        """
+        if catalog is None:
+            if index_path is None:
+                base_dir = Path(__file__).parent.parent.parent
+                index_path = base_dir / "outputs" / "pdf_index.json"
+            # Shared with the other recommenders; old list-format files are handled by the catalog
+            catalog = load_catalog(index_path)
+        
+        self.catalog = catalog
+        # Plan counts per (category, region, diet, gender, bmi, activity), for the nearest-profile fallback
+        self.lattice = CoverageLattice.from_catalog(catalog, self.match_normalizers(),
+                                                    relaxation=relaxation, max_distance=max_distance)
+        self.metadata = catalog.metadata
+        
+        logger.info("Loaded %d plans", len(catalog))
     
     def get_bmi_category(self, bmi: float) -> str:
         """Categorize BMI"""
@@ -127,54 +141,122 @@ class ExactMatchRecommender:
         Returns:
             List of exactly matching plans (empty if none match)
         """
-        # Extract user criteria
+        criteria = self.match_criteria(user_profile)
+        if criteria is None:
+            return []
+        
+        # ALL 6 factors must match EXACTLY (normalizers run over each field's distinct values)
+        exact_matches = self.catalog.select(criteria, normalize=self.match_normalizers())
+        
+        logger.debug("Exact match found %d plans", len(exact_matches), extra=criteria)
+        
+        return exact_matches
+    
+    def match_criteria(self, user_profile: dict):
+        """The six index fields a profile must match, or None if its goal has no category"""
         goal = user_profile.get('goal', '')
         if not goal and user_profile.get('goals'):
             goal = user_profile['goals'][0] if isinstance(user_profile['goals'], list) else user_profile['goals']
         
-        gender = user_profile.get('gender', '').lower()
-        diet = self.normalize_diet_type(user_profile.get('diet_type', ''))
-        region = user_profile.get('region', '').lower()
-        bmi_category = self.normalize_bmi(user_profile.get('bmi_category', ''))
-        activity = self.normalize_activity(user_profile.get('activity_level', ''))
-        
         # Map goal to category
         category = self.GOAL_TO_CATEGORY.get(goal)
         if not category:
-            print(f"\n[HIERARCHICAL EXACT MATCH] ❌ Goal '{goal}' has no matching category")
-            return []
+            logger.debug("Goal %r has no matching category", goal)
+            return None
+        
+        return {
+            'category': category,
+            'region': user_profile.get('region', '').lower(),
+            'diet_type': self.normalize_diet_type(user_profile.get('diet_type', '')),
+            'gender': user_profile.get('gender', '').lower(),
+            'bmi_category': self.normalize_bmi(user_profile.get('bmi_category', '')),
+            'activity': self.normalize_activity(user_profile.get('activity_level', '')),
+        }
+    
+    def match_normalizers(self) -> dict:
+        """Normalizers applied to the index values of each matched field"""
+        return {
+            'region': lambda v: (v or '').lower(),
+            'diet_type': lambda v: self.normalize_diet_type(v or 'vegetarian'),
+            'gender': lambda v: (v or '').lower(),
+            'bmi_category': lambda v: self.normalize_bmi(v or ''),
+            'activity': lambda v: self.normalize_activity(v or ''),
+        }
+    
+    # Profile field -> index field, for facet counts
+    FACET_FIELDS = {
+        'goal': 'category',
+        'region': 'region',
+        'diet_type': 'diet_type',
+        'gender': 'gender',
+        'bmi_category': 'bmi_category',
+        'activity_level': 'activity',
+    }
+    
+    def facets(self, user_profile: dict) -> dict:
+        """
+        Plan counts for a partial profile, for availability hints
         
-        print(f"\n[HIERARCHICAL EXACT MATCH] Matching on 6 factors:")
-        print(f"  1. GOAL: '{goal}' → Category: '{category}'")
-        print(f"  2. Region: {region}")
-        print(f"  3. Diet: {diet}")
-        print(f"  4. Gender: {gender}")
-        print(f"  5. BMI: {bmi_category}")
-        print(f"  6. Activity: {activity}")
-        
-        exact_matches = []
-        
-        for plan in self.plans:
-            plan_category = plan.get('category', '')
-            plan_gender = (plan.get('gender') or '').lower()
-            plan_diet = self.normalize_diet_type(plan.get('diet_type') or 'vegetarian')
-            plan_region = (plan.get('region') or '').lower()
-            plan_bmi = self.normalize_bmi(plan.get('bmi_category') or '')
-            plan_activity = self.normalize_activity(plan.get('activity') or '')
-            
-            # ALL 6 factors must match EXACTLY
-            if (plan_category == category and
-                plan_region == region and
-                plan_diet == diet and
-                plan_gender == gender and
-                plan_bmi == bmi_category and
-                plan_activity == activity):
-                
-                exact_matches.append(plan)
-        
-        print(f"[HIERARCHICAL EXACT MATCH] ✓ Found {len(exact_matches)} plans matching ALL 6 factors")
+        Only the fields the profile has are matched. For each field, counts the
+        exact matches per value of that field given the *other* fields, so every
+        option shows what picking it would return (goals keyed like
+        GOAL_TO_CATEGORY; goals without a category are absent). A goal that has
+        no category matches nothing, like in exact_match: the total and every
+        facet but the goal's are empty.
         
-        return exact_matches
+        Returns:
+            {'total': plans matching every given field, 'facets': {field: {value: count}}}
+        """
+        normalize = self.match_normalizers()
+        criteria = {}
+        goal = user_profile.get('goal')
+        unknown_goal = bool(goal) and goal not in self.GOAL_TO_CATEGORY
+        if goal and not unknown_goal:
+            criteria['category'] = self.GOAL_TO_CATEGORY[goal]
+        if user_profile.get('region'):
+            criteria['region'] = user_profile['region'].lower()
+        if user_profile.get('diet_type'):
+            criteria['diet_type'] = self.normalize_diet_type(user_profile['diet_type'])
+        if user_profile.get('gender'):
+            criteria['gender'] = user_profile['gender'].lower()
+        if user_profile.get('bmi_category'):
+            criteria['bmi_category'] = self.normalize_bmi(user_profile['bmi_category'])
+        if user_profile.get('activity_level'):
+            criteria['activity'] = self.normalize_activity(user_profile['activity_level'])
+        
+        counts = self.catalog.facets(criteria, tuple(self.FACET_FIELDS.values()), normalize)
+        facets = {field: {} if unknown_goal else counts[index_field] for field, index_field in self.FACET_FIELDS.items()}
+        facets['goal'] = {goal: counts['category'][category]
+                          for goal, category in self.GOAL_TO_CATEGORY.items() if category in counts['category']}
+        total = 0 if unknown_goal else self.catalog.count(criteria, normalize)
+        return {'total': total, 'facets': facets}
+    
+    def nearest_available(self, user_profile: dict, limit: int = MAX_ALTERNATIVES) -> list:
+        """
+        The closest profiles that do have exact-match plans, nearest first
+        
+        Searches the coverage lattice outward from the profile's own cell at the
+        costs of the recommender's relaxation rules; the goal is never changed.
+        
+        Returns:
+            List of {'distance', 'total_matches', 'criteria' (profile fields),
+            'relaxed': {field: {'requested', 'available'}}}
+        """
+        criteria = self.match_criteria(user_profile)
+        if criteria is None:
+            return []
+        alternatives = []
+        for distance, cell, count in self.lattice.nearest(criteria, limit):
+            alternatives.append({
+                'distance': distance,
+                'total_matches': count,
+                'criteria': {field: cell[index_field] for field, index_field in self.FACET_FIELDS.items()
+                             if field != 'goal'},
+                'relaxed': {field: {'requested': criteria[index_field], 'available': cell[index_field]}
+                            for field, index_field in self.FACET_FIELDS.items()
+                            if cell[index_field] != criteria[index_field]},
+            })
+        return alternatives
     
     def recommend(self, user_profile: dict, top_k: int = 5) -> dict:
         """
@@ -203,7 +285,8 @@ class ExactMatchRecommender:
                     'diet_type': user_profile.get('diet_type'),
                     'region': user_profile.get('region'),
                     'goal': user_profile.get('goals', ['maintain'])[0] if user_profile.get('goals') else 'maintain'
-                }
+                },
+                'alternatives': self.nearest_available(user_profile),
             }
         
         return {
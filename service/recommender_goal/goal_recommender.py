@@ -4,29 +4,30 @@ Matches ONLY Primary Goal + Region
 Ignores: Gender, BMI, Activity, Diet, Health conditions, Age, Allergies
 """
 
-import json
+import logging
 from pathlib import Path
 
+try:
+    from service.plan_catalog import load_catalog
+except ModuleNotFoundError:
+    from plan_catalog import load_catalog
+
+logger = logging.getLogger(__name__)
+
 class GoalOnlyRecommender:
-    def __init__(self, index_path=None):
-        """Initialize with PDF index"""
-        if index_path is None:
-            # Default path to pdf_index.json
-            base_dir = Path(__file__).parent.parent.parent
-            index_path = base_dir / "outputs" / "pdf_index.json"
-        
-        with open(index_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        # Handle both old format (list) and new format (dict with 'plans' key)
-        if isinstance(data, dict) and 'plans' in data:
-            self.plans = data['plans']
-            self.metadata = data.get('metadata', {})
-        else:
-            self.plans = data
-            self.metadata = {}
-        
-        print(f"[GoalOnlyRecommender] Loaded {len(self.plans)} plans")
+    def __init__(self, index_path=None, catalog=None):
+        """Initialize with PDF index (or an already loaded PlanCatalog)"""
+        if catalog is None:
+            if index_path is None:
+                base_dir = Path(__file__).parent.parent.parent
+                index_path = base_dir / "outputs" / "pdf_index.json"
+            # Shared with the other recommenders; old list-format files are handled by the catalog
+            catalog = load_catalog(index_path)
+        
+        self.catalog = catalog
+        self.metadata = catalog.metadata
+        
+        logger.info("Loaded %d plans", len(catalog))
     
     def detect_primary_goal(self, user_profile: dict) -> str:
         """
@@ -140,24 +141,19 @@ class GoalOnlyRecommender:
         }
         target_category = goal_category_map.get(primary_goal, primary_goal)
         
-        print(f"\n[GoalOnly] Matching on:")
-        print(f"  Primary Goal/Category: {target_category}")
-        print(f"  Diet Type: {diet}")
-        print(f"  Region: {region}")
-        print(f"  Ignoring: Gender, BMI, Activity, Health, Age, Allergies")
-        
-        matches = []
-        
-        for plan in self.plans:
-            plan_category = (plan.get('category') or '').lower()
-            plan_diet = (plan.get('diet_type') or 'vegetarian').lower()
-            plan_region = (plan.get('region') or '').lower()
-            
-            # Match goal category + diet type + region
-            if plan_category == target_category and plan_diet == diet and plan_region == region:
-                matches.append(plan)
-        
-        print(f"[GoalOnly] Found {len(matches)} matches")
+        # Match goal category + diet type + region
+        matches = self.catalog.select(
+            {'category': target_category, 'diet_type': diet, 'region': region},
+            normalize={
+                'category': lambda v: (v or '').lower(),
+                'diet_type': lambda v: (v or 'vegetarian').lower(),
+                'region': lambda v: (v or '').lower(),
+            },
+        )
+        
+        # Gender, BMI, activity, health, age and allergies are ignored
+        logger.debug("Goal-only match found %d plans", len(matches),
+                     extra={'category': target_category, 'diet': diet, 'region': region})
         
         return matches
     
@@ -0,0 +1,130 @@
+"""
+BM25 lexical retrieval and reciprocal-rank fusion for the ML recommender.
+
+The BM25 weight of every (document, term) pair is computed once, into a
+sparse document x term matrix stored by term column. A query then scores all
+documents at once: the columns of its terms, weighted by their query counts,
+summed per document. Uses scipy.sparse when it is installed and the same
+column arrays through numpy otherwise; both give the same scores.
+
+Documents come from the plan documents of the full-text search index
+(service/search_index.py), so the term counts are not re-tokenized here.
+"""
+
+import math
+from typing import Any, Dict, Hashable, Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+try:
+    from scipy import sparse
+except ImportError:
+    sparse = None
+
+# Okapi BM25 parameters: term-frequency saturation and length normalization
+K1 = 1.2
+B = 0.75
+
+# Reciprocal-rank fusion constant (Cormack et al.): dampens the weight of the top ranks
+RRF_K = 60
+
+
+class BM25Index:
+    """BM25 weights of a fixed document set; scores(tokens) rates every document against a query"""
+
+    def __init__(self, keys: Sequence[Hashable], term_counts: Dict[str, Dict[int, int]],
+                 k1: float = K1, b: float = B):
+        """keys: one per document (row); term_counts: term -> {row: occurrences}"""
+        self.keys = list(keys)
+        self.row_of = {key: row for row, key in enumerate(self.keys)}
+        size = len(self.keys)
+        self.terms = {term: column for column, term in enumerate(sorted(term_counts))}
+
+        lengths = np.zeros(size, dtype=np.float64)
+        for counts in term_counts.values():
+            rows = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+            lengths += np.bincount(rows, weights=np.fromiter(counts.values(), dtype=np.float64, count=len(counts)),
+                                   minlength=size)
+        average = lengths.mean() if size and lengths.any() else 1.0
+        norms = k1 * (1 - b + b * lengths / average)
+
+        # Term columns, concatenated: rows and weights of column c are [indptr[c]:indptr[c + 1]]
+        indptr = [0]
+        indices: List[np.ndarray] = []
+        data: List[np.ndarray] = []
+        for term in self.terms:
+            counts = term_counts[term]
+            rows = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+            tf = np.fromiter(counts.values(), dtype=np.float64, count=len(counts))
+            idf = math.log(1 + (size - len(counts) + 0.5) / (len(counts) + 0.5))
+            indices.append(rows)
+            data.append(idf * tf * (k1 + 1) / (tf + norms[rows]))
+            indptr.append(indptr[-1] + len(counts))
+        self.indptr = np.array(indptr, dtype=np.int64)
+        self.indices = np.concatenate(indices) if indices else np.zeros(0, dtype=np.int64)
+        self.data = np.concatenate(data) if data else np.zeros(0)
+        self.matrix = (sparse.csc_matrix((self.data, self.indices, self.indptr), shape=(size, len(self.terms)))
+                       if sparse is not None else None)
+
+    @classmethod
+    def from_documents(cls, documents: Iterable[Tuple[Hashable, Iterable[str]]], **params) -> "BM25Index":
+        """Index of (key, tokens) documents"""
+        keys = []
+        term_counts: Dict[str, Dict[int, int]] = {}
+        for row, (key, tokens) in enumerate(documents):
+            keys.append(key)
+            for token in tokens:
+                counts = term_counts.setdefault(token, {})
+                counts[row] = counts.get(row, 0) + 1
+        return cls(keys, term_counts, **params)
+
+    @classmethod
+    def from_search_index(cls, search: Any, kind: str = 'plan', **params) -> "BM25Index":
+        """Index of a SearchIndex's documents of one kind, keyed by plan id"""
+        rows = {}
+        for doc_id, info in enumerate(search.docs):
+            if info.get('kind') == kind:
+                rows[doc_id] = len(rows)
+        keys = [search.docs[doc_id]['plan_id'] for doc_id in rows]
+        term_counts = {}
+        for term, postings in search.postings.items():
+            counts = {rows[doc_id]: len(positions) for doc_id, positions in postings.items() if doc_id in rows}
+            if counts:
+                term_counts[term] = counts
+        return cls(keys, term_counts, **params)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def scores(self, tokens: Iterable[str]) -> np.ndarray:
+        """BM25 score of every document (row order) for the query tokens"""
+        query: Dict[int, int] = {}
+        for token in tokens:
+            column = self.terms.get(token)
+            if column is not None:
+                query[column] = query.get(column, 0) + 1
+        if not query:
+            return np.zeros(len(self.keys))
+        columns = np.fromiter(query.keys(), dtype=np.int64, count=len(query))
+        weights = np.fromiter(query.values(), dtype=np.float64, count=len(query))
+        if self.matrix is not None:
+            return np.asarray(self.matrix[:, columns] @ weights).ravel()
+        starts, ends = self.indptr[columns], self.indptr[columns + 1]
+        lengths = ends - starts
+        # Positions of every selected column entry, gathered in one step
+        offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+        return np.bincount(self.indices[offsets], weights=self.data[offsets] * np.repeat(weights, lengths),
+                           minlength=len(self.keys))
+
+
+def rank(scores: np.ndarray) -> np.ndarray:
+    """Positions ordered best score first (ties keep their order)"""
+    return np.argsort(-scores, kind='stable')
+
+
+def reciprocal_rank_fusion(rankings: Sequence[np.ndarray], size: int, k: int = RRF_K) -> np.ndarray:
+    """Fused score per position: sum over rankings of 1 / (k + rank), ranks from 1"""
+    fused = np.zeros(size)
+    for ranking in rankings:
+        fused[ranking] += 1.0 / (k + np.arange(1, len(ranking) + 1))
+    return fused
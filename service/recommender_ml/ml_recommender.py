@@ -3,7 +3,6 @@ Production-level ML Recommender using RAG + Fine-tuned Llama-3
 Uses FortyMiles Llama-3-8B Food/Nutrition Model (10-epoch trained)
 Replaces the weighted scoring system with LLM-based recommendations
 """
-import json
 import logging
 from pathlib import Path
 from typing import List, Dict, Any, Optional
@@ -11,7 +10,8 @@ import numpy as np
 from dataclasses import dataclass
 import requests
 
-logging.basicConfig(level=logging.INFO)
+from .bm25 import RRF_K, BM25Index, rank, reciprocal_rank_fusion
+
 logger = logging.getLogger(__name__)
 
 # ==================== COLAB API CONFIGURATION ====================
@@ -49,7 +49,7 @@ class MLRecommender:
     Production ML Recommender using RAG + Fine-tuned Llama-3
     
     Architecture:
-    1. Vector Search: Find semantically similar PDFs from database
+    1. Hybrid Search: BM25 over plan text fused with vector and attribute ranks
     2. PDF Parser: Extract meals from top-k similar PDFs
     3. Fine-tuned Llama-3-8B: Generate personalized plan using retrieved meals
     
@@ -70,7 +70,8 @@ class MLRecommender:
         embeddings_path: str = "outputs/pdf_embeddings.npy",
         model_name: str = "fortymiles/Llama-3-8B-sft-lora-food-nutrition-10-epoch",
         finetuned_path: str = None,  # Not used - model is already fine-tuned
-        use_local: bool = False
+        use_local: bool = False,
+        search_index=None
     ):
         """
         Initialize ML Recommender
@@ -81,6 +82,7 @@ class MLRecommender:
             model_name: Model name (FortyMiles Llama-3-8B)
             finetuned_path: Not used - model is already fine-tuned
             use_local: Use local Ollama (True) or Colab API (False, recommended)
+            search_index: Full-text SearchIndex for BM25 (built from the plan text if None)
         """
         self.index_path = Path(index_path)
         self.embeddings_path = Path(embeddings_path)
@@ -92,6 +94,12 @@ class MLRecommender:
         self.index = None
         self.load_index()
         
+        # BM25 over plan text (built on first hybrid search)
+        self.search_index = search_index
+        self.bm25 = None
+        self._bm25_rows = None
+        self._columns = None
+        
         # Initialize embeddings (for vector search)
         self.embeddings = None
         self.embedding_model = None
@@ -109,14 +117,15 @@ class MLRecommender:
             self.initialize_llm()
     
     def load_index(self):
-        """Load PDF index"""
+        """Load PDF index (shared with the other recommenders through the plan catalog)"""
         logger.info(f"Loading PDF index from {self.index_path}")
         
-        if not self.index_path.exists():
-            raise FileNotFoundError(f"Index file not found: {self.index_path}")
-        
-        with open(self.index_path, 'r', encoding='utf-8') as f:
-            self.index = json.load(f)
+        try:
+            from service.plan_catalog import load_catalog
+        except ImportError:
+            from plan_catalog import load_catalog
+        self.catalog = load_catalog(self.index_path)
+        self.index = self.catalog.index
         
         logger.info(f"Loaded {self.index['metadata']['total_plans']} plans")
     
@@ -308,7 +317,7 @@ class MLRecommender:
             plan['similarity_score'] = float(similarities[idx])
             results.append(plan)
         
-        logger.info(f"Found {len(results)} similar plans (top similarity: {results[0]['similarity_score']:.3f})")
+        logger.debug("Found %d similar plans (top similarity: %.3f)", len(results), results[0]['similarity_score'])
         return results
     
     def keyword_search(self, user_profile: UserProfile, top_k: int = None) -> List[Dict[str, Any]]:
@@ -322,68 +331,140 @@ class MLRecommender:
         Returns:
             ALL matching plans filtered by diet type and goal category
         """
+        positions = self._candidate_positions(user_profile)
+        scores = self._attribute_scores(positions, user_profile)
+        
+        results = []
+        for i in rank(scores):
+            plan_copy = self.index['plans'][positions[i]].copy()
+            plan_copy['similarity_score'] = float(scores[i])
+            results.append(plan_copy)
+        
+        # Return ALL matching plans (or top_k if specified)
+        final_count = len(results) if top_k is None else min(top_k, len(results))
+        logger.debug("Step 3: returning %d plans to feed into ML model", final_count)
+        
+        return results if top_k is None else results[:top_k]
+    
+    def hybrid_search(self, user_profile: UserProfile, top_k: int = None) -> List[Dict[str, Any]]:
+        """
+        Rank the plans matching diet type and goal category by reciprocal-rank fusion
+        
+        Fuses the BM25 ranking of the plan text against the profile, the attribute
+        ranking of keyword_search and, when embeddings are available, the vector
+        similarity ranking. Works without sentence-transformers (BM25 + attributes).
+        
+        Args:
+            user_profile: User profile
+            top_k: Number of PDFs to retrieve (None = return ALL matching PDFs)
+            
+        Returns:
+            Matching plans, best first, with similarity_score (fused, 0-1) and bm25_score
+        """
+        positions = self._candidate_positions(user_profile)
+        if not len(positions):
+            return []
+        
+        bm25_scores = self._bm25_scores(user_profile)[positions]
+        rankings = [rank(bm25_scores), rank(self._attribute_scores(positions, user_profile))]
+        if self.embedding_model and self.embeddings is not None and len(self.embeddings) == len(self.catalog):
+            query_embedding = self.embedding_model.encode([self._profile_to_text(user_profile)], convert_to_numpy=True)[0]
+            candidates = self.embeddings[positions]
+            similarities = candidates @ query_embedding / (
+                np.linalg.norm(candidates, axis=1) * np.linalg.norm(query_embedding)
+            )
+            rankings.append(rank(similarities))
+        
+        fused = reciprocal_rank_fusion(rankings, len(positions))
+        best = len(rankings) / (RRF_K + 1)  # first in every ranking
+        order = rank(fused)
+        if top_k is not None:
+            order = order[:top_k]
+        
+        results = []
+        for i in order:
+            plan_copy = self.index['plans'][positions[i]].copy()
+            plan_copy['similarity_score'] = float(fused[i] / best)
+            plan_copy['bm25_score'] = float(bm25_scores[i])
+            results.append(plan_copy)
+        
+        logger.debug("Hybrid search fused %d rankings over %d plans", len(rankings), len(positions))
+        return results
+    
+    def _plan_columns(self) -> Dict[str, np.ndarray]:
+        """Matching attributes of every plan as arrays (index order), for vectorized filters"""
+        if self._columns is None:
+            plans = self.index['plans']
+            self._columns = {
+                field: np.array([(plan.get(field) or '') for plan in plans], dtype=str)
+                for field in ('diet_type', 'gender', 'region', 'bmi_category', 'activity')
+            }
+            self._columns['category'] = np.array([(plan.get('category') or '').lower() for plan in plans], dtype=str)
+        return self._columns
+    
+    def _candidate_positions(self, user_profile: UserProfile) -> np.ndarray:
+        """Positions of the plans matching diet type and goal category (keyword_search steps 1-2)"""
+        columns = self._plan_columns()
+        
         # STEP 1: Filter by diet type (CRITICAL - veg users never get non-veg)
-        diet_filtered_plans = [
-            plan for plan in self.index['plans']
-            if plan.get('diet_type') == user_profile.diet_type
-        ]
+        diet_filtered = np.flatnonzero(columns['diet_type'] == user_profile.diet_type)
         
-        logger.info(f"✅ Step 1: Filtered {len(diet_filtered_plans)} plans matching diet type: {user_profile.diet_type}")
+        logger.debug("Step 1: %d plans match diet type %s", len(diet_filtered), user_profile.diet_type)
         
         # STEP 2: Filter by goal/category (EXACT match like exact match system)
-        category_filtered_plans = [
-            plan for plan in diet_filtered_plans
-            if plan.get('category', '').lower() == user_profile.goal.lower()
-        ]
+        categories = columns['category'][diet_filtered]
+        category_filtered = diet_filtered[categories == user_profile.goal.lower()]
         
         # If no exact category match, try to find similar categories
-        if not category_filtered_plans:
+        if not len(category_filtered):
             logger.warning(f"No exact match for goal '{user_profile.goal}', trying similar categories...")
             # Try partial match as fallback
             goal_keywords = user_profile.goal.lower().replace('_', ' ').split()
-            for plan in diet_filtered_plans:
-                category = plan.get('category', '').lower()
-                # Match if ALL goal keywords appear in category (not just any)
-                if all(keyword in category for keyword in goal_keywords):
-                    category_filtered_plans.append(plan)
+            # Match if ALL goal keywords appear in category (not just any)
+            similar = [category for category in np.unique(categories)
+                       if all(keyword in category for keyword in goal_keywords)]
+            category_filtered = diet_filtered[np.isin(categories, similar)]
         
         # If still no matches, use all diet-filtered plans
-        if not category_filtered_plans:
+        if not len(category_filtered):
             logger.warning(f"No plans found for goal '{user_profile.goal}', using all {user_profile.diet_type} plans")
-            category_filtered_plans = diet_filtered_plans
+            category_filtered = diet_filtered
         else:
-            logger.info(f"✅ Step 2: Filtered {len(category_filtered_plans)} plans matching goal: {user_profile.goal}")
+            logger.debug("Step 2: %d plans match goal %s", len(category_filtered), user_profile.goal)
         
-        # STEP 3: Score and rank plans
-        results = []
-        for plan in category_filtered_plans:
-            score = 0
-            
-            # Diet + Category already filtered - base score
-            score += 30
-            
-            # Exact matches
-            if plan.get('gender') == user_profile.gender:
-                score += 15
-            if plan.get('region') == user_profile.region:
-                score += 10
-            if plan.get('bmi_category') == user_profile.bmi_category:
-                score += 10
-            if plan.get('activity') == user_profile.activity_level:
-                score += 10
-            
-            plan_copy = plan.copy()
-            plan_copy['similarity_score'] = score / 75.0
-            results.append(plan_copy)
-        
-        # Sort by score
-        results.sort(key=lambda x: x['similarity_score'], reverse=True)
-        
-        # Return ALL matching plans (or top_k if specified)
-        final_count = len(results) if top_k is None else min(top_k, len(results))
-        logger.info(f"✅ Step 3: Returning {final_count} plans to feed into ML model")
-        
-        return results if top_k is None else results[:top_k]
+        return category_filtered
+    
+    def _attribute_scores(self, positions: np.ndarray, user_profile: UserProfile) -> np.ndarray:
+        """Attribute match score (0-1) of the plans at positions"""
+        columns = self._plan_columns()
+        # Diet + Category already filtered - base score; then exact matches
+        score = (30.0
+                 + 15 * (columns['gender'][positions] == user_profile.gender)
+                 + 10 * (columns['region'][positions] == user_profile.region)
+                 + 10 * (columns['bmi_category'][positions] == user_profile.bmi_category)
+                 + 10 * (columns['activity'][positions] == user_profile.activity_level))
+        return score / 75.0
+    
+    def _bm25_scores(self, user_profile: UserProfile) -> np.ndarray:
+        """BM25 score of every plan (index order) for the profile's attributes, goal and conditions"""
+        try:
+            from service.search_index import build_search_index, tokenize
+        except ImportError:
+            from search_index import build_search_index, tokenize
+        
+        if self.bm25 is None:
+            if self.search_index is None:
+                self.search_index = build_search_index(self.catalog, self.catalog.absolute_path)
+            self.bm25 = BM25Index.from_search_index(self.search_index)
+            # Plans missing from the search index score 0 (row -1 reads the appended 0)
+            self._bm25_rows = np.array([self.bm25.row_of.get(plan.get('id'), -1) for plan in self.index['plans']],
+                                       dtype=np.int64)
+        
+        query = " ".join([
+            user_profile.goal, user_profile.region, user_profile.diet_type, user_profile.gender,
+            user_profile.bmi_category, user_profile.activity_level, *user_profile.health_conditions
+        ])
+        return np.append(self.bm25.scores(tokenize(query)), 0.0)[self._bm25_rows]
     
     def _profile_to_text(self, user_profile: UserProfile) -> str:
         """Convert user profile to searchable text"""
@@ -438,7 +519,7 @@ class MLRecommender:
                 continue
             
             # Parse PDF
-            logger.info(f"Parsing PDF: {Path(pdf_path).name}")
+            logger.debug("Parsing PDF: %s", pdf_path)
             result = parser.parse_complete_pdf(str(pdf_path))
             
             if 'error' in result:
@@ -452,7 +533,7 @@ class MLRecommender:
                 meal['similarity_score'] = plan.get('similarity_score', 0.0)
                 all_meals.append(meal)
         
-        logger.info(f"Extracted {len(all_meals)} meals from {len(plans)} PDFs")
+        logger.debug("Extracted %d meals from %d PDFs", len(all_meals), len(plans))
         return all_meals
     
     def generate_plan_with_llm(
@@ -826,7 +907,6 @@ Format:
         Returns:
             Diet plan recommendations
         """
-        logger.info("Starting ML-based recommendation...")
         
         # Normalize diet type to match PDF index values
         diet_type = user_profile.get('diet_type', 'vegetarian')
@@ -895,7 +975,7 @@ Format:
         }
         normalized_goal = goal_mapping.get(goal, goal)
         
-        logger.info(f"📋 Normalized: diet={normalized_diet_type}, activity={normalized_activity}, goal={normalized_goal}")
+        logger.debug("Normalized ML profile", extra={'diet': normalized_diet_type, 'activity': normalized_activity, 'goal': normalized_goal})
         
         # Convert dict to UserProfile
         profile = UserProfile(
@@ -913,14 +993,13 @@ Format:
         )
         
         try:
-            # Step 1: Get ALL PDFs matching diet type and goal (NO LIMIT)
-            logger.info(f"🔍 Searching for plans: diet={profile.diet_type}, goal={profile.goal}")
-            similar_pdfs = self.vector_search(profile, top_k=None)  # Get ALL matching PDFs
+            # Step 1: Get ALL PDFs matching diet type and goal (NO LIMIT), best first
+            similar_pdfs = self.hybrid_search(profile, top_k=None)  # Get ALL matching PDFs
             
             if not similar_pdfs:
                 raise ValueError(f"No {profile.diet_type} plans found for goal: {profile.goal}")
             
-            logger.info(f"📚 Found {len(similar_pdfs)} matching PDFs to feed into model")
+            logger.debug("Found %d matching PDFs to feed into model", len(similar_pdfs))
             
             # Step 2: Extract meals from ALL matching PDFs
             retrieved_meals = self.extract_meals_from_pdfs(similar_pdfs)
@@ -928,7 +1007,7 @@ Format:
             if not retrieved_meals:
                 raise ValueError(f"Could not extract meals from {len(similar_pdfs)} PDFs")
             
-            logger.info(f"🍽️ Extracted {len(retrieved_meals)} meals from PDFs")
+            logger.debug("Extracted %d meals from PDFs", len(retrieved_meals))
             
             # Step 3: ALWAYS generate plan with fine-tuned model
             if not self.llm:
@@ -0,0 +1,61 @@
+"""
+Server-held recommendation result sets.
+
+Each generate call stores the plans it returned under a short-lived random
+token. The cards sent to the browser carry their position in that list as
+their id, so /api/meal-plan/select only needs (result_token, selected_ids)
+and resolves the plans by index instead of matching file paths.
+"""
+
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+
+class ResultSetStore:
+    """Token -> list of plans, expiring after ttl seconds (bounded LRU)."""
+
+    def __init__(self, ttl: float = 1800, max_sets: int = 256):
+        self.ttl = ttl
+        self.max_sets = max_sets
+        self._sets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, plans: List[Dict[str, Any]]) -> str:
+        """Store a result set and return its token."""
+        token = secrets.token_urlsafe(16)
+        with self._lock:
+            self._evict(time.monotonic())
+            self._sets[token] = (time.monotonic() + self.ttl, list(plans))
+            while len(self._sets) > self.max_sets:
+                self._sets.popitem(last=False)
+        return token
+
+    def get(self, token: str) -> Optional[List[Dict[str, Any]]]:
+        """Plans stored under token, or None if unknown or expired."""
+        with self._lock:
+            entry = self._sets.get(token)
+            if entry is None:
+                return None
+            expires, plans = entry
+            if expires < time.monotonic():
+                del self._sets[token]
+                return None
+            return plans
+
+    def resolve(self, token: str, ids: List[int]) -> Optional[List[Dict[str, Any]]]:
+        """Plans for the given card ids (unknown ids are skipped), None if the token expired."""
+        plans = self.get(token)
+        if plans is None:
+            return None
+        return [plans[i] for i in ids if isinstance(i, int) and 0 <= i < len(plans)]
+
+    def _evict(self, now: float):
+        # Entries are in insertion order and share one ttl, so expired ones are at the front
+        while self._sets:
+            token, (expires, _) = next(iter(self._sets.items()))
+            if expires >= now:
+                break
+            del self._sets[token]
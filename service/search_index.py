@@ -0,0 +1,219 @@
+"""
+Full-text search over plans and their meal options.
+
+A positional inverted index: every document (a whole plan, or one parsed
+meal option) is tokenized into lowercase words, and each term maps to the
+documents containing it with the word positions. Queries are answered from
+the postings alone, so their cost depends on the terms' posting lists, not
+on the corpus size.
+
+Query syntax:
+    brown rice        both terms, anywhere in the document
+    "brown rice"      the phrase
+    ragi*             any term starting with "ragi"
+    "moong dal chil*" a phrase whose last word is a prefix
+
+Built at index time by pipeline/build_pdf_index.py (outputs/pdf_search.json,
+carrying the sha256 of the pdf_index.json it was built with); the service
+loads it when it matches the index, else indexes whole plans itself.
+"""
+
+import bisect
+import json
+import math
+import re
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+SEARCH_INDEX_VERSION = 1
+
+TOKEN_PATTERN = re.compile(r"[^\W_]+")
+QUERY_PATTERN = re.compile(r'"([^"]*)"|(\S+)')
+
+# Positions skipped between a document's fields, so phrases never span two fields
+FIELD_GAP = 8
+
+Postings = Dict[int, List[int]]  # doc id -> positions
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_PATTERN.findall(text.lower()) if text else []
+
+
+def plan_documents(plan: Dict[str, Any], text: str,
+                   parsed: Optional[Dict[str, Any]] = None) -> List[Tuple[Dict[str, Any], List[str]]]:
+    """(document info, fields) for a plan and each meal option of its parsed form"""
+    source = {'plan_id': plan['id'], 'relative_path': plan.get('relative_path')}
+    category = (plan.get('category') or '').replace('_', ' ')
+    title = (parsed or {}).get('title', '')
+    documents = [({**source, 'kind': 'plan'}, [plan.get('filename', ''), category, title, text])]
+    for meal in (parsed or {}).get('meals', []):
+        for option in meal.get('options', []):
+            info = {**source, 'kind': 'meal', 'meal_type': meal.get('meal_type', ''), 'name': option.get('name', '')}
+            documents.append((info, [option.get('name', ''), option.get('ingredients', ''), option.get('method', '')]))
+    return documents
+
+
+def build_search_index(plans: Iterable[Dict[str, Any]],
+                       path_of: Callable[[Dict[str, Any]], Optional[str]]) -> "SearchIndex":
+    """Index of the plans' full text alone (no meal documents: those need every plan parsed)"""
+    index = SearchIndex()
+    for plan in plans:
+        path = path_of(plan)
+        try:
+            with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+                text = f.read()
+        except (OSError, TypeError):
+            text = ''
+        for info, fields in plan_documents(plan, text):
+            index.add(info, fields)
+    return index
+
+
+class SearchIndex:
+    """Positional postings (term -> doc id -> positions) over plan and meal documents"""
+
+    def __init__(self, docs: Optional[List[Dict[str, Any]]] = None,
+                 postings: Optional[Dict[str, Postings]] = None, index_sha256: str = ''):
+        self.docs: List[Dict[str, Any]] = docs or []
+        self.postings: Dict[str, Postings] = postings or {}
+        self.index_sha256 = index_sha256
+        self._terms: Optional[List[str]] = None
+
+    def add(self, info: Dict[str, Any], fields: Iterable[str]) -> int:
+        doc_id = len(self.docs)
+        self.docs.append(info)
+        position = 0
+        for field in fields:
+            for token in tokenize(field):
+                self.postings.setdefault(token, {}).setdefault(doc_id, []).append(position)
+                position += 1
+            position += FIELD_GAP
+        self._terms = None
+        return doc_id
+
+    def extract(self, keep) -> "SearchIndex":
+        """New index with only the documents for which keep(info) is true (ids renumbered, order kept)."""
+        remap = {}
+        docs = []
+        for doc_id, info in enumerate(self.docs):
+            if keep(info):
+                remap[doc_id] = len(docs)
+                docs.append(info)
+        postings = {}
+        for term, term_postings in self.postings.items():
+            kept = {remap[d]: positions for d, positions in term_postings.items() if d in remap}
+            if kept:
+                postings[term] = kept
+        return SearchIndex(docs, postings, self.index_sha256)
+
+    def terms(self) -> List[str]:
+        if self._terms is None:
+            self._terms = sorted(self.postings)
+        return self._terms
+
+    def expand(self, token: str) -> List[str]:
+        """Indexed terms matching a query token ("ragi*" is a prefix)"""
+        if not token.endswith('*'):
+            return [token] if token in self.postings else []
+        prefix = token[:-1]
+        terms = self.terms()
+        start = bisect.bisect_left(terms, prefix)
+        end = bisect.bisect_left(terms, prefix + '\uffff')
+        return terms[start:end]
+
+    def _positions(self, token: str) -> Postings:
+        """doc id -> sorted positions of any term the token matches"""
+        matched = [self.postings[term] for term in self.expand(token)]
+        if len(matched) == 1:
+            return matched[0]
+        merged: Dict[int, List[int]] = {}
+        for term_postings in matched:
+            for doc_id, positions in term_postings.items():
+                merged.setdefault(doc_id, []).extend(positions)
+        return {doc_id: sorted(positions) for doc_id, positions in merged.items()}
+
+    def _phrase(self, tokens: List[str]) -> Postings:
+        """doc id -> start positions of the phrase"""
+        per_token = [self._positions(token) for token in tokens]
+        if not per_token or any(not postings for postings in per_token):
+            return {}
+        per_token_by_size = sorted(per_token, key=len)
+        candidates = set(per_token_by_size[0])
+        for postings in per_token_by_size[1:]:
+            candidates &= postings.keys()
+        matches = {}
+        for doc_id in candidates:
+            starts = set(per_token[0][doc_id])
+            for offset, postings in enumerate(per_token[1:], 1):
+                starts &= {p - offset for p in postings[doc_id]}
+                if not starts:
+                    break
+            if starts:
+                matches[doc_id] = sorted(starts)
+        return matches
+
+    @staticmethod
+    def parse_query(query: str) -> List[List[str]]:
+        """'brown "moong dal" ragi*' -> [['brown'], ['moong', 'dal'], ['ragi*']]"""
+        clauses = []
+        for phrase, word in QUERY_PATTERN.findall(query or ''):
+            text = phrase if phrase else word
+            tokens = tokenize(text)
+            if tokens and text.rstrip().endswith('*'):
+                tokens[-1] += '*'
+            if tokens:
+                clauses.append(tokens)
+        return clauses
+
+    def search(self, query: str, kind: Optional[str] = None,
+               limit: Optional[int] = 20) -> Tuple[int, List[Dict[str, Any]]]:
+        """(total matches, best hits): documents matching every clause, scored by tf-idf (limit None: all)"""
+        clauses = self.parse_query(query)
+        if not clauses:
+            return 0, []
+        matched = [self._phrase(tokens) for tokens in clauses]
+        matched.sort(key=len)
+        docs = set(matched[0])
+        for postings in matched[1:]:
+            docs &= postings.keys()
+        if kind:
+            docs = {d for d in docs if self.docs[d]['kind'] == kind}
+        if not docs:
+            return 0, []
+
+        total_docs = len(self.docs)
+        scores = {}
+        for postings in matched:
+            idf = math.log(1 + total_docs / len(postings))
+            for doc_id in docs:
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * (1 + math.log(len(postings[doc_id])))
+        ranked = sorted(docs, key=lambda d: (-scores[d], d))[:limit]
+        return len(docs), [{**self.docs[d], 'score': round(scores[d], 4)} for d in ranked]
+
+    def save(self, path: Union[str, Path]):
+        path = Path(path)
+        tmp_path = Path(str(path) + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'version': SEARCH_INDEX_VERSION,
+                'index_sha256': self.index_sha256,
+                'docs': self.docs,
+                'postings': {term: [[doc_id, positions] for doc_id, positions in term_postings.items()]
+                             for term, term_postings in sorted(self.postings.items())},
+            }, f, ensure_ascii=False, separators=(',', ':'))
+        tmp_path.replace(path)
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> Optional["SearchIndex"]:
+        """Index saved at path, or None if it is missing or from another format version"""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get('version') != SEARCH_INDEX_VERSION:
+            return None
+        postings = {term: {doc_id: positions for doc_id, positions in entries}
+                    for term, entries in data['postings'].items()}
+        return cls(data['docs'], postings, data.get('index_sha256', ''))
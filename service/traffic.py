@@ -0,0 +1,209 @@
+"""
+Traffic capture for performance regression testing.
+
+TrafficRecorderMiddleware appends one JSON line per request (method, path,
+query, JSON body, Accept header, status and duration) to a capture file.
+Personal and health fields are scrubbed before anything is written: bodies
+of endpoints listed in BODY_ALLOWLISTS keep only their allowlisted fields,
+others lose the keys in PII_FIELDS and HEALTH_FIELDS. Requests only put
+their record on a queue; a writer thread does the serialization and file
+I/O, so a slow disk never stalls the event loop (the same split as
+logging_config.py). The capture is re-issued against a local instance by
+scripts/replay_traffic.py.
+
+Enabled in service.api by setting TRAFFIC_CAPTURE_PATH.
+"""
+
+import atexit
+import json
+import os
+import queue
+import threading
+import time
+from typing import Any, Iterable, Optional
+from urllib.parse import parse_qsl
+
+# Keys whose values never leave the process (matched case-insensitively, anywhere in the body)
+PII_FIELDS = frozenset({
+    'name',
+    'first_name',
+    'last_name',
+    'email',
+    'password',
+    'phone',
+    'mobile',
+    'address',
+    'dob',
+    'date_of_birth',
+})
+# Health data: scrubbed from request bodies (query filters such as ?age= stay replayable)
+HEALTH_FIELDS = frozenset({
+    'age',
+    'height',
+    'weight',
+    'bmi',
+    'bmr',
+    'tdee',
+    'allergies',
+    'medical_conditions',
+    'health_conditions',
+    'conditions',
+    'medications',
+    'symptoms',
+    'digestion',
+    'acne_status',
+    'notes',
+})
+# Profile fields that carry no personal or health data; everything else in a
+# profile body is scrubbed, including fields added to the form later
+PROFILE_SAFE_FIELDS = frozenset({
+    'gender',
+    'region',
+    'diet_type',
+    'activity_level',
+    'goals',
+    'goal',
+    'bmi_category',
+    'onboarding_complete',
+    'plan_start_date',
+    'current_plan_cycle',
+})
+BODY_SCRUBBED_FIELDS = PII_FIELDS | HEALTH_FIELDS
+# Request path -> the only top-level body fields captured as is
+BODY_ALLOWLISTS = {
+    '/api/profile': PROFILE_SAFE_FIELDS,
+}
+SCRUBBED = "[scrubbed]"
+
+# Queued after the last record to stop the writer thread
+_STOP = object()
+
+
+def scrub(value: Any, fields: frozenset = PII_FIELDS) -> Any:
+    """Copy of a JSON value with every key in fields (any depth) replaced."""
+    if isinstance(value, dict):
+        return {
+            key: SCRUBBED if key.lower() in fields else scrub(item, fields)
+            for key, item in value.items()
+        }
+    if isinstance(value, list):
+        return [scrub(item, fields) for item in value]
+    return value
+
+
+def scrub_body(path: str, body: Any) -> Any:
+    """Copy of a request body safe to write: allowlisted fields only where the path has an allowlist"""
+    allowed = BODY_ALLOWLISTS.get(path)
+    if allowed is not None and isinstance(body, dict):
+        return {key: scrub(item, BODY_SCRUBBED_FIELDS) if key in allowed else SCRUBBED
+                for key, item in body.items()}
+    return scrub(body, BODY_SCRUBBED_FIELDS)
+
+
+class TrafficRecorder:
+    """JSONL writer for captured requests: write() only enqueues, a writer thread appends to the file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._queue: Optional[queue.SimpleQueue] = None
+        self._thread: Optional[threading.Thread] = None
+        self._pid = None
+        self._lock = threading.Lock()
+        atexit.register(self.close)
+
+    def write(self, record: dict):
+        self._writer_queue().put(record)
+
+    def _writer_queue(self) -> queue.SimpleQueue:
+        """The queue of this process's writer thread, started on first use (threads don't survive fork)"""
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._queue = queue.SimpleQueue()
+                    self._thread = threading.Thread(target=self._drain, args=(self._queue,),
+                                                     name="traffic-recorder", daemon=True)
+                    self._thread.start()
+                    self._pid = os.getpid()
+        return self._queue
+
+    def _drain(self, records: queue.SimpleQueue):
+        with open(self.path, 'a', encoding='utf-8') as f:
+            while True:
+                record = records.get()
+                # Write everything already queued, then flush once
+                while record is not _STOP:
+                    f.write(json.dumps(record, separators=(',', ':'), default=str) + "\n")
+                    try:
+                        record = records.get_nowait()
+                    except queue.Empty:
+                        break
+                f.flush()
+                if record is _STOP:
+                    return
+
+    def close(self):
+        """Write out the queued records and stop the writer thread"""
+        with self._lock:
+            if self._pid == os.getpid() and self._thread is not None:
+                self._queue.put(_STOP)
+                self._thread.join()
+            self._queue = self._thread = self._pid = None
+
+
+class TrafficRecorderMiddleware:
+    """ASGI middleware recording every HTTP request outside the excluded prefixes."""
+
+    def __init__(self, app, path: str, exclude_prefixes: Iterable[str] = ("/static",)):
+        self.app = app
+        self.recorder = TrafficRecorder(path)
+        self.exclude_prefixes = tuple(exclude_prefixes)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith(self.exclude_prefixes):
+            await self.app(scope, receive, send)
+            return
+
+        body = bytearray()
+        status = None
+        started = time.time()
+        perf_start = time.perf_counter()
+
+        async def receive_and_capture():
+            message = await receive()
+            if message["type"] == "http.request":
+                body.extend(message.get("body", b""))
+            return message
+
+        async def send_and_capture(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive_and_capture, send_and_capture)
+        finally:
+            duration_ms = (time.perf_counter() - perf_start) * 1000
+            self.recorder.write(self._record(scope, bytes(body), status, started, duration_ms))
+
+    @staticmethod
+    def _record(scope, body: bytes, status, started: float, duration_ms: float) -> dict:
+        headers = {key.decode('latin-1').lower(): value.decode('latin-1') for key, value in scope.get("headers", [])}
+        query = dict(parse_qsl(scope.get("query_string", b"").decode('latin-1')))
+
+        record = {
+            "ts": round(started, 6),
+            "method": scope["method"],
+            "path": scope["path"],
+            "query": scrub(query),
+            "accept": headers.get("accept"),
+            "status": status,
+            "duration_ms": round(duration_ms, 3),
+        }
+        if body:
+            try:
+                record["body"] = scrub_body(scope["path"], json.loads(body))
+            except ValueError:
+                # Non-JSON bodies are not replayable; keep only their size
+                record["body_bytes"] = len(body)
+        return record
@@ -0,0 +1,121 @@
+"""
+Cache pre-warming from recorded recommendation traffic.
+
+Every recommendation request appends a compact record of its normalized
+query (system + matching-relevant profile fields) to a rotating JSONL log
+in the data directory. At startup the most frequent queries from the
+current and rotated logs are replayed, so the match cache, parse cache and
+card blobs are already warm for the first users after a deploy.
+
+Size rotation is not safe across processes, so each pre-forked worker
+(numbered by prefork.py in WORKER_ID_ENV) writes and rotates its own log,
+and warm-up reads all of them.
+"""
+
+import json
+import logging
+import logging.handlers
+import os
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple, Union
+
+from service.match_cache import match_profile, profile_key
+
+logger = logging.getLogger(__name__)
+
+# Worker number of a pre-forked worker process (unset in a single-process server)
+WORKER_ID_ENV = "WORKER_ID"
+
+
+class QueryLog:
+    """Append-only, size-rotated JSONL log of normalized recommendation queries.
+
+    A worker numbered n writes <stem>.<n><suffix> next to path instead of path
+    itself, so no two processes ever append to or rotate the same file. A
+    restarted worker takes over its predecessor's file.
+    """
+
+    def __init__(self, path: Union[str, Path], max_bytes: int = 1_000_000, backup_count: int = 3):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self._logger = None
+        self._handler = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def worker_path(self) -> Path:
+        """File this process writes"""
+        worker = os.environ.get(WORKER_ID_ENV)
+        if not worker:
+            return self.path
+        return self.path.with_name(f"{self.path.stem}.{worker}{self.path.suffix}")
+
+    def _writer(self) -> logging.Logger:
+        """This process's logger, opened on first use (a forked worker opens its own file)"""
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    path = self.worker_path()
+                    handler = logging.handlers.RotatingFileHandler(
+                        path, maxBytes=self.max_bytes, backupCount=self.backup_count, encoding='utf-8', delay=True
+                    )
+                    handler.setFormatter(logging.Formatter('%(message)s'))
+                    # A private logger: records must not reach the application's handlers
+                    writer = logging.Logger(f"query_log.{path}")
+                    writer.addHandler(handler)
+                    self._logger, self._handler = writer, handler
+                    self._pid = os.getpid()
+        return self._logger
+
+    def record(self, system: str, profile: Dict[str, Any]):
+        entry = {'ts': int(time.time()), 'system': system, 'profile': match_profile(profile)}
+        self._writer().info(json.dumps(entry, separators=(',', ':'), default=str))
+
+    def files(self) -> List[Path]:
+        """Every process's current log and its rotated backups (newest first per log)."""
+        logs = [self.path] + sorted(self.path.parent.glob(f"{self.path.stem}.*{self.path.suffix}"))
+        candidates = [backup for log in logs
+                      for backup in [log] + [Path(f"{log}.{i}") for i in range(1, self.backup_count + 1)]]
+        return [path for path in candidates if path.exists()]
+
+    def close(self):
+        with self._lock:
+            if self._pid == os.getpid() and self._handler is not None:
+                self._handler.close()
+            self._logger = self._handler = self._pid = None
+
+
+def top_queries(files: List[Path], n: int) -> List[Tuple[str, Dict[str, Any]]]:
+    """The n most frequent (system, profile) queries across the log files."""
+    counts = Counter()
+    profiles = {}
+    for path in files:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                    key = (entry['system'], profile_key(entry['profile']))
+                except (ValueError, KeyError, TypeError):
+                    continue  # partial line from a crash or rotation
+                counts[key] += 1
+                profiles.setdefault(key, entry['profile'])
+    return [(system, profiles[(system, key)]) for (system, key), _ in counts.most_common(n)]
+
+
+def warm_caches(query_log: QueryLog, n: int, replay: Callable[[str, Dict[str, Any]], None]) -> int:
+    """Replay the top n logged queries through replay(system, profile); returns how many ran."""
+    queries = top_queries(query_log.files(), n)
+    started = time.time()
+    warmed = 0
+    for system, profile in queries:
+        try:
+            replay(system, profile)
+            warmed += 1
+        except Exception as e:
+            logger.warning("Warm-up of %s query failed: %s", system, e)
+    logger.info("Warmed caches with %d/%d recorded queries in %.1fs", warmed, len(queries), time.time() - started)
+    return warmed
@@ -0,0 +1,56 @@
+"""
+Test the binary plan index
+Checks that it round-trips the JSON index exactly and that a catalog over
+it answers like the JSON catalog while decoding only the plans it returns
+"""
+import sys
+import os
+import json
+import tempfile
+from pathlib import Path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from service.binary_index import BinaryIndex, write_binary_index
+from service.plan_catalog import DEFAULT_INDEX_PATH, BinaryPlanCatalog, PlanCatalog
+
+
+def _index():
+    with open(DEFAULT_INDEX_PATH, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def test_round_trip_is_exact():
+    index = _index()
+    index['plans'][0]['extra'] = {'note': None}  # keys only some plans have survive too
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / 'pdf_index.bin'
+        write_binary_index(index, path)
+        store = BinaryIndex(path)
+        assert json.dumps(store.to_index()) == json.dumps(index)
+        assert store.value(1, 'extra', 'absent') == 'absent'
+        assert store.value(0, 'category') == index['plans'][0].get('category')
+
+
+def test_catalog_matches_json_catalog():
+    full = PlanCatalog(_index())
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / 'pdf_index.bin'
+        write_binary_index(_index(), path)
+        catalog = BinaryPlanCatalog(path)
+
+        criteria = {'category': 'skin_health', 'region': 'north_indian', 'gender': 'female'}
+        matches = catalog.select(criteria)
+        assert matches == full.select(criteria)
+        assert sum(plan is not None for plan in catalog._records) == len(matches)
+
+        plan = full.plans[5]
+        assert catalog.get(plan['id']) == plan
+        assert catalog.find(plan['relative_path']) == plan
+        assert catalog.find(full.absolute_path(plan)) == plan
+        assert list(catalog.plans) == full.plans
+
+
+if __name__ == "__main__":
+    test_round_trip_is_exact()
+    test_catalog_matches_json_catalog()
+    print("✅ Binary index tests passed")
@@ -0,0 +1,83 @@
+"""
+Test BM25 retrieval and hybrid search in the ML recommender
+Checks the vectorized scores against the BM25 formula, reciprocal-rank fusion,
+and that hybrid search keeps the diet filter without sentence-transformers
+"""
+import sys
+import os
+import math
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import numpy as np
+
+from service.recommender_ml import ml_recommender
+from service.recommender_ml.bm25 import K1, B, BM25Index, reciprocal_rank_fusion
+from service.search_index import SearchIndex
+
+DOCS = [
+    ('a', 'ragi dosa ragi idli'.split()),
+    ('b', 'brown rice dal'.split()),
+    ('c', 'ragi porridge with brown sugar and milk'.split()),
+    ('d', []),
+]
+
+
+def _bm25(query, documents):
+    """Scores by the textbook formula, one document at a time"""
+    average = sum(len(tokens) for _, tokens in documents) / len(documents)
+    scores = []
+    for _, tokens in documents:
+        score = 0.0
+        for term in query:
+            df = sum(term in other for _, other in documents)
+            tf = tokens.count(term)
+            if tf:
+                idf = math.log(1 + (len(documents) - df + 0.5) / (df + 0.5))
+                score += idf * tf * (K1 + 1) / (tf + K1 * (1 - B + B * len(tokens) / average))
+        scores.append(score)
+    return scores
+
+
+def test_scores_match_formula():
+    index = BM25Index.from_documents(DOCS)
+    for query in (['ragi'], ['brown', 'ragi'], ['ragi', 'ragi', 'milk'], ['quinoa'], []):
+        assert np.allclose(index.scores(query), _bm25(query, DOCS))
+
+
+def test_from_search_index_uses_plan_documents():
+    search = SearchIndex()
+    for plan_id, (_, tokens) in enumerate(DOCS):
+        search.add({'plan_id': plan_id * 10, 'kind': 'plan'}, [' '.join(tokens)])
+        search.add({'plan_id': plan_id * 10, 'kind': 'meal'}, ['ragi ragi ragi'])
+    index = BM25Index.from_search_index(search)
+    assert index.keys == [0, 10, 20, 30]
+    assert np.allclose(index.scores(['brown', 'ragi']), _bm25(['brown', 'ragi'], DOCS))
+
+
+def test_reciprocal_rank_fusion():
+    fused = reciprocal_rank_fusion([np.array([2, 0, 1]), np.array([0, 2, 1])], 3, k=1)
+    assert np.allclose(fused, [1 / 3 + 1 / 2, 2 / 4, 1 / 2 + 1 / 3])
+
+
+def test_hybrid_search_without_embeddings():
+    ml_recommender.USE_COLAB = False
+    recommender = ml_recommender.MLRecommender()
+    profile = ml_recommender.UserProfile(
+        gender='female', age=30, height=160, weight=80, bmi_category='obese', activity_level='sedentary',
+        diet_type='vegetarian', region='north_indian', goal='weight_loss_pcos', health_conditions=['pcos'])
+
+    results = recommender.hybrid_search(profile)
+    assert results and all(plan['diet_type'] == 'vegetarian' for plan in results)
+    assert {plan['relative_path'] for plan in results} == {plan['relative_path'] for plan in recommender.keyword_search(profile)}
+    scores = [plan['similarity_score'] for plan in results]
+    assert scores == sorted(scores, reverse=True) and 0 < scores[-1] <= scores[0] <= 1
+    assert results[0]['gender'] == 'female' and results[0]['bm25_score'] > 0
+    assert len(recommender.hybrid_search(profile, top_k=3)) == 3
+
+
+if __name__ == "__main__":
+    test_scores_match_formula()
+    test_from_search_index_uses_plan_documents()
+    test_reciprocal_rank_fusion()
+    test_hybrid_search_without_embeddings()
+    print("✅ BM25 tests passed")
@@ -0,0 +1,68 @@
+"""
+Test the compare endpoint
+Checks that the response has one entry per system whose ids point at the
+merged cards, and that a failing system becomes an error entry, not a 500
+"""
+import sys
+import os
+import tempfile
+from pathlib import Path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from fastapi.testclient import TestClient
+
+import service.api as api
+
+PROFILE = {"gender": "male", "age": 25, "height": 176, "weight": 55, "bmi": 17.8, "activity_level": "sedentary",
+           "diet_type": "vegetarian", "region": "north_indian", "goals": ["ayurvedic_detox"]}
+
+
+def _compare(body=None):
+    client = TestClient(api.app)
+    saved = api.DATA_DIR
+    with tempfile.TemporaryDirectory() as directory:
+        api.DATA_DIR = Path(directory)
+        try:
+            api.save_json_file("profile.json", PROFILE)
+            return client.post("/api/meal-plan/compare", json=body or {})
+        finally:
+            api.DATA_DIR = saved
+
+
+def test_one_entry_per_system():
+    response = _compare()
+    assert response.status_code == 200
+    result = response.json()
+    assert list(result["systems"]) == list(api.COMPARE_SYSTEMS)
+    cards = result["recommendations"]
+    assert result["total_plans"] == len(cards) > 0 and [card["id"] for card in cards] == list(range(len(cards)))
+    for name, summary in result["systems"].items():
+        assert summary["status"] in ("success", "not_available")
+        # Each system's plans are merged cards that list it
+        assert all(name in cards[i]["systems"] for i in summary["ids"]), name
+    assert all(card["systems"] for card in cards)
+    assert len({card["file_path"] for card in cards}) == len(cards)
+
+
+def test_failing_system_degrades_to_error_entry():
+    def fail(profile):
+        raise RuntimeError("goal index unavailable")
+
+    runner = api._COMPARE_RUNNERS["goal"]
+    api._COMPARE_RUNNERS["goal"] = fail
+    try:
+        response = _compare()
+    finally:
+        api._COMPARE_RUNNERS["goal"] = runner
+    assert response.status_code == 200
+    result = response.json()
+    assert set(result["systems"]) == set(api.COMPARE_SYSTEMS)
+    assert result["systems"]["goal"] == {"status": "error", "message": "goal index unavailable", "total_matches": 0}
+    assert all("goal" not in card["systems"] for card in result["recommendations"])
+    assert result["systems"]["exact"]["status"] in ("success", "not_available")
+
+
+if __name__ == "__main__":
+    test_one_entry_per_system()
+    test_failing_system_degrades_to_error_entry()
+    print("✅ Compare tests passed")
@@ -0,0 +1,124 @@
+"""
+Test the coverage lattice and the nearest-available-profile fallback
+Checks the lattice search against brute-force distances to every populated
+cell, the catalogs' cell counts, and the alternatives in not_available results,
+also under relaxation rules passed to the recommender
+"""
+import sys
+import os
+import json
+import math
+import random
+import tempfile
+from pathlib import Path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from pipeline.build_pdf_index import PDFIndexBuilder
+from service.binary_index import write_binary_index
+from service.coverage_lattice import LATTICE_FIELDS, RELAXATION, CoverageLattice
+from service.plan_catalog import BinaryPlanCatalog, ShardedCatalog, load_catalog
+from service.recommender_exact.exact_recommender import ExactMatchRecommender
+
+
+def _distance(criteria, cell):
+    """Sum of the per-field relaxation costs from criteria to cell"""
+    total = 0
+    for field in LATTICE_FIELDS:
+        wanted, value = criteria[field], cell[field]
+        if wanted == value:
+            continue
+        rule = RELAXATION.get(field)
+        if rule is None:
+            return math.inf
+        if 'scale' in rule:
+            scale = rule['scale']
+            if value not in scale:
+                return math.inf
+            total += rule['step'] * (abs(scale.index(wanted) - scale.index(value)) if wanted in scale else 1)
+        elif 'substitutes' in rule:
+            total += rule['cost'] if value in rule['substitutes'].get(wanted, ()) else math.inf
+        else:
+            total += rule['cost']
+    return total
+
+
+def test_nearest_matches_brute_force():
+    recommender = ExactMatchRecommender()
+    lattice = recommender.lattice
+    cells = [dict(zip(LATTICE_FIELDS, cell)) for cell in lattice.counts]
+    rng = random.Random(3)
+    for _ in range(300):
+        criteria = {
+            'category': rng.choice(sorted(set(recommender.GOAL_TO_CATEGORY.values()))),
+            'region': rng.choice(['north_indian', 'south_indian']),
+            'diet_type': rng.choice(['vegetarian', 'non_veg', 'vegan']),
+            'gender': rng.choice(['male', 'female']),
+            'bmi_category': rng.choice(RELAXATION['bmi_category']['scale']),
+            'activity': rng.choice(RELAXATION['activity']['scale'] + ('',)),
+        }
+        found = lattice.nearest(criteria, limit=5)
+        expected = sorted(d for d in (_distance(criteria, cell) for cell in cells) if d <= lattice.max_distance)[:5]
+        assert [distance for distance, _, _ in found] == expected, criteria
+        for distance, cell, count in found:
+            assert _distance(criteria, cell) == distance and lattice.count(cell) == count > 0
+
+
+def test_catalog_cells():
+    full = load_catalog()
+    cells = full.cells(LATTICE_FIELDS)
+    assert sum(cells.values()) == len(full)
+    with tempfile.TemporaryDirectory() as directory:
+        builder = PDFIndexBuilder(output_file=str(Path(directory) / 'pdf_index.json'))
+        builder.save_shards(json.loads(json.dumps(full.index)))
+        path = Path(directory) / 'pdf_index.bin'
+        write_binary_index(full.index, path)
+        assert ShardedCatalog(builder.shard_dir).cells(LATTICE_FIELDS) == cells
+        assert BinaryPlanCatalog(path).cells(LATTICE_FIELDS) == cells
+
+    lattice = CoverageLattice({('a', 'x'): 2, ('a', 'y'): 0}, fields=('category', 'region'))
+    assert len(lattice) == 1
+    assert lattice.nearest({'category': 'a', 'region': 'x'}) == [(0, {'category': 'a', 'region': 'x'}, 2)]
+    assert lattice.nearest({'category': 'b', 'region': 'x'}) == []
+
+
+def test_not_available_offers_alternatives():
+    recommender = ExactMatchRecommender()
+    profile = {'goal': 'gut_detox', 'region': 'north_indian', 'diet_type': 'non_vegetarian', 'gender': 'male',
+               'bmi_category': 'underweight', 'activity_level': 'heavy'}
+    result = recommender.recommend(profile)
+    assert result['status'] == 'not_available'
+    alternatives = result['alternatives']
+    assert alternatives and [alt['distance'] for alt in alternatives] == sorted(alt['distance'] for alt in alternatives)
+    for alt in alternatives:
+        assert len(recommender.exact_match({**alt['criteria'], 'goal': 'gut_detox'})) == alt['total_matches']
+        assert 'goal' not in alt['relaxed']
+        assert set(alt['relaxed']) == {field for field, value in alt['criteria'].items()
+                                       if recommender.match_criteria(profile)[recommender.FACET_FIELDS[field]] != value}
+
+    # Vegans are never offered vegetarian or non-veg plans
+    vegan = {**profile, 'diet_type': 'vegan'}
+    assert all(alt['criteria']['diet_type'] == 'vegan' for alt in recommender.nearest_available(vegan, limit=10))
+    assert recommender.nearest_available({**profile, 'goal': 'not_a_goal'}) == []
+
+
+def test_relaxation_is_configurable():
+    profile = {'goal': 'gut_detox', 'region': 'north_indian', 'diet_type': 'vegetarian', 'gender': 'male',
+               'bmi_category': 'underweight', 'activity_level': 'sedentary'}
+    catalog = load_catalog()
+    default = ExactMatchRecommender(catalog=catalog).nearest_available(profile, limit=100)
+
+    # Only activity and BMI may move, and not as far
+    relaxation = {field: RELAXATION[field] for field in ('activity', 'bmi_category')}
+    strict = ExactMatchRecommender(catalog=catalog, relaxation=relaxation, max_distance=4)
+    alternatives = strict.nearest_available(profile, limit=100)
+    assert alternatives and alternatives == [alt for alt in default if alt['distance'] <= 4 and
+                                             set(alt['relaxed']) <= {'activity_level', 'bmi_category'}]
+    assert len(alternatives) < len(default)
+
+
+if __name__ == "__main__":
+    test_nearest_matches_brute_force()
+    test_catalog_cells()
+    test_not_available_offers_alternatives()
+    test_relaxation_is_configurable()
+    print("✅ Coverage lattice tests passed")
@@ -0,0 +1,54 @@
+"""
+Test the dashboard's conditional GET
+Checks that an unchanged dashboard answers 304 and that its ETag changes after
+a save, even one that keeps the file's size and mtime, and after a reload
+"""
+import sys
+import os
+import tempfile
+from pathlib import Path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from fastapi.testclient import TestClient
+
+import service.api as api
+
+PROFILE = {"gender": "male", "age": 25, "height": 176, "weight": 55, "bmi": 17.8, "activity_level": "sedentary",
+           "diet_type": "vegetarian", "region": "north_indian", "goals": ["ayurvedic_detox"]}
+
+
+def test_not_modified_until_saved():
+    client = TestClient(api.app)
+    saved = api.DATA_DIR
+    with tempfile.TemporaryDirectory() as directory:
+        api.DATA_DIR = Path(directory)
+        try:
+            api.save_json_file("profile.json", PROFILE)
+            first = client.get("/api/dashboard?date=2026-01-05")
+            assert first.status_code == 200 and first.json()["profile"]["age"] == 25
+            etag = first.headers["etag"]
+            cached = client.get("/api/dashboard?date=2026-01-05", headers={"If-None-Match": etag})
+            assert cached.status_code == 304 and cached.content == b""
+            assert client.get("/api/dashboard?date=2026-01-06", headers={"If-None-Match": etag}).status_code == 200
+
+            # Same size, and the mtime put back: only the save count tells them apart
+            path = Path(directory) / "profile.json"
+            stat = path.stat()
+            api.save_json_file("profile.json", {**PROFILE, "age": 26})
+            os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+            assert path.stat().st_size == stat.st_size
+            changed = client.get("/api/dashboard?date=2026-01-05", headers={"If-None-Match": etag})
+            assert changed.status_code == 200 and changed.json()["profile"]["age"] == 26
+            assert changed.headers["etag"] != etag
+
+            # A new corpus snapshot may resolve the day's plan differently
+            etag = changed.headers["etag"]
+            api.corpus.reload()
+            assert client.get("/api/dashboard?date=2026-01-05", headers={"If-None-Match": etag}).status_code == 200
+        finally:
+            api.DATA_DIR = saved
+
+
+if __name__ == "__main__":
+    test_not_modified_until_saved()
+    print("✅ Dashboard tests passed")
@@ -0,0 +1,86 @@
+"""
+Test the meal plan and daily log range endpoints
+Checks offset/limit paging up to MAX_RANGE_PAGE, the 4xx answers to bad dates
+and paging, and that a save is seen even when it keeps the file's size and mtime
+"""
+import sys
+import os
+import tempfile
+from pathlib import Path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from fastapi.testclient import TestClient
+
+import service.api as api
+
+LOGS = [{"date": "2026-01-02", "meals_eaten": {"lunch": True}, "water_intake": 3, "notes": ""},
+        {"date": "2026-01-04", "meals_eaten": {}, "water_intake": 5, "notes": ""}]
+PLANS = [{"date": "2026-01-03", "day_number": 1, "breakfast": {"name": "Poha"}}]
+
+
+def _with_data(test):
+    saved = api.DATA_DIR
+    with tempfile.TemporaryDirectory() as directory:
+        api.DATA_DIR = Path(directory)
+        try:
+            api.save_json_file("daily_logs.json", LOGS)
+            api.save_json_file("meal_plans.json", PLANS)
+            test(TestClient(api.app), Path(directory))
+        finally:
+            api.DATA_DIR = saved
+
+
+def test_paging():
+    def run(client, directory):
+        page = client.get("/api/daily-log/range?from=2026-01-01&to=2026-01-05&offset=1&limit=3").json()
+        assert (page["total"], page["offset"], page["limit"], page["next_offset"]) == (5, 1, 3, 4)
+        assert [day["date"] for day in page["days"]] == ["2026-01-02", "2026-01-03", "2026-01-04"]
+        assert page["days"][0]["water_intake"] == 3 and page["days"][1]["water_intake"] == 0
+
+        last = client.get("/api/daily-log/range?from=2026-01-01&to=2026-01-05&offset=4&limit=3").json()
+        assert [day["date"] for day in last["days"]] == ["2026-01-05"] and last["next_offset"] is None
+        beyond = client.get("/api/daily-log/range?from=2026-01-01&to=2026-01-05&offset=9").json()
+        assert beyond["days"] == [] and beyond["next_offset"] is None
+
+        plans = client.get("/api/meal-plan/range?from=2026-01-02&to=2026-01-03").json()
+        assert [(day["date"], day["plan"] and day["plan"]["day_number"]) for day in plans["days"]] == \
+            [("2026-01-02", None), ("2026-01-03", 1)]
+
+        year = client.get(f"/api/meal-plan/range?from=2026-01-01&to=2026-12-31&limit={api.MAX_RANGE_PAGE}").json()
+        assert year["total"] == 365 and len(year["days"]) == 365 and year["next_offset"] is None
+    _with_data(run)
+
+
+def test_bad_requests():
+    def run(client, directory):
+        for path in ("/api/meal-plan/range", "/api/daily-log/range"):
+            for query in ("from=2026-13-01&to=2026-12-31", "from=2026-01-01&to=tomorrow",
+                          "from=2026-01-05&to=2026-01-01", "from=2026-01-01&to=2026-01-05&offset=-1",
+                          "from=2026-01-01&to=2026-01-05&limit=0",
+                          f"from=2026-01-01&to=2026-01-05&limit={api.MAX_RANGE_PAGE + 1}"):
+                assert client.get(f"{path}?{query}").status_code == 400, (path, query)
+            assert client.get(f"{path}?from=2026-01-01").status_code == 422
+            assert client.get(f"{path}?from=2026-01-01&to=2026-01-05&limit=ten").status_code == 422
+    _with_data(run)
+
+
+def test_save_invalidates_cached_index():
+    def run(client, directory):
+        url = "/api/daily-log/range?from=2026-01-02&to=2026-01-02"
+        assert client.get(url).json()["days"][0]["water_intake"] == 3
+
+        # Same size, and the mtime put back: the cached index must still be dropped
+        path = directory / "daily_logs.json"
+        stat = path.stat()
+        api.save_json_file("daily_logs.json", [{**LOGS[0], "water_intake": 4}, LOGS[1]])
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        assert path.stat().st_size == stat.st_size
+        assert client.get(url).json()["days"][0]["water_intake"] == 4
+    _with_data(run)
+
+
+if __name__ == "__main__":
+    test_paging()
+    test_bad_requests()
+    test_save_invalidates_cached_index()
+    print("✅ Date range tests passed")
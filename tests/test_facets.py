@@ -0,0 +1,106 @@
+"""
+Test bitmap facet counts over the plan catalog
+Checks bitmaps and drill-sideways counts against brute-force scans, that the
+sharded and binary catalogs count like the full one, and the recommender facets
+"""
+import sys
+import os
+import json
+import tempfile
+from pathlib import Path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from pipeline.build_pdf_index import PDFIndexBuilder
+from service.binary_index import write_binary_index
+from service.plan_catalog import (MATCH_FIELDS, BinaryPlanCatalog, ShardedCatalog,
+                                  bitmap_positions, load_catalog, popcount)
+from service.recommender_exact.exact_recommender import ExactMatchRecommender
+
+CRITERIA = [
+    {},
+    {'category': 'skin_health'},
+    {'region': 'south_indian', 'diet_type': 'vegan'},
+    {'gender': 'female', 'bmi_category': 'obese', 'activity': 'sedentary'},
+    {'category': 'gut_detox', 'region': 'east_indian'},
+]
+
+
+def _scan(plans, criteria):
+    return [position for position, plan in enumerate(plans)
+            if all(plan.get(field) == wanted for field, wanted in criteria.items())]
+
+
+def _scan_facets(plans, criteria, fields=MATCH_FIELDS):
+    facets = {}
+    for field in fields:
+        others = {key: value for key, value in criteria.items() if key != field}
+        counts = {}
+        for position in _scan(plans, others):
+            value = plans[position].get(field)
+            if value not in (None, ''):
+                counts[value] = counts.get(value, 0) + 1
+        facets[field] = counts
+    return facets
+
+
+def test_bitmaps_match_scan():
+    assert bitmap_positions(0b101001) == [0, 3, 5] and popcount(0b101001) == 3
+    catalog = load_catalog()
+    for criteria in CRITERIA:
+        positions = _scan(catalog.plans, criteria)
+        assert bitmap_positions(catalog.columns.bitmap(criteria)) == positions, criteria
+        assert catalog.count(criteria) == len(positions)
+        assert catalog.facets(criteria) == _scan_facets(catalog.plans, criteria), criteria
+
+
+def test_catalogs_agree():
+    full = load_catalog()
+    with tempfile.TemporaryDirectory() as directory:
+        builder = PDFIndexBuilder(output_file=str(Path(directory) / 'pdf_index.json'))
+        builder.save_shards(json.loads(json.dumps(full.index)))
+        path = Path(directory) / 'pdf_index.bin'
+        write_binary_index(full.index, path)
+        catalogs = [ShardedCatalog(builder.shard_dir), BinaryPlanCatalog(path)]
+
+        for criteria in CRITERIA:
+            for catalog in catalogs:
+                assert catalog.count(criteria) == full.count(criteria), criteria
+                assert catalog.facets(criteria) == full.facets(criteria), criteria
+                assert catalog.facets(criteria, ('region',)) == full.facets(criteria, ('region',))
+
+
+def test_recommender_facets():
+    recommender = ExactMatchRecommender()
+    recommender.catalog.freeze()
+    profile = {'gender': 'male', 'region': 'north_indian', 'diet_type': 'vegetarian',
+               'bmi_category': 'underweight', 'activity_level': 'sedentary'}
+    result = recommender.facets(profile)
+
+    # Each goal's count is what the exact match would return for it
+    for goal, count in result['facets']['goal'].items():
+        assert count == len(recommender.exact_match({**profile, 'goal': goal})), goal
+    # Goals sharing a category (acne_oily_skin, skin_health) count its plans once in the total
+    by_category = {recommender.GOAL_TO_CATEGORY[goal]: count for goal, count in result['facets']['goal'].items()}
+    assert result['total'] == sum(by_category.values()) > 0
+    assert recommender.facets({**profile, 'goal': 'ayurvedic_detox'})['total'] == \
+        result['facets']['goal'].get('ayurvedic_detox', 0)
+    # A goal typo matches nothing, not the uncategorized plans
+    unknown = recommender.facets({**profile, 'goal': 'skin_helth'})
+    assert unknown['total'] == 0 and unknown['facets']['region'] == {} and unknown['facets']['gender'] == {}
+    assert unknown['facets']['goal'] == result['facets']['goal']
+
+
+def test_builder_counts_categories():
+    metadata = PDFIndexBuilder.empty_metadata()
+    for category in ('gut_detox', 'gut_detox', 'skin_health'):
+        PDFIndexBuilder.count_entry(metadata, {'category': category})
+    PDFIndexBuilder.count_entry(metadata, {'category': 'skin_health'}, delta=-1)
+    assert metadata['by_category'] == metadata['category'] == {'gut_detox': 2}
+
+
+if __name__ == "__main__":
+    test_bitmaps_match_scan()
+    test_catalogs_agree()
+    test_recommender_facets()
+    test_builder_counts_categories()
+    print("✅ Facet tests passed")
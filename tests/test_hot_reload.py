@@ -0,0 +1,86 @@
+"""
+Test corpus snapshots and hot reload
+Checks that reloads wait for the file to settle, that pinned requests keep
+their snapshot and that a replaced snapshot is released once drained
+"""
+import sys
+import os
+import json
+import tempfile
+from pathlib import Path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from service.hot_reload import SnapshotManager
+
+
+def _manager(path):
+    return SnapshotManager(
+        factories={
+            'index': lambda snapshot: json.loads(path.read_text()),
+            'count': lambda snapshot: len(snapshot.get('index')),
+        },
+        watch=[path],
+        interval=0,
+        eager=('index',),
+    )
+
+
+def _write(path, plans, mtime):
+    path.write_text(json.dumps(plans))
+    os.utime(path, ns=(mtime, mtime))
+
+
+def test_reload_after_change_settles():
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / 'index.json'
+        _write(path, ['a'], 1_000_000_000)
+        manager = _manager(path)
+        assert manager.current().get('count') == 1
+        assert not manager.check()
+
+        _write(path, ['a', 'b'], 2_000_000_000)
+        assert not manager.check()  # first sighting: wait one interval
+        assert manager.check()
+        assert manager.current().generation == 2
+        # Components the old snapshot had built are rebuilt eagerly
+        assert 'count' in manager.current().built()
+        assert manager.current().get('count') == 2
+
+
+def test_pinned_snapshot_survives_swap_until_drained():
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / 'index.json'
+        _write(path, ['a'], 1_000_000_000)
+        manager = _manager(path)
+        manager.current()
+
+        with manager.use() as pinned:
+            _write(path, ['a', 'b', 'c'], 2_000_000_000)
+            manager.reload()
+            assert manager.active() is pinned
+            assert manager.active().get('index') == ['a']
+            assert manager.stats()['draining'] == {1: 1}
+
+        assert manager.stats() == {'generation': 2, 'active_requests': 0, 'draining': {}, 'released': 1}
+        assert manager.active().get('index') == ['a', 'b', 'c']
+
+
+def test_failed_build_keeps_current_snapshot():
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / 'index.json'
+        _write(path, ['a'], 1_000_000_000)
+        manager = _manager(path)
+        manager.current()
+
+        path.write_text('{not json')
+        os.utime(path, ns=(2_000_000_000, 2_000_000_000))
+        assert not manager.check() and not manager.check()
+        assert manager.current().get('index') == ['a']
+        assert not manager.check()  # the same broken version is not retried
+
+
+if __name__ == "__main__":
+    test_reload_after_change_settles()
+    test_pinned_snapshot_survives_swap_until_drained()
+    test_failed_build_keeps_current_snapshot()
+    print("✅ Hot reload tests passed")
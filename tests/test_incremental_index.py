@@ -0,0 +1,85 @@
+"""
+Test incremental and parallel index builds
+Checks that a rebuild only processes added or changed files, drops deleted
+ones and ends up with the same plans and counts as a full build, and that a
+process pool writes the same index as a serial run
+"""
+import sys
+import os
+import shutil
+import tempfile
+from pathlib import Path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from pipeline.build_pdf_index import PDFIndexBuilder
+
+RAW_DIR = Path(__file__).parent.parent / 'outputs' / 'raw'
+
+
+def _copy_raw(directory, count=12):
+    raw = Path(directory) / 'raw'
+    for source in sorted(RAW_DIR.rglob('*.txt'))[:count]:
+        target = raw / source.relative_to(RAW_DIR)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copy2(source, target)
+    return raw
+
+
+def _plans(index):
+    return [{k: v for k, v in plan.items() if k != 'id'} for plan in index['plans']]
+
+
+def test_incremental_rebuild_matches_full_build():
+    with tempfile.TemporaryDirectory() as directory:
+        raw = _copy_raw(directory)
+        output = Path(directory) / 'pdf_index.json'
+        PDFIndexBuilder(str(raw), str(output)).run()
+        assert output.with_name('pdf_index.manifest.json').exists()
+
+        builder = PDFIndexBuilder(str(raw), str(output))
+        builder.build_index()
+        assert builder.stats == {'added': 0, 'changed': 0, 'removed': 0, 'unchanged': 12}
+
+        files = sorted(raw.rglob('*.txt'))
+        files[0].write_text(files[0].read_text(encoding='utf-8') + '\nDinner (8:00 pm) paneer\n', encoding='utf-8')
+        shutil.copy(files[1], files[1].with_name('added_plan.txt'))
+        files[2].unlink()
+        os.utime(files[3])  # touched but not changed: matched by hash
+
+        builder = PDFIndexBuilder(str(raw), str(output))
+        index = builder.build_index()
+        assert builder.stats == {'added': 1, 'changed': 1, 'removed': 1, 'unchanged': 10}
+
+        full = PDFIndexBuilder(str(raw), str(Path(directory) / 'full.json')).build_index(incremental=False)
+        assert _plans(index) == _plans(full)
+        assert index['metadata'] == full['metadata']
+
+
+def test_ids_are_kept_across_rebuilds():
+    with tempfile.TemporaryDirectory() as directory:
+        raw = _copy_raw(directory, count=4)
+        output = Path(directory) / 'pdf_index.json'
+        PDFIndexBuilder(str(raw), str(output)).run()
+        first = {p['relative_path']: p['id'] for p in PDFIndexBuilder(str(raw), str(output)).load_previous_index()['plans']}
+
+        sorted(raw.rglob('*.txt'))[0].unlink()
+        PDFIndexBuilder(str(raw), str(output)).run(incremental=False)
+        second = {p['relative_path']: p['id'] for p in PDFIndexBuilder(str(raw), str(output)).load_previous_index()['plans']}
+        assert all(first[path] == plan_id for path, plan_id in second.items())
+
+
+def test_parallel_build_is_byte_identical():
+    with tempfile.TemporaryDirectory() as directory:
+        raw = _copy_raw(directory, count=40)
+        serial = Path(directory) / 'serial.json'
+        parallel = Path(directory) / 'parallel.json'
+        PDFIndexBuilder(str(raw), str(serial), workers=1).run()
+        PDFIndexBuilder(str(raw), str(parallel), workers=3).run()
+        assert serial.read_bytes() == parallel.read_bytes()
+
+
+if __name__ == "__main__":
+    test_incremental_rebuild_matches_full_build()
+    test_ids_are_kept_across_rebuilds()
+    test_parallel_build_is_byte_identical()
+    print("✅ Incremental index tests passed")
@@ -0,0 +1,76 @@
+"""
+Test the single-pass index extraction
+Checks the keyword automaton against plain substring scans, and the combined
+field scan against one re.search per field, with patterns sharing a prefix
+kept longest first
+"""
+import sys
+import os
+import re
+import random
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from pipeline.keyword_automaton import KeywordAutomaton
+from pipeline.build_pdf_index import PDFIndexBuilder, CONTENT_PATTERNS, MEAL_TIMES
+
+
+def test_automaton_matches_substring_scans():
+    rng = random.Random(7)
+    for _ in range(500):
+        keywords = [''.join(rng.choice('ab ') for _ in range(rng.randint(1, 4))) for _ in range(6)]
+        automaton = KeywordAutomaton(keywords)
+        for _ in range(3):
+            text = ''.join(rng.choice('abc ') for _ in range(30))
+            assert automaton.find(text) == [k for k in automaton.keywords if k in text]
+
+
+def test_automaton_keeps_vocabulary_order():
+    automaton = KeywordAutomaton(['milk', 'butter', 'buttermilk', 'egg', 'oil'])
+    assert automaton.find('boiled eggplant with buttermilk') == ['milk', 'butter', 'buttermilk', 'egg', 'oil']
+    assert automaton.find('') == []
+
+
+def test_scan_matches_separate_searches():
+    builder = PDFIndexBuilder.__new__(PDFIndexBuilder)
+    texts = [
+        "PRE-BREAKFAST (7 AM) then Breakfast: 8:30am. Age: 30 years, later age 20-30 years",
+        "Evening snack 5pm, evening: 6 PM, Post-Dinner 9pm, Dinner (8pm)",
+        "Calories: 1400-1600 kcal, Protein 60-70 g, Fat: 40 – 50g, Fiber 25-30g",
+        "İstanbul plan. Lunch 1 PM, carbohydrates 150-200 g",
+    ]
+    for text in texts:
+        found = builder.scan_content(text)
+        for name, pattern in CONTENT_PATTERNS:
+            match = re.search(pattern, text, re.IGNORECASE)
+            assert found.get(name) == (match.groups() if match else None), (name, text)
+
+
+def test_overlapping_patterns_longest_first():
+    # Patterns sharing a prefix must stay ahead of the shorter one in the alternation
+    names = [name for name, _ in CONTENT_PATTERNS]
+    assert names.index('age_range') < names.index('age')
+    for i, meal_time in enumerate(MEAL_TIMES):
+        assert not any(longer.startswith(meal_time) for longer in MEAL_TIMES[i + 1:]), meal_time
+
+    builder = PDFIndexBuilder.__new__(PDFIndexBuilder)
+    texts = [
+        "Age: 25-30 years",
+        "age 25 - 30 years, then age 40 years",
+        "Evening snack: 4:30 pm",
+        "EVENING SNACK (5 PM) and evening 7pm",
+    ]
+    for text in texts:
+        found = builder.scan_content(text)
+        for name, pattern in CONTENT_PATTERNS:
+            match = re.search(pattern, text, re.IGNORECASE)
+            assert found.get(name) == (match.groups() if match else None), (name, text)
+    assert builder.scan_content(texts[0]) == {'age_range': ('25', '30')}
+    assert builder.scan_content(texts[2]) == {f'meal_{MEAL_TIMES.index("evening snack")}': ('4:30 pm',)}
+
+
+if __name__ == "__main__":
+    test_automaton_matches_substring_scans()
+    test_automaton_keeps_vocabulary_order()
+    test_scan_matches_separate_searches()
+    test_overlapping_patterns_longest_first()
+    print("✅ Single-pass extraction tests passed")
@@ -0,0 +1,58 @@
+"""
+Test queue-based logging
+Checks structured fields, per-module levels, debug sampling and that
+exceptions survive the trip through the queue
+"""
+import sys
+import os
+import io
+import json
+import logging
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from service.logging_config import configure_logging, shutdown_logging, parse_module_levels
+
+
+def _records(**options):
+    stream = io.StringIO()
+    configure_logging(fmt="json", stream=stream, **options)
+    return stream
+
+
+def test_parse_module_levels():
+    assert parse_module_levels("a=debug, b.c=WARNING,bad,=INFO") == {'a': 'DEBUG', 'b.c': 'WARNING'}
+
+
+def test_structured_json_and_module_levels():
+    stream = _records(level="WARNING", module_levels={'tests.verbose': 'DEBUG'}, debug_sample=1)
+    logging.getLogger('tests.quiet').info("dropped")
+    logging.getLogger('tests.verbose').debug("found %d plans", 3, extra={'category': 'gut_detox'})
+    try:
+        raise ValueError("bad pdf")
+    except ValueError:
+        logging.getLogger('tests.quiet').exception("parse failed for %s", "a.pdf")
+    shutdown_logging()
+
+    records = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert [r['msg'] for r in records] == ["found 3 plans", "parse failed for a.pdf"]
+    assert records[0]['category'] == 'gut_detox'
+    assert 'ValueError: bad pdf' in records[1]['exc']
+
+
+def test_debug_sampling():
+    stream = _records(level="DEBUG", module_levels={}, debug_sample=4)
+    logger = logging.getLogger('tests.sampled')
+    for i in range(8):
+        logger.debug("line %d", i)
+    logger.warning("always kept")
+    shutdown_logging()
+
+    messages = [json.loads(line)['msg'] for line in stream.getvalue().splitlines()]
+    assert messages == ["line 0", "line 4", "always kept"]
+
+
+if __name__ == "__main__":
+    test_parse_module_levels()
+    test_structured_json_and_module_levels()
+    test_debug_sampling()
+    print("✅ Logging tests passed")
@@ -0,0 +1,75 @@
+"""
+Test on-demand meal schedule
+Checks that computing days from the stored selection gives the same plans as
+the materialized generate_multi_plan_cycle rotation
+"""
+import sys
+import os
+import copy
+import json
+from datetime import datetime, timedelta
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from service.pdf_recommender import PDFRecommender
+from service.meal_schedule import MealScheduleResolver, new_schedule, day_offset
+
+
+def _selected_plans(recommender, count=3):
+    return [p for p in recommender.index['plans'] if p.get('category') == 'ayurvedic_detox'][:count]
+
+
+def test_schedule_matches_materialized_cycle():
+    recommender = PDFRecommender()
+    selected = _selected_plans(recommender)
+
+    cycle = recommender.generate_multi_plan_cycle(selected, days=14)
+    schedule = new_schedule(selected, datetime.now().strftime("%Y-%m-%d"), 14)
+    resolver = MealScheduleResolver(recommender)
+
+    for day in cycle:
+        assert resolver.plan_for_date(schedule, day['date']) == day
+
+
+def test_schedule_horizon_and_overrides():
+    recommender = PDFRecommender()
+    start = datetime(2025, 1, 1)
+    schedule = new_schedule(_selected_plans(recommender), start.strftime("%Y-%m-%d"), 90)
+    resolver = MealScheduleResolver(recommender)
+
+    last = (start + timedelta(days=89)).strftime("%Y-%m-%d")
+    after = (start + timedelta(days=90)).strftime("%Y-%m-%d")
+    assert day_offset(schedule, last) == 89
+    assert resolver.plan_for_date(schedule, last)['day'] == 90
+    assert resolver.plan_for_date(schedule, after) is None
+
+    schedule['overrides']['2025-01-02'] = {'lunch': {'name': 'Swapped'}, 'is_adjusted': True}
+    assert resolver.plan_for_date(schedule, '2025-01-02')['lunch']['name'] == 'Swapped'
+    # Cached days are not affected by overrides
+    schedule['overrides'] = {}
+    assert resolver.plan_for_date(schedule, '2025-01-02')['lunch']['name'] != 'Swapped'
+
+    # Only ids are persisted for PDF plans, and they are the catalog's integer ids
+    assert all(set(entry) == {'plan_id', 'file_path'} for entry in schedule['selection'])
+    assert all(isinstance(entry['plan_id'], int) for entry in schedule['selection'])
+    assert resolver.plan_for_date(schedule, last)['plan_id'] == schedule['selection'][89 % 3]['plan_id']
+    print(json.dumps(schedule['selection'][0], indent=2))
+
+
+def test_schedule_saved_with_paths():
+    recommender = PDFRecommender()
+    selected = _selected_plans(recommender)
+    schedule = new_schedule(selected, "2025-01-01", 7)
+    legacy = copy.deepcopy(schedule)
+    # Schedules stored before plans had ids hold the relative path
+    for entry, plan in zip(legacy['selection'], selected):
+        entry['plan_id'] = plan['relative_path']
+
+    assert MealScheduleResolver(recommender).plan_for_date(legacy, "2025-01-03") == \
+        MealScheduleResolver(recommender).plan_for_date(schedule, "2025-01-03")
+
+
+if __name__ == "__main__":
+    test_schedule_matches_materialized_cycle()
+    test_schedule_horizon_and_overrides()
+    test_schedule_saved_with_paths()
+    print("✅ Meal schedule tests passed")
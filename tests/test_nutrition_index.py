@@ -0,0 +1,132 @@
+"""
+Test nutrition and age range queries and calorie-target ranking
+Checks the interval tree and the plan index against brute-force scans, the
+Mifflin-St Jeor targets, that recommendations are ranked (not shuffled) and
+that inverted ranges match nothing (and are rejected by the API), and that the
+API ranks range matches against the calorie/protein targets
+"""
+import sys
+import os
+import json
+import random
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from service.nutrition_index import (IntervalTree, NutritionIndex, daily_targets, plan_band, rank_by_targets,
+                                     target_distance)
+from service.pdf_recommender import PDFRecommender, UserProfile
+from service.plan_catalog import DEFAULT_INDEX_PATH, PlanCatalog
+
+
+def _catalog():
+    with open(DEFAULT_INDEX_PATH, 'r', encoding='utf-8') as f:
+        return PlanCatalog(json.load(f))
+
+
+def test_interval_tree_matches_scan():
+    rng = random.Random(7)
+    intervals = []
+    for key in range(300):
+        start = rng.randint(0, 100)
+        intervals.append((start, start + rng.randint(0, 20), key))
+    tree = IntervalTree(intervals)
+    for _ in range(200):
+        low = rng.randint(-5, 125)
+        high = low + rng.randint(0, 15)
+        assert sorted(tree.overlap(low, high)) == [k for s, e, k in intervals if s <= high and e >= low]
+        assert sorted(tree.stab(low)) == [k for s, e, k in intervals if s <= low <= e]
+    assert IntervalTree([]).overlap(0, 10) == []
+    assert tree.stab(60) and tree.overlap(60, 40) == []  # inverted: empty, not a stab at 60
+
+
+def test_index_query_matches_scan():
+    catalog = _catalog()
+    index = NutritionIndex(catalog)
+
+    def scan(bands):
+        matches = []
+        for plan in catalog:
+            for band, (low, high) in bands.items():
+                bounds = plan_band(plan, band)
+                if bounds is None or (low is not None and bounds[1] < low) or (high is not None and bounds[0] > high):
+                    break
+            else:
+                matches.append(plan['id'])
+        return matches
+
+    for bands in ({'calories': (1800, 2000), 'age': (34, 34)},
+                  {'protein': (None, 60)},
+                  {'calories': (2500, None), 'fiber': (30, 35), 'age': (20, 25)},
+                  {'age': (200, 200)},
+                  {}):
+        assert index.query(bands) == scan(bands), bands
+    assert index.query({'calories': (2000, 1800)}) == []
+
+
+def test_query_endpoint_rejects_inverted_range():
+    from fastapi.testclient import TestClient
+    import service.api as api
+
+    client = TestClient(api.app)
+    assert client.get('/api/plans/query?calories_min=1800&calories_max=2000').status_code == 200
+    assert client.get('/api/plans/query?calories_min=1800&calories_max=1800').status_code == 200
+    inverted = client.get('/api/plans/query?calories_min=2000&calories_max=1800')
+    assert inverted.status_code == 422 and 'calories_min' in inverted.json()['detail']
+    assert client.get('/api/plans/query?protein_min=abc').status_code == 422
+
+
+def test_query_endpoint_ranks_by_targets():
+    from fastapi.testclient import TestClient
+    import service.api as api
+
+    client = TestClient(api.app)
+    catalog = _catalog()
+    ranked = client.get('/api/plans/query?calories_min=1600&calories_max=2200&target_calories=2100&limit=5').json()
+    matches = [catalog.get(plan_id) for plan_id in NutritionIndex(catalog).query({'calories': (1600, 2200)})]
+    assert ranked['targets'] == {'calories': 2100}
+    assert [r['plan_id'] for r in ranked['results']] == \
+        [plan['id'] for plan in rank_by_targets(matches, {'calories': 2100})[:5]]
+
+    # Without a target, a closed range ranks around its midpoint
+    midpoint = client.get('/api/plans/query?calories_min=1600&calories_max=2200&protein_min=50&protein_max=70').json()
+    assert midpoint['targets'] == {'calories': 1900, 'protein': 60}
+    distances = [target_distance(catalog.get(r['plan_id']), midpoint['targets']) for r in midpoint['results']]
+    assert distances == sorted(distances)
+    unranked = client.get('/api/plans/query?calories_min=1600').json()
+    assert unranked['targets'] == {} and [r['plan_id'] for r in unranked['results']] == \
+        NutritionIndex(catalog).query({'calories': (1600, None)})[:50]
+
+
+def test_daily_targets():
+    # BMR 10*70 + 6.25*175 - 5*30 + 5 = 1648.75, x1.55 moderate
+    assert daily_targets('male', 30, 175, 70, 'moderate') == {'calories': 2556, 'protein': 70}
+    female_loss = daily_targets('female', '30', '160', '80', 'sedentary', 'weight_loss_pcos')
+    assert female_loss == {'calories': round((800 + 1000 - 150 - 161) * 1.2 - 500), 'protein': 96}
+    assert daily_targets('male', None, 175, 70, 'light') is None
+
+
+def test_recommendations_ranked_by_targets():
+    plans = [
+        {'id': 0, 'nutrition': {'calories_min': 2500, 'calories_max': 2700, 'protein_min': 60, 'protein_max': 70}},
+        {'id': 1, 'nutrition': {}},
+        {'id': 2, 'nutrition': {'calories_min': 1800, 'calories_max': 2000, 'protein_min': 60, 'protein_max': 70}},
+        {'id': 3, 'nutrition': {'calories_min': 1900, 'calories_max': 2100, 'protein_min': 40, 'protein_max': 50}},
+    ]
+    ranked = rank_by_targets(plans, {'calories': 1950, 'protein': 65})
+    assert [plan['id'] for plan in ranked] == [2, 3, 0, 1]
+
+    recommender = PDFRecommender(catalog=_catalog())
+    user = UserProfile(gender='male', age=30, height=175, weight=95, bmi_category='obese', activity_level='heavy',
+                       diet_type='vegetarian', region='south_indian', goal='protein_rich_balanced')
+    first = recommender.recommend(user)
+    assert first and first == recommender.recommend(user)
+    assert first == rank_by_targets(first, recommender.daily_targets(user))
+
+
+if __name__ == "__main__":
+    test_interval_tree_matches_scan()
+    test_index_query_matches_scan()
+    test_query_endpoint_rejects_inverted_range()
+    test_query_endpoint_ranks_by_targets()
+    test_daily_targets()
+    test_recommendations_ranked_by_targets()
+    print("✅ Nutrition index tests passed")
@@ -0,0 +1,52 @@
+"""
+Test the shared PDF parse cache
+Checks that repeated parses are served from the cache and that editing the
+file invalidates its entry
+"""
+import sys
+import os
+import shutil
+import tempfile
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from service.pdf_parser import CompletePDFParser, ParseCache
+from service.pdf_recommender import PDFRecommender
+
+
+def _plan_copy(directory):
+    plan = PDFRecommender().index['plans'][0]
+    source = os.path.join('outputs', 'raw', plan['relative_path'].replace('\\', '/'))
+    target = os.path.join(directory, 'plan.txt')
+    shutil.copy(source, target)
+    return target
+
+
+def test_parse_cache_hits_and_invalidates():
+    parser = CompletePDFParser()
+    cache = ParseCache(max_entries=2)
+    with tempfile.TemporaryDirectory() as directory:
+        path = _plan_copy(directory)
+
+        first = cache.get(path, parser)
+        assert first == parser.parse_complete_pdf(path)
+        assert cache.get(path, parser) is first
+        assert (cache.hits, cache.misses) == (1, 1)
+
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write('\n')
+        os.utime(path, ns=(0, 0))
+        assert cache.get(path, parser) is not first
+        assert cache.misses == 2
+
+
+def test_parse_cache_skips_errors():
+    cache = ParseCache()
+    result = cache.get('does/not/exist.txt', CompletePDFParser())
+    assert 'error' in result
+    assert 'does/not/exist.txt' not in cache
+
+
+if __name__ == "__main__":
+    test_parse_cache_hits_and_invalidates()
+    test_parse_cache_skips_errors()
+    print("✅ Parse cache tests passed")
@@ -0,0 +1,93 @@
+"""
+Test the pre-encoded recommendation cards
+Checks that a card spliced from its cached blob is byte for byte the encoded
+build_plan_card, that cards from a failed parse are not cached, and that
+Accept: application/x-ndjson streams the same cards one per line
+"""
+import sys
+import os
+import json
+import tempfile
+from pathlib import Path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from fastapi.testclient import TestClient
+
+import service.api as api
+
+PROFILE = {"gender": "male", "age": 25, "height": 176, "weight": 55, "bmi": 17.8, "activity_level": "sedentary",
+           "diet_type": "vegetarian", "region": "north_indian", "goals": ["ayurvedic_detox"]}
+
+
+def _plans(n=3):
+    plans = [dict(plan) for plan in api.corpus.current().get("catalog").plans[:n]]
+    for i, plan in enumerate(plans):
+        plan['recommendation_score'] = 87.25 - i
+    return plans
+
+
+def test_spliced_cards_match_built_cards():
+    plans = _plans()
+    for extract_meals in (api._extract_card_meals_simple, api._extract_card_meals_complete):
+        for include_score in (False, True):
+            for _ in range(2):  # built, then from the cache
+                cards = list(api._iter_cards(plans, extract_meals, include_score=include_score))
+                for i, (plan, card) in enumerate(zip(plans, cards)):
+                    built = api.build_plan_card(i, plan, extract_meals(plan), include_score=include_score)
+                    assert card == json.dumps(built, separators=(",", ":")).encode("utf-8")
+                    assert ('score' in json.loads(card)) == include_score
+
+
+def test_failed_parse_is_not_cached():
+    plan = _plans(1)[0]
+    card_blobs = api.corpus.current().get("card_blobs")
+    key = (api._extract_card_meals_complete.__name__, plan['file_path'])
+    card_blobs.pop(key, None)
+
+    def fail(path):
+        raise OSError("transient")
+
+    parse = api.parse_pdf_complete
+    api.parse_pdf_complete = fail
+    try:
+        fallback = api._card_blob(plan, api._extract_card_meals_complete)
+    finally:
+        api.parse_pdf_complete = parse
+    assert key not in card_blobs
+    assert json.loads(b"{" + fallback + b"}")["meals"] == api._extract_card_meals_simple(plan)
+
+    parsed = api._card_blob(plan, api._extract_card_meals_complete)
+    assert card_blobs[key] == parsed
+
+
+def test_ndjson_streams_one_card_per_line():
+    client = TestClient(api.app)
+    saved = api.DATA_DIR
+    with tempfile.TemporaryDirectory() as directory:
+        api.DATA_DIR = Path(directory)
+        try:
+            api.save_json_file("profile.json", PROFILE)
+            for path in ("/api/meal-plan/generate", "/api/meal-plan/generate-exact", "/api/meal-plan/generate-goal"):
+                default = client.post(path, json={})
+                assert default.status_code == 200 and default.headers["content-type"] == "application/json"
+                body = default.json()
+                assert body["status"] == "success" and body["recommendations"], path
+
+                streamed = client.post(path, json={}, headers={"Accept": "application/x-ndjson"})
+                assert streamed.headers["content-type"].startswith("application/x-ndjson")
+                lines = [json.loads(line) for line in streamed.text.splitlines()]
+                summary, cards, done = lines[0], lines[1:-1], lines[-1]
+                assert summary["event"] == "summary" and summary["status"] == "success"
+                assert {key for key in summary if key != "event"} == set(body) - {"recommendations"}
+                assert all(line["event"] == "card" for line in cards)
+                assert [line["card"] for line in cards] == body["recommendations"]
+                assert done == {"event": "done", "count": len(cards)}
+        finally:
+            api.DATA_DIR = saved
+
+
+if __name__ == "__main__":
+    test_spliced_cards_match_built_cards()
+    test_failed_parse_is_not_cached()
+    test_ndjson_streams_one_card_per_line()
+    print("✅ Plan card tests passed")
@@ -0,0 +1,145 @@
+"""
+Test the plan catalog
+Checks id backfilling and path lookups for an index built on Windows, and
+that a category-sharded index answers like the full one (counts, facets and
+the nutrition index from its manifest, without loading a shard), and that every
+catalog format knows the sha256 of the JSON index it came from
+"""
+import sys
+import os
+import json
+import hashlib
+import tempfile
+from pathlib import Path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from service.nutrition_index import NutritionIndex
+from service.plan_catalog import SHARD_MANIFEST_NAME, PlanCatalog, ShardedCatalog, load_catalog
+from service.recommender_exact.exact_recommender import ExactMatchRecommender
+from pipeline.build_pdf_index import PDFIndexBuilder
+
+
+def _windows_index():
+    return {
+        'metadata': {'total_plans': 3},
+        'plans': [
+            {'file_path': 'outputs\\raw\\2\\b.txt', 'relative_path': '2\\b.txt'},
+            {'file_path': 'outputs\\raw\\1\\a.txt', 'relative_path': '1\\a.txt'},
+            {'id': 7, 'file_path': 'outputs/raw/3/c.txt', 'relative_path': '3/c.txt'},
+        ],
+    }
+
+
+def test_ids_backfilled_in_path_order():
+    catalog = PlanCatalog(_windows_index(), base_dir='/srv/app')
+    assert catalog.get(7)['relative_path'] == '3/c.txt'
+    assert catalog.get(8)['relative_path'] == '1/a.txt'
+    assert catalog.get(9)['relative_path'] == '2/b.txt'
+
+
+def test_lookup_by_any_path():
+    catalog = PlanCatalog(_windows_index(), base_dir='/srv/app')
+    plan = catalog.get(8)
+    assert catalog.find('1/a.txt') is plan
+    assert catalog.find('1\\a.txt') is plan
+    assert catalog.find('outputs\\raw\\1\\a.txt') is plan
+    assert catalog.find('/srv/app/outputs/raw/1/a.txt') is plan
+    assert catalog.absolute_path(plan) == '/srv/app/outputs/raw/1/a.txt'
+    assert catalog.find('missing.txt') is None
+
+
+def test_select_on_columns():
+    index = _windows_index()
+    for plan, (region, diet) in zip(index['plans'], [('north_indian', 'Veg'), ('north_indian', None), ('south_indian', 'vegan')]):
+        plan.update(category='gut_detox', region=region, diet_type=diet)
+    catalog = PlanCatalog(index)
+    catalog.freeze()
+
+    veg = catalog.select({'region': 'north_indian', 'diet_type': 'veg'},
+                         normalize={'diet_type': lambda v: (v or 'veg').lower()})
+    assert [plan['id'] for plan in veg] == [9, 8]
+    assert catalog.select({'category': 'gut_detox', 'region': 'east_indian'}) == []
+    assert len(catalog.select({})) == 3
+
+
+def test_sharded_catalog_matches_full_catalog():
+    full = load_catalog()
+    with tempfile.TemporaryDirectory() as directory:
+        builder = PDFIndexBuilder(output_file=str(Path(directory) / 'pdf_index.json'))
+        builder.save_shards(json.loads(json.dumps(full.index)))
+        sharded = ShardedCatalog(builder.shard_dir, budget_bytes=1)
+
+        assert len(sharded) == len(full)
+        criteria = {'category': 'skin_health', 'region': 'north_indian'}
+        assert sharded.select(criteria) == full.select(criteria)
+        assert sharded.loaded() == ['skin_health']
+
+        # Over budget: the previous shard is evicted when the next one loads
+        plan = full.select({'category': 'gut_detox'})[0]
+        assert sharded.get(plan['id']) == plan
+        assert sharded.loaded() == ['gut_detox'] and sharded.evictions == 1
+        assert sharded.find(plan['relative_path']) == plan
+
+        assert sharded.select({'region': 'south_indian'}) == full.select({'region': 'south_indian'})
+        assert sharded.plans == full.plans
+        # The assembled list is reused: per-hit index['plans'][i] reads load nothing more
+        loads = sharded.loads
+        assert sharded.index['plans'] is sharded.plans and sharded.index['plans'][7] == full.plans[7]
+        assert list(sharded) == full.plans and sharded.loads == loads
+        assert sharded.get(10 ** 6) is None
+
+
+def test_sharded_summaries_load_no_shard():
+    full = load_catalog()
+    profile = {'gender': 'female', 'region': 'south_indian', 'diet_type': 'vegetarian', 'bmi_category': 'obese'}
+    bands = {'calories': (1800, 2000), 'age': (34, 34)}
+    with tempfile.TemporaryDirectory() as directory:
+        builder = PDFIndexBuilder(output_file=str(Path(directory) / 'pdf_index.json'))
+        builder.save_shards(json.loads(json.dumps(full.index)))
+        sharded = ShardedCatalog(builder.shard_dir)
+
+        recommender = ExactMatchRecommender(catalog=sharded)
+        nutrition = NutritionIndex.from_catalog(sharded)
+        facets = recommender.facets(profile)
+        assert sharded.loaded() == [] and sharded.loads == 0
+
+        assert facets == ExactMatchRecommender(catalog=full).facets(profile)
+        assert nutrition.query(bands) == NutritionIndex(full).query(bands)
+        assert sharded.count({'category': 'skin_health', 'region': 'north_indian'}) == \
+            len(full.select({'category': 'skin_health', 'region': 'north_indian'}))
+
+        # A manifest without the summaries still answers, by reading the shards
+        manifest_path = builder.shard_dir / SHARD_MANIFEST_NAME
+        manifest = json.loads(manifest_path.read_text(encoding='utf-8'))
+        for shard in manifest['shards'].values():
+            del shard['cells'], shard['bands']
+        manifest_path.write_text(json.dumps(manifest), encoding='utf-8')
+        old = ShardedCatalog(builder.shard_dir)
+        assert old.summary is None and old.plan_bands() is None
+        assert ExactMatchRecommender(catalog=old).facets(profile) == facets
+        assert NutritionIndex.from_catalog(old).query(bands) == nutrition.query(bands)
+
+
+def test_catalogs_know_their_json_index():
+    full = load_catalog()
+    with tempfile.TemporaryDirectory() as directory:
+        builder = PDFIndexBuilder(output_file=str(Path(directory) / 'pdf_index.json'), shards=True)
+        index = json.loads(json.dumps(full.index))
+        builder.save_index(index)
+        builder.save_shards(index)
+        index_sha256 = hashlib.sha256(builder.output_file.read_bytes()).hexdigest()
+
+        assert builder.index_sha256 == index_sha256
+        for path in (builder.output_file, builder.output_file.with_suffix('.bin'), builder.shard_dir):
+            assert load_catalog(path).index_sha256 == index_sha256, path
+    assert PlanCatalog(_windows_index()).index_sha256 is None
+
+
+if __name__ == "__main__":
+    test_ids_backfilled_in_path_order()
+    test_lookup_by_any_path()
+    test_select_on_columns()
+    test_sharded_catalog_matches_full_catalog()
+    test_sharded_summaries_load_no_shard()
+    test_catalogs_know_their_json_index()
+    print("✅ Plan catalog tests passed")
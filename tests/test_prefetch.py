@@ -0,0 +1,54 @@
+"""
+Test speculative parse prefetching
+"""
+import sys
+import os
+import threading
+import time
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from service.prefetch import ParsePrefetcher
+
+
+def _wait_idle(prefetcher, timeout=2.0):
+    deadline = time.time() + timeout
+    while prefetcher.pending() and time.time() < deadline:
+        time.sleep(0.01)
+    time.sleep(0.05)
+
+
+def test_prefetch_loads_uncached_paths():
+    loaded = []
+    prefetcher = ParsePrefetcher(loaded.append, is_cached=lambda p: p == 'cached', delay=0)
+    prefetcher.schedule(['a', 'cached', 'b', 'a'])
+    _wait_idle(prefetcher)
+    assert loaded == ['a', 'b']
+
+
+def test_cancel_and_urgent_ordering():
+    gate = threading.Event()
+    loaded = []
+
+    def load(path):
+        gate.wait()
+        loaded.append(path)
+
+    prefetcher = ParsePrefetcher(load, delay=0, max_pending=3)
+    prefetcher.schedule(['first'])
+    time.sleep(0.05)  # worker is now blocked on 'first'
+
+    speculative = prefetcher.schedule(['s1', 's2', 's3'])
+    prefetcher.schedule(['chosen'], urgent=True)
+    # Bounded: the oldest speculative entry was dropped
+    assert prefetcher.dropped == 1
+    speculative.cancel()
+
+    gate.set()
+    _wait_idle(prefetcher)
+    assert loaded == ['first', 'chosen']
+
+
+if __name__ == "__main__":
+    test_prefetch_loads_uncached_paths()
+    test_cancel_and_urgent_ordering()
+    print("✅ Prefetch tests passed")
@@ -0,0 +1,37 @@
+"""
+Test server-held recommendation result sets
+"""
+import sys
+import os
+import time
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from service.result_store import ResultSetStore
+
+
+def test_resolve_by_card_id():
+    store = ResultSetStore()
+    plans = [{'relative_path': f'plan-{i}.txt'} for i in range(5)]
+    token = store.put(plans)
+
+    assert store.resolve(token, [3, 0]) == [plans[3], plans[0]]
+    # Out-of-range ids are ignored
+    assert store.resolve(token, [7, -1, 1]) == [plans[1]]
+    assert store.resolve('unknown', [0]) is None
+
+
+def test_expiry_and_bound():
+    store = ResultSetStore(ttl=0.05, max_sets=2)
+    first = store.put([{'id': 1}])
+    time.sleep(0.1)
+    assert store.get(first) is None
+
+    tokens = [store.put([{'id': i}]) for i in range(3)]
+    assert store.get(tokens[0]) is None
+    assert store.get(tokens[2]) == [{'id': 2}]
+
+
+if __name__ == "__main__":
+    test_resolve_by_card_id()
+    test_expiry_and_bound()
+    print("✅ Result store tests passed")
@@ -0,0 +1,77 @@
+"""
+Test the full-text search index
+Checks word, phrase and prefix queries, the plan/meal filter, that phrases
+don't span fields, and that a saved index loads back and can be filtered
+"""
+import sys
+import os
+import tempfile
+from pathlib import Path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from service.search_index import SearchIndex, plan_documents
+
+PLANS = [
+    ({'id': 0, 'relative_path': 'a.txt', 'filename': 'pcos plan', 'category': 'weight_loss_pcos'},
+     'Breakfast: ragi dosa with brown rice idli',
+     {'title': 'PCOS diet', 'meals': [{'meal_type': 'Breakfast', 'options': [
+         {'name': 'Ragi Dosa', 'ingredients': 'ragi flour, curd', 'method': 'ferment overnight'},
+         {'name': 'Moong Dal Chilla', 'ingredients': 'moong dal, onion', 'method': 'grind and cook'}]}]}),
+    ({'id': 1, 'relative_path': 'b.txt', 'filename': 'detox plan', 'category': 'ayurvedic_detox'},
+     'Lunch: brown bread, rice with dal', None),
+]
+
+
+def _index():
+    index = SearchIndex()
+    for plan, text, parsed in PLANS:
+        for info, fields in plan_documents(plan, text, parsed):
+            index.add(info, fields)
+    return index
+
+
+def _ids(result):
+    return [(hit['plan_id'], hit['kind']) for hit in result[1]]
+
+
+def test_words_phrases_and_prefixes():
+    index = _index()
+    assert index.search('brown rice')[0] == 2
+    assert _ids(index.search('"brown rice"')) == [(0, 'plan')]
+    assert index.search('chil*', kind='meal')[1][0]['name'] == 'Moong Dal Chilla'
+    assert _ids(index.search('"moong dal chi*"')) == [(0, 'meal')]
+    assert index.search('"dal chilla" onion', kind='plan') == (0, [])
+    assert index.search('pcos loss')[0] == 1  # filename and category are searchable
+    assert index.search('') == (0, [])
+    assert index.search('quinoa') == (0, [])
+
+
+def test_phrases_do_not_span_fields():
+    index = SearchIndex()
+    index.add({'kind': 'meal'}, ['Ragi Dosa', 'curd rice'])
+    assert index.search('"dosa curd"')[0] == 0
+    assert index.search('dosa curd')[0] == 1
+
+
+def test_save_load_and_extract():
+    index = _index()
+    index.index_sha256 = 'abc'
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / 'pdf_search.json'
+        index.save(path)
+        loaded = SearchIndex.load(path)
+        assert loaded.index_sha256 == 'abc'
+        assert loaded.search('ragi*') == index.search('ragi*')
+        assert SearchIndex.load(Path(directory) / 'missing.json') is None
+
+    kept = index.extract(lambda doc: doc['plan_id'] == 1)
+    assert len(kept.docs) == 1
+    assert _ids(kept.search('rice')) == [(1, 'plan')]
+    assert kept.search('ragi') == (0, [])
+
+
+if __name__ == "__main__":
+    test_words_phrases_and_prefixes()
+    test_phrases_do_not_span_fields()
+    test_save_load_and_extract()
+    print("✅ Search index tests passed")
@@ -0,0 +1,86 @@
+"""
+Test the static snapshot exporter
+Checks content-hashed names, that re-exporting is a no-op, that stale
+files are pruned and that the API serves a snapshot only while it matches the
+index of the active corpus snapshot
+"""
+import sys
+import os
+import json
+import tempfile
+from pathlib import Path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from service.plan_catalog import load_catalog, PlanCatalog
+from pipeline.export_static_snapshot import SnapshotExporter, hashed_name
+
+
+def _small_catalog():
+    plans = [p for p in load_catalog().plans if p.get('category') == 'gut_detox'][:3]
+    return PlanCatalog({'metadata': {'total_plans': len(plans)}, 'plans': [dict(p) for p in plans]})
+
+
+def test_hashed_name():
+    assert hashed_name('12', '.json', b'a') == hashed_name('12', '.json', b'a')
+    assert hashed_name('12', '.json', b'a') != hashed_name('12', '.json', b'b')
+    assert hashed_name('12', '.json', b'a').startswith('12.')
+
+
+def test_export_is_stable_and_prunable():
+    catalog = _small_catalog()
+    with tempfile.TemporaryDirectory() as directory:
+        out = Path(directory)
+        first = SnapshotExporter(catalog, out)
+        manifest = first.export()
+        assert len(manifest['plans']) == 3
+        plan_id = str(catalog.plans[0]['id'])
+        page = (out / manifest['plans'][plan_id]['html']).read_text(encoding='utf-8')
+        assert '<html' in page
+        listed = set()
+        for key, files in manifest['listings'].items():
+            assert key.startswith('gut_detox/')
+            listing = json.loads((out / files['json']).read_text(encoding='utf-8'))
+            listed.update(str(plan['id']) for plan in listing['plans'])
+        assert listed == set(manifest['plans'])
+
+        second = SnapshotExporter(catalog, out)
+        assert second.export() == manifest
+        assert second.written == [] and second.unchanged == first.unchanged + len(first.written)
+
+        (out / 'plans' / 'old.000000000000.html').write_text('stale')
+        assert second.prune(manifest) == 1
+
+
+def test_api_serves_only_a_current_snapshot():
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from service.hot_reload import SnapshotMiddleware
+    import service.api as api
+
+    with tempfile.TemporaryDirectory() as directory:
+        app = FastAPI()
+        app.add_middleware(SnapshotMiddleware, manager=api.corpus)
+        app.mount('/snapshot', api.SnapshotFiles(directory=directory, check_dir=False))
+        client = TestClient(app)
+        try:
+            assert client.get('/snapshot/manifest.json').status_code == 404  # nothing exported yet
+            index_sha256 = api.corpus.current().get('catalog').index_sha256
+            catalog = _small_catalog()
+            manifest = SnapshotExporter(catalog, Path(directory), index_sha256).export()
+            page = manifest['plans'][str(catalog.plans[0]['id'])]['html']
+            assert client.get('/snapshot/manifest.json').headers['cache-control'] == 'no-cache'
+            assert client.get(f'/snapshot/{page}').headers['cache-control'].endswith('immutable')
+
+            # A hot reload onto another index stops serving it, until it is exported again
+            api.corpus.reload().get('catalog').index_sha256 = 'other'
+            assert client.get(f'/snapshot/{page}').status_code == 404
+            SnapshotExporter(catalog, Path(directory), 'other').export()
+            assert client.get(f'/snapshot/{page}').status_code == 200
+        finally:
+            api.corpus.reload()
+
+if __name__ == "__main__":
+    test_hashed_name()
+    test_export_is_stable_and_prunable()
+    test_api_serves_only_a_current_snapshot()
+    print("✅ Static snapshot tests passed")
@@ -0,0 +1,117 @@
+"""
+Test traffic capture and replay hashing
+Checks PII scrubbing, what the middleware records (excluded prefixes, status,
+duration, non-JSON bodies) and that replay hashes ignore volatile fields
+"""
+import sys
+import os
+import json
+import tempfile
+from pathlib import Path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+
+from fastapi import FastAPI, Request
+from fastapi.responses import PlainTextResponse
+from fastapi.testclient import TestClient
+
+from service.traffic import SCRUBBED, TrafficRecorder, TrafficRecorderMiddleware, scrub, scrub_body
+from replay_traffic import VOLATILE_KEYS, response_hash, volatile_keys
+
+
+def test_scrub_nested_fields():
+    body = {'Email': 'a@b.c', 'age': 30, 'profile': {'name': 'x', 'goals': ['skin_health']},
+            'contacts': [{'phone': '123', 'relation': 'self'}]}
+    assert scrub(body) == {'Email': SCRUBBED, 'age': 30, 'profile': {'name': SCRUBBED, 'goals': ['skin_health']},
+                           'contacts': [{'phone': SCRUBBED, 'relation': 'self'}]}
+    assert body['profile']['name'] == 'x'  # the original is not modified
+    assert scrub('plain') == 'plain' and scrub([1, None]) == [1, None]
+
+
+def test_health_data_never_captured():
+    profile = {'email': 'a@b.c', 'age': 30, 'weight': 71.5, 'gender': 'female', 'region': 'south_indian',
+               'medical_conditions': ['pcos'], 'allergies': ['peanut'], 'goals': ['skin_health'],
+               'daily_calories': 1800, 'new_form_field': 'x'}
+    assert scrub_body('/api/profile', profile) == {
+        'email': SCRUBBED, 'age': SCRUBBED, 'weight': SCRUBBED, 'gender': 'female', 'region': 'south_indian',
+        'medical_conditions': SCRUBBED, 'allergies': SCRUBBED, 'goals': ['skin_health'],
+        'daily_calories': SCRUBBED, 'new_form_field': SCRUBBED}
+    feedback = {'mood': 'good', 'weight': 70, 'symptoms': ['bloating'], 'notes': 'felt dizzy', 'water_intake': 6}
+    assert scrub_body('/api/daily-log/feedback', feedback) == {
+        'mood': 'good', 'weight': SCRUBBED, 'symptoms': SCRUBBED, 'notes': SCRUBBED, 'water_intake': 6}
+
+
+def test_middleware_records_requests():
+    app = FastAPI()
+
+    @app.post("/api/echo")
+    async def echo(request: Request):
+        await request.body()
+        return PlainTextResponse("created", status_code=201)
+
+    @app.get("/static/app.js")
+    def asset():
+        return PlainTextResponse("")
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / 'traffic.jsonl'
+        recorded = TrafficRecorderMiddleware(app, path=str(path))
+        client = TestClient(recorded)
+        client.post("/api/echo?email=a@b.c&days=3", json={'email': 'a@b.c', 'days': 3},
+                    headers={'Accept': 'application/x-ndjson'})
+        client.post("/api/echo", content=b"not json")
+        client.get("/static/app.js")
+        client.get("/missing")
+        recorded.recorder.close()
+
+        records = [json.loads(line) for line in path.read_text(encoding='utf-8').splitlines()]
+    assert [(r['path'], r['status']) for r in records] == [('/api/echo', 201), ('/api/echo', 201), ('/missing', 404)]
+    first = records[0]
+    assert first['query'] == {'email': SCRUBBED, 'days': '3'} and first['body'] == {'email': SCRUBBED, 'days': 3}
+    assert first['accept'] == 'application/x-ndjson' and first['duration_ms'] >= 0
+    assert records[1]['body_bytes'] == len(b"not json") and 'body' not in records[1]
+
+
+def test_recorder_reopens_after_close():
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / 'traffic.jsonl'
+        recorder = TrafficRecorder(str(path))
+        recorder.write({'i': 0})
+        recorder.close()
+        recorder.write({'i': 1})
+        recorder.close()
+        assert [json.loads(line)['i'] for line in path.read_text(encoding='utf-8').splitlines()] == [0, 1]
+
+
+def test_response_hash_ignores_volatile_keys():
+    a = json.dumps({'status': 'success', 'result_token': 'abc', 'cards': [{'id': 1, 'ts': 5}]}).encode()
+    b = json.dumps({'cards': [{'ts': 9, 'id': 1}], 'result_token': 'xyz', 'status': 'success'}).encode()
+    assert response_hash(a, VOLATILE_KEYS) == response_hash(b, VOLATILE_KEYS)
+    assert response_hash(a, VOLATILE_KEYS) != response_hash(a.replace(b'success', b'failed'), VOLATILE_KEYS)
+
+    ndjson_a = b'{"event": "summary", "result_token": "abc"}\n{"event": "card", "id": 1}\n'
+    ndjson_b = b'{"result_token": "def", "event": "summary"}\n{"id": 1, "event": "card"}\n'
+    assert response_hash(ndjson_a, VOLATILE_KEYS) == response_hash(ndjson_b, VOLATILE_KEYS)
+    assert response_hash(b'<html>', VOLATILE_KEYS) != response_hash(b'<html >', VOLATILE_KEYS)
+
+    search_a = json.dumps({'total': 2, 'results': [1, 2], 'took_ms': 0.41}).encode()
+    search_b = json.dumps({'total': 2, 'results': [1, 2], 'took_ms': 3.7}).encode()
+    assert response_hash(search_a, VOLATILE_KEYS) == response_hash(search_b, VOLATILE_KEYS)
+
+    # The dashboard's date and cycle position move with the day of the run, unless the date was asked for
+    monday = json.dumps({'date': '2026-01-05', 'cycle': {'day': 3, 'days': 14, 'days_remaining': 11}}).encode()
+    tuesday = json.dumps({'date': '2026-01-06', 'cycle': {'day': 4, 'days': 14, 'days_remaining': 10}}).encode()
+    today = volatile_keys({'path': '/api/dashboard', 'query': {}}, VOLATILE_KEYS)
+    dated = volatile_keys({'path': '/api/dashboard', 'query': {'date': '2026-01-05'}}, VOLATILE_KEYS)
+    assert response_hash(monday, today) == response_hash(tuesday, today)
+    assert response_hash(monday, dated) != response_hash(tuesday, dated)
+    assert volatile_keys({'path': '/api/daily-log/range', 'query': {}}, VOLATILE_KEYS) == VOLATILE_KEYS
+
+
+if __name__ == "__main__":
+    test_scrub_nested_fields()
+    test_health_data_never_captured()
+    test_middleware_records_requests()
+    test_recorder_reopens_after_close()
+    test_response_hash_ignores_volatile_keys()
+    print("✅ Traffic capture tests passed")
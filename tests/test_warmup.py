@@ -0,0 +1,81 @@
+"""
+Test query recording and warm-up query selection
+"""
+import sys
+import os
+import tempfile
+from pathlib import Path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from service.match_cache import MatchCache, profile_key
+from service.warmup import WORKER_ID_ENV, QueryLog, top_queries, warm_caches
+
+PROFILE_A = {'gender': 'male', 'region': 'north_indian', 'goals': ['gut_detox'], 'name': 'Ignored'}
+PROFILE_B = {'gender': 'female', 'region': 'south_indian', 'goals': ['skin_health']}
+
+
+def test_profile_key_ignores_personal_fields():
+    assert profile_key(PROFILE_A) == profile_key({**PROFILE_A, 'name': 'Other', 'email': 'x@y.z'})
+    assert profile_key(PROFILE_A) != profile_key(PROFILE_B)
+
+
+def test_top_queries_across_rotated_logs():
+    with tempfile.TemporaryDirectory() as directory:
+        query_log = QueryLog(Path(directory) / 'queries.jsonl', max_bytes=300, backup_count=5)
+        for _ in range(3):
+            query_log.record('goal', PROFILE_B)
+        for _ in range(5):
+            query_log.record('exact', PROFILE_A)
+        query_log.close()
+        assert len(query_log.files()) > 1
+
+        top = top_queries(query_log.files(), 2)
+        assert [system for system, _ in top] == ['exact', 'goal']
+        assert 'name' not in top[0][1]
+
+        replayed = []
+        assert warm_caches(query_log, 1, lambda system, profile: replayed.append(system)) == 1
+        assert replayed == ['exact']
+
+
+def test_forked_workers_log_to_their_own_files():
+    with tempfile.TemporaryDirectory() as directory:
+        query_log = QueryLog(Path(directory) / 'queries.jsonl', max_bytes=300, backup_count=50)
+        query_log.record('goal', PROFILE_B)  # the master's own log
+        children = []
+        for number in range(3):
+            pid = os.fork()
+            if pid == 0:
+                os.environ[WORKER_ID_ENV] = str(number)
+                for _ in range(20):
+                    query_log.record('exact', PROFILE_A)
+                query_log.close()
+                os._exit(0)
+            children.append(pid)
+        for pid in children:
+            assert os.waitpid(pid, 0)[1] == 0
+        query_log.close()
+
+        names = {path.name for path in query_log.files()}
+        assert {'queries.jsonl', 'queries.0.jsonl', 'queries.1.jsonl', 'queries.2.jsonl'} <= names
+        assert 'queries.0.jsonl.1' in names  # each worker rotated its own file
+        lines = [line for path in query_log.files() for line in path.read_text(encoding='utf-8').splitlines()]
+        assert len(lines) == 61
+        assert top_queries(query_log.files(), 2)[0][0] == 'exact'
+
+
+def test_match_cache_computes_once():
+    cache = MatchCache()
+    calls = []
+    compute = lambda: calls.append(1) or {'status': 'success'}
+    cache.get_or_compute('exact', PROFILE_A, compute)
+    cache.get_or_compute('exact', {**PROFILE_A, 'name': 'Other'}, compute)
+    assert len(calls) == 1
+
+
+if __name__ == "__main__":
+    test_profile_key_ignores_personal_fields()
+    test_top_queries_across_rotated_logs()
+    test_forked_workers_log_to_their_own_files()
+    test_match_cache_computes_once()
+    print("✅ Warm-up tests passed")